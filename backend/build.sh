@@ -22,4 +22,7 @@ python manage.py collectstatic --no-input
 # Ejecutar migraciones
 python manage.py migrate
 
+# Metadatos de ubicación (/api/meta/locations/)
+python manage.py compilar_ubicaciones
+
 echo "🚀 Build completed successfully!"
\ No newline at end of file
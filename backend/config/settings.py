@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # ✅ AGREGADO - debe ir primero
     'whitenoise.middleware.WhiteNoiseMiddleware',  # ✅ AGREGADO - para archivos estáticos
+    'django.middleware.gzip.GZipMiddleware',  # Comprime las respuestas que no vienen ya precomprimidas
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -218,7 +219,14 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-snowflake',
-    }
+    },
+    # Bytes ya comprimidos (br/gzip) de las respuestas de lectura más usadas
+    'respuestas': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'respuestas-comprimidas',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {'MAX_ENTRIES': 500},
+    },
 }
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -20,8 +20,20 @@ def api_root(request):
         'description': 'Análisis del mercado inmobiliario Madrid con Machine Learning',
         'endpoints': {
             'properties': '/api/properties/',
+            'properties_facets': '/api/properties/facets/?has_lift=1&district=...',
+            'properties_nearby': '/api/properties/nearby/?lat=&lon=&radius=&k=',
+            'properties_bbox': '/api/properties/bbox/?bbox=oeste,sur,este,norte',
             'clustering': '/api/clustering/',
             'predict': '/api/predict/',
+            'geo_reverse': '/api/geo/reverse/',
+            'search': '/api/search/?q=&limit=&offset=',
+            'search_autocomplete': '/api/search/autocomplete/?q=',
+            'comps': '/api/comps/?id= (o lat, lon, sq_mt_built...)',
+            'causal': '/api/causal/',
+            'tiles': '/api/tiles/{z}/{x}/{y}/',
+            'heatmap': '/api/heatmap/{z}/{x}/{y}/ (o .png)',
+            'market_stats': '/api/market/stats/?group_by=district,n_rooms&district=...',
+            'meta_locations': '/api/meta/locations/',
             'admin': '/admin/',
         },
         'legacy_endpoints': {
@@ -1,6 +1,8 @@
 
 from django.contrib import admin
+from .models.datasets import DatasetVersion
 from .models.houses import House
+from .models.quarantine import QuarantinedHouse
 
 
 @admin.register(House)
@@ -21,3 +23,14 @@ class HouseAdmin(admin.ModelAdmin):
         'is_orientation_east', 'created_at', 'updated_at'
     )
 
+
+@admin.register(DatasetVersion)
+class DatasetVersionAdmin(admin.ModelAdmin):
+    list_display = ('numero', 'fichero', 'nuevas', 'modificadas', 'sin_cambios', 'eliminadas', 'created_at')
+
+
+@admin.register(QuarantinedHouse)
+class QuarantinedHouseAdmin(admin.ModelAdmin):
+    list_display = ('origen', 'clave', 'motivos', 'created_at')
+    list_filter = ('origen',)
+    search_fields = ('motivos',)
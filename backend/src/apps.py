@@ -2,4 +2,11 @@ from django.apps import AppConfig
 
 class SrcConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'src'
\ No newline at end of file
+    name = 'src'
+
+    def ready(self):
+        from src.services import location_meta, market
+        from src.signals import dataset_actualizado
+
+        dataset_actualizado.connect(market.actualizar_tras_importacion, dispatch_uid='estadisticas_mercado')
+        dataset_actualizado.connect(location_meta.actualizar_tras_importacion, dispatch_uid='metadatos_ubicacion')
@@ -0,0 +1,285 @@
+"""
+Descubrimiento causal con PCMCI (tigramite + ParCorr) fuera del notebook.
+
+Sustituye a causal_analysis.ipynb, que ejecutaba run_pcmci en serie y guardaba los
+joblib a mano. Los tests de independencia condicional se reparten por variable
+objetivo en un pool de procesos, en las dos fases de PCMCI:
+1. PC: padres retardados de cada variable (run_pc_stable restringido a esa variable)
+2. MCI: los tests de la columna de cada variable, con los padres de todas las de la fase 1
+
+El resultado es el mismo que el de run_pcmci en serie. Cada tarea se guarda en una
+caché en disco indexada por los datos y los parámetros que le afectan, así que repetir
+la ejecución con la misma configuración no recalcula nada (y cambiar solo alpha_level
+reaprovecha todos los tests). No depende de Django.
+"""
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from importlib.metadata import version as version_paquete
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from tigramite import data_processing as pp
+from tigramite.independence_tests.parcorr import ParCorr
+from tigramite.pcmci import PCMCI
+
+from src.utils.procesos import crear_ejecutor
+
+TIGRAMITE = version_paquete('tigramite')
+
+# Variables del análisis publicado en data/models/pcmci_results.joblib
+COLUMNAS_CAUSALES = (
+    'sq_mt_built', 'sq_mt_useful', 'n_rooms', 'n_bathrooms', 'floor', 'n_floors',
+    'sq_mt_allotment', 'latitude', 'longitude', 'district', 'neighborhood', 'built_year',
+    'house_type', 'energy_certificate', 'buy_price', 'rent_price', 'buy_price_by_area',
+)
+
+
+def preparar_datos(df, columnas=COLUMNAS_CAUSALES):
+    """
+    Matriz numérica como en el notebook: booleanas a 0/1, categóricas codificadas en
+    orden alfabético (como LabelEncoder) y nulos rellenados con la mediana.
+    """
+    faltan = [columna for columna in columnas if columna not in df]
+    if faltan:
+        raise ValueError(f'Faltan columnas para el análisis causal: {", ".join(faltan)}')
+    datos = df[list(columnas)].copy()
+    for columna in datos.columns:
+        serie = datos[columna]
+        if serie.dtype == bool:
+            datos[columna] = serie.astype('int64')
+        elif not pd.api.types.is_numeric_dtype(serie):
+            datos[columna] = pd.factorize(serie.fillna('Unknown').astype(str), sort=True)[0]
+    datos = datos.astype('float64')
+    return datos.fillna(datos.median())
+
+
+@dataclass
+class ConfiguracionPCMCI:
+    tau_max: int = 3
+    tau_min: int = 0
+    pc_alpha: float = 0.05
+    alpha_level: float = 0.05
+    max_conds_dim: int = None
+    max_combinations: int = 1
+    max_conds_py: int = None
+    max_conds_px: int = None
+
+
+def _huella(*partes):
+    return hashlib.sha256(json.dumps(partes, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def huella_datos(datos):
+    """Hash del contenido y de los nombres de las variables."""
+    digest = hashlib.sha256(np.ascontiguousarray(datos.to_numpy(dtype='float64')).tobytes())
+    digest.update(json.dumps(list(datos.columns)).encode())
+    return digest.hexdigest()
+
+
+def huellas(datos, config):
+    """
+    (huella PC, huella MCI): cada fase depende solo de sus parámetros. alpha_level no entra en
+    ninguna porque solo umbraliza los p-valores al final.
+    """
+    pc = _huella(
+        huella_datos(datos), TIGRAMITE, config.tau_max, config.pc_alpha,
+        config.max_conds_dim, config.max_combinations,
+    )
+    mci = _huella(pc, config.tau_min, config.max_conds_py, config.max_conds_px)
+    return pc, mci
+
+
+def supuestos_enlaces(n, tau_min, tau_max):
+    """Enlaces que se prueban por defecto ({j: {(i, -tau): tipo}}), como en tigramite."""
+    return {
+        j: {
+            (i, -tau): 'o?o' if tau == 0 else '-?>'
+            for i in range(n)
+            for tau in range(tau_min, tau_max + 1)
+            if not (i == j and tau == 0)
+        }
+        for j in range(n)
+    }
+
+
+# PCMCI de cada proceso, sobre los datos compartidos (se crea una vez por worker)
+_PROCESO = {}
+
+
+def iniciar_worker(valores, variables):
+    dataframe = pp.DataFrame(valores, var_names=list(variables))
+    _PROCESO['pcmci'] = PCMCI(dataframe=dataframe, cond_ind_test=ParCorr(significance='analytic'), verbosity=0)
+
+
+def _fase_pc(j, config):
+    """Padres retardados de la variable j (fase PC)."""
+    pcmci = _PROCESO['pcmci']
+    supuestos = {k: {} for k in range(pcmci.N)}
+    supuestos[j] = {
+        enlace: tipo for enlace, tipo in supuestos_enlaces(pcmci.N, 1, config.tau_max)[j].items()
+    }
+    padres = pcmci.run_pc_stable(
+        link_assumptions=supuestos, tau_min=1, tau_max=config.tau_max, pc_alpha=config.pc_alpha,
+        max_conds_dim=config.max_conds_dim, max_combinations=config.max_combinations,
+    )
+    return padres[j]
+
+
+def _fase_mci(j, padres, config):
+    """Tests MCI de los enlaces que llegan a j: (val, p) con forma (N, tau_max + 1)."""
+    pcmci = _PROCESO['pcmci']
+    valores = np.zeros((pcmci.N, config.tau_max + 1))
+    p_valores = np.ones((pcmci.N, config.tau_max + 1))
+    # Mismas condiciones que PCMCI._iter_indep_conds
+    condiciones_y = padres[j][:config.max_conds_py]
+    for i, tau in supuestos_enlaces(pcmci.N, config.tau_min, config.tau_max)[j]:
+        condiciones_x = [(k, tau + k_tau) for k, k_tau in padres[i][:config.max_conds_px]]
+        z = [nodo for nodo in condiciones_y if nodo != (i, tau)]
+        z += [nodo for nodo in condiciones_x if nodo not in z]
+        valor, p_valor, _ = pcmci.cond_ind_test.run_test(
+            [(i, tau)], [(j, 0)], Z=z, tau_max=config.tau_max, alpha_or_thres=config.alpha_level,
+        )
+        valores[i, abs(tau)] = valor
+        p_valores[i, abs(tau)] = p_valor
+    return valores, p_valores
+
+
+def tarea(fase, j, *args):
+    """Punto de entrada de los workers."""
+    inicio = time.perf_counter()
+    resultado = _fase_pc(j, *args) if fase == 'pc' else _fase_mci(j, *args)
+    return j, resultado, time.perf_counter() - inicio
+
+
+class CacheTareas:
+    """Un joblib por (fase, huella, variable) en `directorio`."""
+
+    def __init__(self, directorio):
+        self.directorio = Path(directorio) if directorio else None
+        if self.directorio:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+
+    def _ruta(self, fase, huella, j):
+        return self.directorio / f'{fase}-{huella[:16]}-{j}.joblib'
+
+    def obtener(self, fase, huella, j):
+        if self.directorio and self._ruta(fase, huella, j).exists():
+            return joblib.load(self._ruta(fase, huella, j))
+        return None
+
+    def guardar(self, fase, huella, j, valor):
+        if self.directorio:
+            ruta = self._ruta(fase, huella, j)
+            temporal = ruta.with_suffix('.tmp')
+            joblib.dump(valor, temporal)
+            os.replace(temporal, ruta)
+
+
+@dataclass
+class ResultadoPCMCI:
+    resultados: dict = None
+    huella: str = ''
+    workers: int = 1
+    tareas: int = 0
+    en_cache: int = 0
+    segundos: float = 0.0
+    tiempos: dict = field(default_factory=lambda: {'pc': 0.0, 'mci': 0.0})  # pared por fase
+
+
+def _ejecutar_fase(ejecutor, cache, fase, huella, variables, args, resultado):
+    inicio = time.perf_counter()
+    salida = {}
+    pendientes = []
+    for j in range(len(variables)):
+        guardado = cache.obtener(fase, huella, j)
+        if guardado is None:
+            pendientes.append(ejecutor.submit(tarea, fase, j, *args))
+        else:
+            salida[j] = guardado
+            resultado.en_cache += 1
+    for futuro in pendientes:
+        j, valor, _ = futuro.result()
+        cache.guardar(fase, huella, j, valor)
+        salida[j] = valor
+    resultado.tareas += len(variables)
+    resultado.tiempos[fase] = time.perf_counter() - inicio
+    return salida
+
+
+def ejecutar_pcmci(datos, config=None, workers=None, cache=None):
+    """
+    PCMCI sobre `datos` (DataFrame numérico, filas = observaciones) repartido en `workers`
+    procesos. Devuelve un ResultadoPCMCI cuyo `resultados` tiene el formato de run_pcmci
+    (graph, val_matrix, p_matrix, conf_matrix, var_names) más la clave `version`.
+    """
+    config = config or ConfiguracionPCMCI()
+    workers = workers or os.cpu_count() or 1
+    cache = cache if isinstance(cache, CacheTareas) else CacheTareas(cache)
+    variables = list(datos.columns)
+    valores = datos.to_numpy(dtype='float64')
+    huella_pc, huella_mci = huellas(datos, config)
+    resultado = ResultadoPCMCI(huella=_huella(huella_mci, config.alpha_level), workers=workers)
+    inicio = time.perf_counter()
+
+    ejecutor = crear_ejecutor(workers, iniciar_worker, (valores, variables))
+    try:
+        padres = _ejecutar_fase(ejecutor, cache, 'pc', huella_pc, variables, (config,), resultado)
+        columnas = _ejecutar_fase(ejecutor, cache, 'mci', huella_mci, variables, (padres, config), resultado)
+    finally:
+        ejecutor.shutdown(wait=True)
+
+    n = len(variables)
+    val_matrix = np.zeros((n, n, config.tau_max + 1))
+    p_matrix = np.ones((n, n, config.tau_max + 1))
+    for j, (valores_j, p_valores_j) in columnas.items():
+        val_matrix[:, j, :] = valores_j
+        p_matrix[:, j, :] = p_valores_j
+    # Igual que el final de PCMCI.run_mci: grafo con los p-valores sin simetrizar y después se simetrizan
+    pcmci = PCMCI(dataframe=pp.DataFrame(valores, var_names=variables), cond_ind_test=ParCorr(), verbosity=0)
+    graph = pcmci.convert_to_string_graph(p_matrix <= config.alpha_level)
+    simetricas = pcmci.symmetrize_p_and_val_matrix(
+        p_matrix=p_matrix, val_matrix=val_matrix,
+        link_assumptions=supuestos_enlaces(n, config.tau_min, config.tau_max),
+    )
+    resultado.segundos = time.perf_counter() - inicio
+    resultado.resultados = {
+        'graph': graph,
+        'p_matrix': simetricas['p_matrix'],
+        'val_matrix': simetricas['val_matrix'],
+        'conf_matrix': simetricas['conf_matrix'],
+        'var_names': variables,
+        'version': {
+            'huella': resultado.huella,
+            'creado': datetime.now(timezone.utc).isoformat(),
+            'filas': len(datos),
+            'tigramite': TIGRAMITE,
+            'config': asdict(config),
+        },
+    }
+    return resultado
+
+
+def guardar_resultados(resultados, directorio):
+    """
+    Escribe el artefacto versionado (pcmci/pcmci_results-<fecha>-<huella>.joblib) y
+    actualiza pcmci_results.joblib y pcmci_var_names.joblib, que son los que lee la API.
+    Devuelve la ruta del artefacto versionado.
+    """
+    directorio = Path(directorio)
+    version = resultados['version']
+    marca = datetime.fromisoformat(version['creado']).strftime('%Y%m%dT%H%M%S')
+    versionado = directorio / 'pcmci' / f'pcmci_results-{marca}-{version["huella"][:12]}.joblib'
+    versionado.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(resultados, versionado)
+    for nombre, valor in (('pcmci_results.joblib', resultados), ('pcmci_var_names.joblib', resultados['var_names'])):
+        # Reemplazo atómico: la API nunca lee un fichero a medio escribir
+        temporal = directorio / f'.{nombre}.tmp'
+        joblib.dump(valor, temporal)
+        os.replace(temporal, directorio / nombre)
+    return versionado
@@ -1,20 +1,335 @@
+"""
+Pipeline de limpieza por bloques que genera el dataset unificado de viviendas.
+
+Sustituye a la cadena de notebooks (madrid_houses_clean.csv + coordenadas + volcado
+original -> unified_houses_madrid.csv), con las mismas reglas de cruce:
+1. lectura: el fichero principal se lee en streaming con pyarrow, solo las columnas
+   necesarias y con tipos explícitos (pandas con dtypes nullable es ~10 veces más lento)
+2. unificar: cada bloque se cruza por id con las coordenadas (inner) y el volcado (left)
+3. limpiar: espacios y cadenas vacías -> NA, sin el dropna() que borraba filas enteras;
+   neighborhood_id / house_type_id se separan en columnas tipadas (src.utils.locations)
+4. validar: reglas de src.utils.validation; las filas que fallan van a cuarentena
+5. escribir: Parquet particionado por distrito (y, opcionalmente, CSV); la cuarentena,
+   en Parquet aparte con la columna `motivos`
+
+Los pasos 2-5 se ejecutan en un pool de procesos con un número acotado de bloques en
+vuelo, así que la memoria no depende del tamaño del fichero. No depende de Django.
+"""
+import os
+import shutil
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
+from src.utils.locations import expandir_campos
+from src.utils.procesos import crear_ejecutor
+from src.utils.validation import REGLAS, contar_motivos, regla_obligatorias, separar
+
+ETAPAS = ('lectura', 'unificar', 'limpiar', 'validar', 'escribir')
+
+# Tipos explícitos: el resto de columnas se leen como texto
+COLUMNAS_ENTERAS = (
+    'id', 'n_rooms', 'n_bathrooms', 'n_floors', 'floor', 'buy_price',
+    'energy_certificate', 'neighborhood', 'district', 'house_type',
+)
+COLUMNAS_DECIMALES = (
+    'latitude', 'longitude', 'sq_mt_built', 'sq_mt_useful', 'sq_mt_allotment',
+    'rent_price', 'rent_price_by_area', 'buy_price_by_area', 'parking_price', 'built_year',
+)
+PREFIJOS_BOOLEANOS = ('is_', 'has_', 'are_')
+
+COLUMNAS_COORDENADAS = ('id', 'latitude', 'longitude', 'address')
+COLUMNAS_OBLIGATORIAS = ('id', 'latitude', 'longitude', 'buy_price')
+COLUMNA_PARTICION = 'district'
+
+
+def dtype_columna(nombre):
+    if nombre in COLUMNAS_ENTERAS:
+        return 'Int64'
+    if nombre in COLUMNAS_DECIMALES:
+        return 'float64'
+    if nombre.startswith(PREFIJOS_BOOLEANOS):
+        return 'boolean'
+    return 'string'
+
+
+def dtypes(columnas):
+    return {columna: dtype_columna(columna) for columna in columnas}
+
+
+TIPOS_ARROW = {'Int64': pa.int64(), 'float64': pa.float64(), 'boolean': pa.bool_(), 'string': pa.string()}
+TIPOS_PANDAS = {pa.int64(): pd.Int64Dtype(), pa.bool_(): pd.BooleanDtype(), pa.string(): pd.StringDtype()}
+TAMANO_BLOQUE_LECTURA = 16 << 20  # bytes que lee pyarrow de cada vez
+
+
+def _opciones_conversion(columnas):
+    return pa_csv.ConvertOptions(
+        include_columns=list(columnas),
+        column_types={columna: TIPOS_ARROW[tipo] for columna, tipo in dtypes(columnas).items()},
+        strings_can_be_null=True,
+    )
+
+
+def a_pandas(tabla):
+    """Tabla / lote de Arrow -> DataFrame con los dtypes nullable de pandas."""
+    return tabla.to_pandas(types_mapper=TIPOS_PANDAS.get)
+
+
+def leer_csv(ruta, columnas):
+    """Lee un CSV completo (multihilo) con las columnas y tipos indicados."""
+    return a_pandas(pa_csv.read_csv(ruta, convert_options=_opciones_conversion(columnas)))
+
+
+def leer_csv_por_bloques(ruta, columnas, chunksize):
+    """DataFrames de como mucho `chunksize` filas, leyendo el fichero en streaming."""
+    lector = pa_csv.open_csv(
+        ruta,
+        read_options=pa_csv.ReadOptions(block_size=TAMANO_BLOQUE_LECTURA),
+        convert_options=_opciones_conversion(columnas),
+    )
+    for lote in lector:
+        for inicio in range(0, lote.num_rows, chunksize):
+            yield a_pandas(lote.slice(inicio, chunksize))
+
+
+def columnas_csv(ruta, excluir=()):
+    """Columnas con nombre del CSV (sin el índice 'Unnamed: 0' que dejaban los notebooks)."""
+    cabecera = pd.read_csv(ruta, nrows=0).columns
+    return [c for c in cabecera if not c.startswith('Unnamed') and c not in excluir]
+
+
+@dataclass
+class ConfiguracionPipeline:
+    entrada: Path  # madrid_houses_clean.csv: una fila por vivienda con las variables limpias
+    coordenadas: Path  # lat_lon_houses_Madrid_cleaned.csv: id, latitude, longitude, address
+    salida: Path  # directorio del dataset Parquet
+    crudo: Path = None  # houses_Madrid.csv (volcado original de Idealista), opcional
+    csv_salida: Path = None
+    chunksize: int = 100_000
+    workers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    sobrescribir: bool = False  # borra el directorio de salida si ya existe
+    cuarentena: Path = None  # Parquet con las filas rechazadas; por defecto, junto a la salida
+
+    def __post_init__(self):
+        if self.cuarentena is None:
+            self.cuarentena = Path(self.salida).parent / 'cuarentena'
+
+
+@dataclass
+class ResultadoPipeline:
+    leidas: int = 0
+    duplicadas: int = 0
+    sin_coordenadas: int = 0
+    cuarentena: int = 0
+    motivos: dict = field(default_factory=dict)  # {código de regla: filas en cuarentena}
+    escritas: int = 0
+    bloques: int = 0
+    segundos: float = 0.0
+    tiempos: dict = field(default_factory=lambda: dict.fromkeys(ETAPAS, 0.0))
+
+    @property
+    def filas_por_segundo(self):
+        return self.leidas / self.segundos if self.segundos else 0.0
+
+
+# Tablas auxiliares de cada proceso, indexadas por id (se cargan una vez por worker)
+_TABLAS = {}
+
+
+def _ids(serie):
+    """ids como int64 de numpy (-1 para los nulos), que es lo que indexa rápido."""
+    return serie.to_numpy(dtype='int64', na_value=-1)
+
+
+def _por_id(df):
+    df = df.dropna(subset=['id']).drop_duplicates('id')
+    return df.set_index(pd.Index(_ids(df['id']), name='id')).drop(columns='id')
+
+
+def cargar_tablas(ruta_coordenadas, ruta_crudo=None, columnas_crudo=()):
+    _TABLAS['coordenadas'] = _por_id(leer_csv(ruta_coordenadas, COLUMNAS_COORDENADAS))
+    _TABLAS['crudo'] = None
+    if ruta_crudo and columnas_crudo:
+        _TABLAS['crudo'] = _por_id(leer_csv(ruta_crudo, ['id', *columnas_crudo]))
+
+
+def unificar(bloque):
+    """
+    Mismo cruce que el notebook: coordenadas (inner) y volcado original (left) por id.
+    Con get_indexer sobre un índice int64 es ~7 veces más rápido que join con ids Int64.
+    """
+    coordenadas = _TABLAS['coordenadas']
+    posiciones = coordenadas.index.get_indexer(_ids(bloque['id']))
+    encontradas = posiciones >= 0
+    base = bloque[encontradas].reset_index(drop=True)
+    partes = [
+        base[['id']],
+        coordenadas.iloc[posiciones[encontradas]].reset_index(drop=True),
+        base.drop(columns='id'),
+    ]
+    crudo = _TABLAS.get('crudo')
+    if crudo is not None:
+        partes.append(crudo.reindex(_ids(base['id'])).reset_index(drop=True))
+    return pd.concat(partes, axis=1)
+
+
+def limpiar(df):
+    """Quita espacios, convierte las cadenas vacías en NA y separa los campos empaquetados."""
+    texto = df.select_dtypes('string').columns
+    if len(texto):
+        df = df.copy()
+        df[texto] = df[texto].apply(lambda serie: serie.str.strip().replace('', pd.NA))
+    return expandir_campos(df)
+
+
+# Las coordenadas ya las comprueban coordenadas_nulas / fuera_de_madrid
+REGLAS_PIPELINE = REGLAS + (regla_obligatorias(('id', 'buy_price')),)
+
+
+def validar(df):
+    """(válidas, cuarentena con la columna `motivos`)."""
+    return separar(df, REGLAS_PIPELINE)
+
+
+def escribir(df, numero, salida):
+    # Los directorios de partición son texto (district=21); como Int64 pyarrow no sabe leerlos de vuelta
+    df = df.assign(**{COLUMNA_PARTICION: df[COLUMNA_PARTICION].astype('string')})
+    df.to_parquet(
+        salida,
+        engine='pyarrow',
+        index=False,
+        partition_cols=[COLUMNA_PARTICION],
+        basename_template=f'bloque-{numero:05d}-{{i}}.parquet',
+    )
+
+
+def escribir_cuarentena(df, numero, directorio):
+    df.to_parquet(Path(directorio) / f'bloque-{numero:05d}.parquet', engine='pyarrow', index=False)
+
+
+def procesar_bloque(numero, bloque, salida, cuarentena, devolver=False):
+    """Pasos 2-5 sobre un bloque; se ejecuta en un worker. Devuelve contadores y tiempos."""
+    tiempos = {}
+    inicio = time.perf_counter()
+    unido = unificar(bloque)
+    tiempos['unificar'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    limpio = limpiar(unido)
+    tiempos['limpiar'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    valido, rechazado = validar(limpio)
+    tiempos['validar'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    if not valido.empty:
+        escribir(valido, numero, salida)
+    if not rechazado.empty:
+        escribir_cuarentena(rechazado, numero, cuarentena)
+    tiempos['escribir'] = time.perf_counter() - inicio
+
+    return {
+        'numero': numero,
+        'sin_coordenadas': len(bloque) - len(unido),
+        'cuarentena': len(rechazado),
+        'motivos': contar_motivos(rechazado),
+        'escritas': len(valido),
+        'tiempos': tiempos,
+        'datos': valido if devolver else None,
+    }
+
+
+def _en_orden(ejecutor, tareas, max_en_vuelo):
+    """Resultados en el orden de los bloques, con como mucho `max_en_vuelo` pendientes."""
+    pendientes = deque()
+    for tarea in tareas:
+        pendientes.append(ejecutor.submit(procesar_bloque, *tarea))
+        if len(pendientes) >= max_en_vuelo:
+            yield pendientes.popleft().result()
+    while pendientes:
+        yield pendientes.popleft().result()
+
+
+def _leer_bloques(config, columnas, resultado):
+    """Lee el fichero principal por bloques y quita los ids repetidos entre bloques."""
+    vistos = set()
+    lector = leer_csv_por_bloques(config.entrada, columnas, config.chunksize)
+    numero = 0
+    while True:
+        inicio = time.perf_counter()
+        bloque = next(lector, None)
+        if bloque is None:
+            break
+        # Series.isin(set) convierte el conjunto entero en cada bloque; la búsqueda directa no
+        nuevos = np.fromiter((i not in vistos for i in bloque['id'].tolist()), dtype=bool, count=len(bloque))
+        unicos = bloque[~bloque['id'].duplicated().to_numpy() & nuevos]
+        vistos.update(unicos['id'].tolist())
+        resultado.tiempos['lectura'] += time.perf_counter() - inicio
+        resultado.leidas += len(bloque)
+        resultado.duplicadas += len(bloque) - len(unicos)
+        yield (
+            numero, unicos.reset_index(drop=True), config.salida, config.cuarentena,
+            config.csv_salida is not None,
+        )
+        numero += 1
 
-def load_data(file_path):
-    """Carga los datos desde un archivo CSV."""
-    return pd.read_csv(file_path)
 
-def filter_city(data, region_name="Madrid"):
-    """Filtra el DataFrame para incluir todas las filas donde RegionName es 'Madrid' y RegionType es 'city'."""
-    # Filtra el DataFrame con las condiciones especificadas
-    filtered_data = data[(data['RegionName'] == region_name)]
-    return filtered_data
+def ejecutar_pipeline(config, progreso=None):
+    """
+    Ejecuta el pipeline completo y devuelve un ResultadoPipeline con contadores y tiempos
+    por etapa (los de los workers se suman, así que pueden superar al tiempo total).
+    `progreso` recibe el resultado acumulado tras cada bloque.
+    """
+    resultado = ResultadoPipeline()
+    inicio = time.perf_counter()
+    # Como en el notebook, las coordenadas salen solo del fichero de coordenadas
+    columnas = columnas_csv(config.entrada, excluir=COLUMNAS_COORDENADAS[1:])
+    faltan = [c for c in COLUMNAS_OBLIGATORIAS if c not in columnas and c not in COLUMNAS_COORDENADAS[1:]]
+    if faltan:
+        raise ValueError(f'Faltan columnas obligatorias en {config.entrada}: {", ".join(faltan)}')
 
-def clean_data(data):
-    """Realiza una limpieza básica de datos en el DataFrame."""
-    # Por ejemplo, podrías limpiar filas con NaN o hacer otros ajustes aquí
-    return data.dropna()
+    for directorio in (Path(config.salida), Path(config.cuarentena)):
+        if directorio.exists() and any(directorio.iterdir()):
+            if not config.sobrescribir:
+                raise FileExistsError(f'El directorio de salida {directorio} no está vacío')
+            shutil.rmtree(directorio)
+        directorio.mkdir(parents=True, exist_ok=True)
+    if config.csv_salida:
+        Path(config.csv_salida).unlink(missing_ok=True)
+    # Del volcado solo interesan las columnas que no aportan los otros dos ficheros
+    columnas_crudo = []
+    if config.crudo:
+        columnas_crudo = columnas_csv(config.crudo, excluir=set(columnas) | set(COLUMNAS_COORDENADAS))
 
-def save_processed_data(data, file_path):
-    """Guarda el DataFrame procesado en un archivo CSV."""
-    data.to_csv(file_path, index=False)
+    iniciar = (config.coordenadas, config.crudo, columnas_crudo)
+    ejecutor = crear_ejecutor(config.workers, cargar_tablas, iniciar)
+    try:
+        tareas = _leer_bloques(config, columnas, resultado)
+        for bloque in _en_orden(ejecutor, tareas, max_en_vuelo=2 * max(config.workers, 1)):
+            resultado.bloques += 1
+            resultado.sin_coordenadas += bloque['sin_coordenadas']
+            resultado.cuarentena += bloque['cuarentena']
+            for codigo, filas in bloque['motivos'].items():
+                resultado.motivos[codigo] = resultado.motivos.get(codigo, 0) + filas
+            resultado.escritas += bloque['escritas']
+            for etapa, segundos in bloque['tiempos'].items():
+                resultado.tiempos[etapa] += segundos
+            if bloque['datos'] is not None:
+                # El CSV se escribe en el proceso principal para conservar el orden
+                inicio_csv = time.perf_counter()
+                bloque['datos'].to_csv(config.csv_salida, mode='a', header=bloque['numero'] == 0, index=False)
+                resultado.tiempos['escribir'] += time.perf_counter() - inicio_csv
+            resultado.segundos = time.perf_counter() - inicio
+            if progreso:
+                progreso(resultado)
+    finally:
+        ejecutor.shutdown(wait=True)
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
@@ -0,0 +1,40 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from src.services.location_meta import compilar_ubicaciones, ruta_ubicaciones
+from src.utils.location_meta import guardar
+
+
+class Command(BaseCommand):
+    help = (
+        'Compila los metadatos de ubicación (/api/meta/locations/): distritos y barrios con su nº de viviendas, '
+        'centroide, rectángulo y €/m², en una sola pasada agrupada. Genera un JSON versionado por su contenido'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salida', default=str(ruta_ubicaciones()), help='Fichero JSON de los metadatos')
+        parser.add_argument('--frontend', help='Copia también el JSON aquí (p. ej. frontend/src/locations.json)')
+
+    def handle(self, *args, **options):
+        salida = Path(options['salida'])
+        inicio = time.perf_counter()
+        try:
+            artefacto, tamano, escrito = compilar_ubicaciones(salida)
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+        segundos = time.perf_counter() - inicio
+        barrios = sum(len(distrito['neighborhoods']) for distrito in artefacto['districts'])
+        self.stdout.write(
+            f"📍 {artefacto['count']} viviendas, {len(artefacto['districts'])} distritos y {barrios} barrios"
+        )
+        if options['frontend']:
+            guardar(salida.read_bytes(), Path(options['frontend']))
+            self.stdout.write(f"📁 Copia en {options['frontend']}")
+        if not escrito:
+            self.stdout.write(self.style.SUCCESS(f"✅ {salida} sin cambios (versión {artefacto['version']})"))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Versión {artefacto['version']} en {salida}: {segundos:.2f}s, {tamano / 1024:.0f} KB"
+        ))
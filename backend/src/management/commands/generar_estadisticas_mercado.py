@@ -0,0 +1,35 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from src.services.market import generar_estadisticas, ruta_estadisticas
+
+
+class Command(BaseCommand):
+    help = (
+        'Precalcula el cubo de estadísticas del mercado (/api/market/stats/): recuento y percentiles de '
+        'precio, €/m², alquiler y rentabilidad por distrito, barrio, habitaciones y tipo, con sus agregados. '
+        'Si ya existe, solo recalcula los grupos de las viviendas cambiadas desde entonces'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salida', default=str(ruta_estadisticas()), help='Fichero del cubo')
+        parser.add_argument('--completo', action='store_true', help='Recalcula todos los grupos')
+
+    def handle(self, *args, **options):
+        salida = Path(options['salida'])
+        inicio = time.perf_counter()
+        try:
+            cubo, modo = generar_estadisticas(salida, completo=options['completo'])
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+        segundos = time.perf_counter() - inicio
+        grupos = sum(len(tabla) for tabla in cubo.niveles.values())
+        self.stdout.write(f'📊 {len(cubo)} viviendas, {grupos} grupos en {len(cubo.niveles)} niveles')
+        if modo == 'al día':
+            self.stdout.write(self.style.SUCCESS(f'✅ {salida} ya estaba al día'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Cubo {modo} en {salida}: {segundos:.2f}s, {salida.stat().st_size / 1024:.0f} KB'
+        ))
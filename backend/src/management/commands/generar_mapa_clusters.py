@@ -0,0 +1,69 @@
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from src.services.tiles import puntos_mapa
+from src.services.views import MAPA_PATH
+from src.utils.cluster_map import mapa_clusters, mapa_por_filas
+
+
+def _guardar(mapa, destino):
+    """Guarda el HTML con reemplazo atómico (la vista nunca lee un fichero a medias)."""
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=destino.parent, prefix=f'.{destino.name}.', suffix='.tmp')
+    os.close(descriptor)
+    try:
+        mapa.save(temporal)
+        os.replace(temporal, destino)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+
+
+def _kb(ruta):
+    return ruta.stat().st_size / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera madrid_clusters_kmeans_map.html (el mapa de /geographic-visualization/) con una capa '
+        'de marcadores agrupados en el navegador por cada cluster K-means'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salida', default=MAPA_PATH, help='Fichero HTML del mapa')
+        parser.add_argument(
+            '--comparar', action='store_true',
+            help='Genera también el mapa con el método de los notebooks (un CircleMarker por fila) y compara',
+        )
+
+    def handle(self, *args, **options):
+        salida = Path(options['salida'])
+        inicio = time.perf_counter()
+        try:
+            df = puntos_mapa()
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f'📍 {len(df)} viviendas en {df["cluster"].nunique()} clusters ({time.perf_counter() - inicio:.2f}s)')
+
+        inicio = time.perf_counter()
+        _guardar(mapa_clusters(df), salida)
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(f'✅ Mapa en {salida}: {segundos:.2f}s, {_kb(salida):.0f} KB'))
+
+        if options['comparar']:
+            self.stdout.write('⏱️ Generando el mapa con df.iterrows() y folium.CircleMarker...')
+            with tempfile.TemporaryDirectory() as directorio:
+                anterior = Path(directorio) / salida.name
+                inicio = time.perf_counter()
+                mapa_por_filas(df).save(str(anterior))
+                segundos_anterior = time.perf_counter() - inicio
+                self.stdout.write(f'  {"":<22}{"tiempo":>10}{"tamaño":>12}')
+                self.stdout.write(f'  {"CircleMarker por fila":<22}{segundos_anterior:>9.2f}s{_kb(anterior):>9.0f} KB')
+                self.stdout.write(f'  {"FastMarkerCluster":<22}{segundos:>9.2f}s{_kb(salida):>9.0f} KB')
+                self.stdout.write(
+                    f'  x{segundos_anterior / segundos:.0f} más rápido, x{_kb(anterior) / _kb(salida):.0f} más pequeño'
+                )
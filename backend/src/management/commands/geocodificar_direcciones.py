@@ -0,0 +1,105 @@
+import asyncio
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from src.utils.addresses import agrupar_edificios
+from src.utils.geocoding import (
+    URL_NOMINATIM, CacheGeocodificacion, ClienteNominatim, clave_geocodificacion, geocodificar,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Geocodifica las direcciones de un CSV contra un Nominatim local, una vez por edificio, con '
+        'peticiones concurrentes, reintentos y una caché SQLite; si se interrumpe, la siguiente '
+        'ejecución sigue donde se quedó'
+    )
+
+    def add_arguments(self, parser):
+        datos = Path(settings.DATA_PATH)
+        parser.add_argument(
+            '--entrada', default=str(datos / 'houses_Madrid_invalid_coordinates.csv'),
+            help='CSV con id y address (por defecto las direcciones que fallaron en el notebook)',
+        )
+        parser.add_argument(
+            '--columna', default='address',
+            help='Columna con la dirección completa; se combina con street_name, street_number y subtitle si existen',
+        )
+        parser.add_argument(
+            '--salida', default=str(datos / 'houses_Madrid_geocoded.csv'),
+            help='CSV de salida con las coordenadas resueltas',
+        )
+        parser.add_argument(
+            '--cache', default=str(datos / 'geocoding_cache.sqlite3'), help='Fichero SQLite de la caché',
+        )
+        parser.add_argument('--url', default=URL_NOMINATIM, help='Endpoint /search de Nominatim')
+        parser.add_argument('--concurrencia', type=int, default=8, help='Peticiones simultáneas como máximo')
+        parser.add_argument('--reintentos', type=int, default=3, help='Reintentos por dirección')
+        parser.add_argument('--timeout', type=float, default=10.0, help='Segundos por petición')
+        parser.add_argument('--lote', type=int, default=500, help='Direcciones por punto de control')
+        parser.add_argument(
+            '--reintentar-sin-resultado', action='store_true',
+            help='Vuelve a consultar las direcciones que Nominatim no encontró',
+        )
+
+    def handle(self, *args, **options):
+        entrada = Path(options['entrada'])
+        if not entrada.exists():
+            raise CommandError(f'No existe el fichero {entrada}')
+        df = pd.read_csv(entrada, dtype='string')
+        if options['columna'] not in df:
+            raise CommandError(f'El CSV no tiene la columna {options["columna"]}')
+        # Las variantes de una misma dirección (mayúsculas, acentos, abreviaturas, puerta) se consultan una vez
+        codigos, unicos = agrupar_edificios(df, options['columna'])
+        con_calle = int((codigos >= 0).sum())
+        self.stdout.write(
+            f'🏢 {con_calle} direcciones en {len(unicos)} edificios: '
+            f'{con_calle - len(unicos)} consultas ahorradas'
+        )
+
+        cliente = ClienteNominatim(
+            url=options['url'],
+            concurrencia=options['concurrencia'],
+            reintentos=options['reintentos'],
+            timeout=options['timeout'],
+        )
+        cache = CacheGeocodificacion(options['cache'])
+        try:
+            if options['reintentar_sin_resultado']:
+                self.stdout.write(f'🔁 {cache.olvidar_sin_resultado()} direcciones sin resultado se vuelven a consultar')
+            direcciones = unicos['consulta'].tolist()
+            self.stdout.write(f'🌍 Geocodificando {entrada.name} contra {cliente.url}...')
+
+            def progreso(resultado):
+                self.stdout.write(
+                    f'  lote {resultado.lotes}: {resultado.consultadas} consultadas '
+                    f'({resultado.por_segundo:,.1f} direcciones/s)'
+                )
+
+            coordenadas, resultado = asyncio.run(
+                geocodificar(direcciones, cache, cliente, lote=options['lote'], progreso=progreso)
+            )
+        finally:
+            cache.cerrar()
+
+        # Coordenadas de cada edificio repartidas a todas sus filas
+        por_edificio = pd.DataFrame(
+            [coordenadas.get(clave, (None, None)) for clave in map(clave_geocodificacion, direcciones)]
+            + [(None, None)],  # posición -1: filas sin calle
+            columns=['latitude', 'longitude'], dtype='float64',
+        )
+        df[['latitude', 'longitude']] = por_edificio.to_numpy()[codigos]
+        df.to_csv(options['salida'], index=False)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {resultado.direcciones} edificios: {resultado.en_cache} en caché, '
+            f'{resultado.encontradas} encontradas, {resultado.sin_resultado} sin resultado, '
+            f'{resultado.errores} con error en {resultado.segundos:.1f}s -> {options["salida"]}'
+        ))
+        if resultado.errores:
+            self.stdout.write(self.style.WARNING(
+                '⚠️ Las direcciones con error no se guardan en la caché: vuelve a ejecutar el comando para reintentarlas'
+            ))
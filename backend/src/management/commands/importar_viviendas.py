@@ -0,0 +1,69 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from src.utils.importer import importar_viviendas
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa viviendas desde un CSV por bloques escribiendo solo las nuevas o modificadas '
+        '(COPY en PostgreSQL) y registra una nueva versión del dataset si hay cambios'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--csv',
+            default=str(Path(settings.DATA_PATH) / 'unified_houses_madrid.csv'),
+            help='Ruta del CSV a importar (por defecto data/unified_houses_madrid.csv)',
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Filas leídas por bloque')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000, help='Filas por executemany (no aplica a COPY en PostgreSQL)',
+        )
+        parser.add_argument(
+            '--conservar-ausentes',
+            action='store_true',
+            help='No elimina las viviendas de la tabla que no aparecen en el CSV (importación parcial)',
+        )
+
+    def handle(self, *args, **options):
+        ruta = Path(options['csv'])
+        if not ruta.exists():
+            raise CommandError(f'No existe el fichero {ruta}')
+
+        self.stdout.write(f'📥 Importando {ruta.name} en {connection.vendor}...')
+
+        def progreso(resultado):
+            self.stdout.write(f'  {resultado.leidas} filas leídas ({resultado.filas_por_segundo:,.0f} filas/s)')
+
+        try:
+            resultado = importar_viviendas(
+                ruta,
+                chunksize=options['chunk_size'],
+                batch_size=options['batch_size'],
+                progreso=progreso,
+                conservar_ausentes=options['conservar_ausentes'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            f'  {resultado.nuevas} nuevas, {resultado.modificadas} modificadas, '
+            f'{resultado.sin_cambios} sin cambios, {resultado.eliminadas} eliminadas'
+        )
+        if resultado.motivos:
+            self.stdout.write('  cuarentena: ' + ', '.join(
+                f'{codigo} {filas}' for codigo, filas in sorted(resultado.motivos.items())
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {resultado.escritas} viviendas nuevas o actualizadas, {resultado.duplicadas} duplicadas, '
+            f'{resultado.cuarentena} en cuarentena en {resultado.segundos:.1f}s '
+            f'({resultado.filas_por_segundo:,.0f} filas/s vía {resultado.metodo}); '
+            f'dataset en la versión {resultado.version}'
+        ))
+        if resultado.receptores_fallidos:
+            self.stdout.write(self.style.WARNING(
+                '⚠️ No se actualizaron (ver el log): ' + ', '.join(resultado.receptores_fallidos)
+            ))
@@ -0,0 +1,75 @@
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from src.models import House
+from src.utils.importer import ResultadoImportacion, bloques_a_escribir, copiar_viviendas, upsert_viviendas
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la escritura del importador (filas/s) con el CSV repetido N veces: COPY y executemany '
+        'en PostgreSQL, executemany en el resto. Todo se hace en una transacción que se deshace al final: '
+        'la base de datos queda como estaba'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--csv',
+            default=str(Path(settings.DATA_PATH) / 'unified_houses_madrid.csv'),
+            help='CSV de origen (por defecto data/unified_houses_madrid.csv)',
+        )
+        parser.add_argument(
+            '--repeticiones', type=int, default=10, help='Copias del CSV, cada una con direcciones distintas',
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Filas leídas por bloque')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Filas por executemany')
+
+    def handle(self, *args, **options):
+        ruta = Path(options['csv'])
+        if not ruta.exists():
+            raise CommandError(f'No existe el fichero {ruta}')
+        if options['repeticiones'] < 1:
+            raise CommandError('--repeticiones debe ser al menos 1')
+
+        metodos = ['copy', 'executemany'] if connection.vendor == 'postgresql' else ['executemany']
+        with transaction.atomic():
+            bloques = self.bloques(ruta, options['repeticiones'], options['chunk_size'])
+            filas = sum(len(bloque) for bloque in bloques)
+            self.stdout.write(
+                f'⏱️ Escritura de {filas} filas ({ruta.name} ×{options["repeticiones"]}) en {connection.vendor}'
+            )
+            for metodo in metodos:
+                # Cada método parte de la tabla vacía
+                with transaction.atomic():
+                    House.objects.all().delete()
+                    inicio = time.perf_counter()
+                    if metodo == 'copy':
+                        escritas = copiar_viviendas(iter(bloques))
+                    else:
+                        escritas = sum(upsert_viviendas(bloque, options['batch_size']) for bloque in bloques)
+                    segundos = time.perf_counter() - inicio
+                    transaction.set_rollback(True)
+                self.stdout.write(f'  {metodo}: {escritas} filas en {segundos:.2f}s ({filas / segundos:,.0f} filas/s)')
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('✅ Medida terminada; no se ha guardado nada'))
+
+    def bloques(self, ruta, repeticiones, chunksize):
+        """Bloques normalizados como los que escribe importar_viviendas, con todas las filas nuevas."""
+        original = pd.read_csv(ruta, dtype=str)
+        # Cada copia con sus propias direcciones; las viviendas sin calle se distinguen por su id
+        calles = original['street_name'].fillna('')
+        copias = pd.concat([
+            original.assign(street_name=calles.where(calles == '', calles + f' r{i}'), id=original['id'] + f'r{i}')
+            for i in range(repeticiones)
+        ], ignore_index=True)
+        with tempfile.TemporaryDirectory() as directorio:
+            repetido = Path(directorio) / ruta.name
+            copias.to_csv(repetido, index=False)
+            # Sin filas existentes todas son nuevas; la cuarentena se deshace con la transacción
+            return list(bloques_a_escribir(repetido, chunksize, {}, set(), ResultadoImportacion()))
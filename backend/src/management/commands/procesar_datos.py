@@ -0,0 +1,80 @@
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from src.data_processing import ETAPAS, ConfiguracionPipeline, ejecutar_pipeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera el dataset unificado de viviendas por bloques y en paralelo '
+        '(unificar, limpiar, validar) y lo escribe en Parquet particionado por distrito'
+    )
+
+    def add_arguments(self, parser):
+        datos = Path(settings.DATA_PATH)
+        parser.add_argument(
+            '--entrada', default=str(datos / 'madrid_houses_clean.csv'),
+            help='CSV principal, leído por bloques (por defecto data/madrid_houses_clean.csv)',
+        )
+        parser.add_argument(
+            '--coordenadas', default=str(datos / 'lat_lon_houses_Madrid_cleaned.csv'),
+            help='CSV con id, latitude, longitude y address',
+        )
+        parser.add_argument('--crudo', help='Volcado original de Idealista (houses_Madrid.csv), opcional')
+        parser.add_argument(
+            '--salida', default=str(datos / 'processed' / 'houses'),
+            help='Directorio del dataset Parquet (por defecto data/processed/houses)',
+        )
+        parser.add_argument(
+            '--cuarentena',
+            help='Directorio Parquet de las filas que no pasan la validación (por defecto data/processed/cuarentena)',
+        )
+        parser.add_argument('--csv-salida', help='Escribe además el resultado unificado en este CSV')
+        parser.add_argument('--chunk-size', type=int, default=100_000, help='Filas por bloque')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Procesos del pool')
+        parser.add_argument('--sobrescribir', action='store_true', help='Reemplaza el directorio de salida')
+
+    def handle(self, *args, **options):
+        for opcion in ('entrada', 'coordenadas', 'crudo'):
+            if options[opcion] and not Path(options[opcion]).exists():
+                raise CommandError(f'No existe el fichero {options[opcion]}')
+
+        config = ConfiguracionPipeline(
+            entrada=Path(options['entrada']),
+            coordenadas=Path(options['coordenadas']),
+            salida=Path(options['salida']),
+            crudo=Path(options['crudo']) if options['crudo'] else None,
+            csv_salida=Path(options['csv_salida']) if options['csv_salida'] else None,
+            chunksize=options['chunk_size'],
+            workers=options['workers'],
+            sobrescribir=options['sobrescribir'],
+            cuarentena=Path(options['cuarentena']) if options['cuarentena'] else None,
+        )
+        self.stdout.write(f'⚙️ Procesando {config.entrada.name} con {config.workers} procesos...')
+
+        def progreso(resultado):
+            self.stdout.write(
+                f'  bloque {resultado.bloques}: {resultado.leidas} filas leídas '
+                f'({resultado.filas_por_segundo:,.0f} filas/s)'
+            )
+
+        try:
+            resultado = ejecutar_pipeline(config, progreso=progreso)
+        except (ValueError, FileExistsError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write('⏱️ Tiempo por etapa (suma de todos los procesos):')
+        for etapa in ETAPAS:
+            self.stdout.write(f'  {etapa:<9} {resultado.tiempos[etapa]:.2f}s')
+        if resultado.motivos:
+            self.stdout.write(f'🚧 Cuarentena en {config.cuarentena}:')
+            for codigo, filas in sorted(resultado.motivos.items(), key=lambda item: -item[1]):
+                self.stdout.write(f'  {codigo:<24} {filas}')
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {resultado.escritas} viviendas en {config.salida}: {resultado.duplicadas} duplicadas, '
+            f'{resultado.sin_coordenadas} sin coordenadas, {resultado.cuarentena} en cuarentena; '
+            f'{resultado.segundos:.1f}s ({resultado.filas_por_segundo:,.0f} filas/s)'
+        ))
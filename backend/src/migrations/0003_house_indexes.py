@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0002_remove_house_location'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['buy_price'], name='house_buy_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['rent_price'], name='house_rent_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['latitude', 'longitude'], name='house_lat_lon_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['updated_at'], name='house_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['district', 'buy_price'], name='house_district_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['neighborhood', 'buy_price'], name='house_neigh_price_idx'),
+        ),
+    ]
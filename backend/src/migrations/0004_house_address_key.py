@@ -0,0 +1,85 @@
+import logging
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+# Copia congelada de src.utils.addresses.clave_direccion tal como era al crear la migración:
+# si la función cambia después, esta migración debe seguir dando las mismas claves
+_ESPACIOS_RE = re.compile(r'\s+')
+
+
+def normalizar_texto(valor):
+    if valor is None:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(valor)).encode('ascii', 'ignore').decode('ascii')
+    return _ESPACIOS_RE.sub(' ', texto).strip().lower()
+
+
+def clave_direccion(street_name, street_number, portal):
+    return '|'.join(normalizar_texto(v) for v in (street_name, street_number, portal))
+
+
+def rellenar_address_key(apps, schema_editor):
+    """
+    Calcula la clave de las filas existentes. No borra nada: las filas sin calle no tienen
+    dirección que compartir y reciben una clave propia con su id ('sin-calle#<id>'); las que
+    repiten una dirección ya vista (se queda la más antigua) se conservan con '<clave>#<id>'
+    y se anotan en el log. La siguiente importación completa da de baja las que no vengan en
+    el CSV, con su DatasetVersion.
+    """
+    House = apps.get_model('src', 'House')
+    vistas = set()
+    duplicadas = []
+    sin_calle = 0
+    pendientes = []
+    filas = House.objects.order_by('id').values_list('id', 'street_name', 'street_number', 'portal')
+    for id_, street_name, street_number, portal in filas.iterator(chunk_size=5000):
+        clave = clave_direccion(street_name, street_number, portal)
+        if not normalizar_texto(street_name):
+            clave = f'sin-calle#{id_}'
+            sin_calle += 1
+        elif clave in vistas:
+            duplicadas.append(id_)
+            clave = f'{clave[:380]}#{id_}'
+        else:
+            vistas.add(clave)
+        pendientes.append(House(id=id_, address_key=clave))
+        if len(pendientes) >= 5000:
+            House.objects.bulk_update(pendientes, ['address_key'], batch_size=500)
+            pendientes = []
+    House.objects.bulk_update(pendientes, ['address_key'], batch_size=500)
+    if sin_calle:
+        logger.warning('address_key: %d viviendas sin calle con clave propia (sin-calle#<id>)', sin_calle)
+    if duplicadas:
+        logger.warning(
+            'address_key: %d viviendas repiten una dirección anterior y se conservan con <clave>#<id>: ids %s',
+            len(duplicadas), ', '.join(map(str, duplicadas)),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0003_house_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='house',
+            name='address_key',
+            field=models.CharField(editable=False, max_length=400, null=True),
+        ),
+        migrations.RunPython(rellenar_address_key, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='house',
+            name='address_key',
+            field=models.CharField(editable=False, max_length=400),
+        ),
+        migrations.AddConstraint(
+            model_name='house',
+            constraint=models.UniqueConstraint(fields=('address_key',), name='house_address_key_uniq'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0004_house_address_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.PositiveIntegerField(unique=True)),
+                ('fichero', models.CharField(max_length=255)),
+                ('huella', models.CharField(max_length=64)),
+                ('nuevas', models.PositiveIntegerField(default=0)),
+                ('modificadas', models.PositiveIntegerField(default=0)),
+                ('sin_cambios', models.PositiveIntegerField(default=0)),
+                ('eliminadas', models.PositiveIntegerField(default=0)),
+                ('cambios', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'src_dataset_version',
+                'ordering': ['numero'],
+            },
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='content_hash',
+            field=models.CharField(default='', editable=False, max_length=16),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0005_dataset_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuarantinedHouse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origen', models.CharField(max_length=255)),
+                ('clave', models.CharField(max_length=16)),
+                ('motivos', models.CharField(max_length=255)),
+                ('datos', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'src_house_quarantine',
+                'constraints': [models.UniqueConstraint(fields=('origen', 'clave'), name='quarantine_origen_clave_uniq')],
+            },
+        ),
+    ]
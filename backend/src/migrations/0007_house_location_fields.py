@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0006_house_quarantine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='house',
+            name='district_name',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='house_type_name',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='neighborhood_name',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='neighborhood_price_m2',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0007_house_location_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='house',
+            name='subtitle',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='title',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -1,2 +1,4 @@
 
-from .houses import House
\ No newline at end of file
+from .houses import House
+from .datasets import DatasetVersion
+from .quarantine import QuarantinedHouse
@@ -0,0 +1,49 @@
+from django.db import models
+
+
+class DatasetVersion(models.Model):
+    """
+    Versión del dataset de viviendas: se crea una por cada importación que cambia algo.
+    `cambios` guarda los ids afectados para que los precálculos (clusters, agregados,
+    predicciones) se actualicen solo sobre lo que ha cambiado.
+    """
+    numero = models.PositiveIntegerField(unique=True)
+    fichero = models.CharField(max_length=255)
+    huella = models.CharField(max_length=64)  # sha256 del CSV importado
+    nuevas = models.PositiveIntegerField(default=0)
+    modificadas = models.PositiveIntegerField(default=0)
+    sin_cambios = models.PositiveIntegerField(default=0)
+    eliminadas = models.PositiveIntegerField(default=0)
+    # {'nuevas': [ids], 'modificadas': [ids], 'eliminadas': [ids]}
+    cambios = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'src_dataset_version'
+        ordering = ['numero']
+
+    @classmethod
+    def actual(cls):
+        """Número de la última versión (0 si nunca se ha importado)."""
+        ultima = cls.objects.order_by('-numero').values_list('numero', flat=True).first()
+        return ultima or 0
+
+    @classmethod
+    def cambios_desde(cls, numero):
+        """
+        Cambios acumulados de las versiones posteriores a `numero`, para consumidores que
+        se han saltado alguna. Un id dado de baja deja de figurar como nuevo o modificado.
+        """
+        nuevas, modificadas, eliminadas = set(), set(), set()
+        for cambios in cls.objects.filter(numero__gt=numero).values_list('cambios', flat=True):
+            nuevas.update(cambios.get('nuevas', []))
+            modificadas.update(cambios.get('modificadas', []))
+            eliminadas.update(cambios.get('eliminadas', []))
+        return {
+            'nuevas': sorted(nuevas - eliminadas),
+            'modificadas': sorted(modificadas - nuevas - eliminadas),
+            'eliminadas': sorted(eliminadas),
+        }
+
+    def __str__(self):
+        return f'v{self.numero} ({self.fichero})'
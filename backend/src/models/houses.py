@@ -1,5 +1,43 @@
 from django.db import models
 
+from src.models.datasets import DatasetVersion
+from src.utils.addresses import PREFIJO_SIN_CALLE, clave_direccion, normalizar_texto
+
+# Columnas que devuelve el listado de propiedades de la API
+CAMPOS_LISTADO = (
+    'id', 'latitude', 'longitude', 'address', 'district', 'district_name',
+    'neighborhood', 'neighborhood_name', 'neighborhood_price_m2',
+    'sq_mt_built', 'sq_mt_useful', 'n_rooms', 'n_bathrooms', 'floor', 'built_year',
+    'house_type', 'house_type_name', 'energy_certificate', 'buy_price', 'buy_price_by_area',
+    'rent_price', 'has_lift', 'is_exterior', 'has_parking',
+)
+
+
+class HouseQuerySet(models.QuerySet):
+    def filtrar_listado(self, min_price=None, max_price=None, district=None):
+        """Filtros de PropertyListAPIView; cada uno se apoya en un índice de House (el orden por -id no)."""
+        qs = self
+        if min_price is not None:
+            qs = qs.filter(buy_price__gte=min_price)
+        if max_price is not None:
+            qs = qs.filter(buy_price__lte=max_price)
+        if district:
+            qs = qs.filter(district=district)
+        return qs
+
+    def firma(self):
+        """
+        Firma barata del contenido de la tabla: máximos de id y updated_at (ambos indexados) y
+        la DatasetVersion vigente, que registra las bajas del importador (no mueven los máximos).
+        """
+        maximos = self.aggregate(ultimo_id=models.Max('id'), ultima_modificacion=models.Max('updated_at'))
+        return f"{maximos['ultimo_id']}@{maximos['ultima_modificacion']}#v{DatasetVersion.actual()}"
+
+    def listado(self, limit):
+        """Primeras `limit` filas como diccionarios, sin instanciar modelos."""
+        return list(self.order_by('-id').values(*CAMPOS_LISTADO)[:limit])
+
+
 class House(models.Model):
     # Identificador único
     id = models.AutoField(primary_key=True)
@@ -23,12 +61,22 @@ class House(models.Model):
     neighborhood = models.CharField(max_length=255, blank=True, null=True)
     district = models.CharField(max_length=255, blank=True, null=True)
     house_type = models.CharField(max_length=50, blank=True, null=True)
+    # Separados de neighborhood_id / house_type_id al importar (src.utils.locations)
+    neighborhood_name = models.CharField(max_length=255, blank=True, null=True)
+    neighborhood_price_m2 = models.FloatField(blank=True, null=True)
+    district_name = models.CharField(max_length=255, blank=True, null=True)
+    house_type_name = models.CharField(max_length=50, blank=True, null=True)
     sq_mt_useful = models.FloatField(blank=True, null=True)
     raw_address = models.TextField(blank=True, null=True)
+    # Texto del anuncio ('Piso en venta en calle X' / 'Barrio, Madrid'), indexado por /api/search/
+    title = models.CharField(max_length=255, blank=True, null=True)
+    subtitle = models.CharField(max_length=255, blank=True, null=True)
     is_exact_address_hidden = models.BooleanField(default=False)
     street_name = models.CharField(max_length=255, blank=True, null=True)
     street_number = models.CharField(max_length=50, blank=True, null=True)
     portal = models.CharField(max_length=50, blank=True, null=True)
+    # Clave normalizada calle|número|portal, única: identifica la vivienda en las reimportaciones
+    address_key = models.CharField(max_length=400, editable=False)
     is_floor_under = models.BooleanField(default=False)
     door = models.CharField(max_length=50, blank=True, null=True)
     operation = models.CharField(max_length=50, blank=True, null=True)
@@ -63,11 +111,34 @@ class House(models.Model):
     is_orientation_east = models.BooleanField(default=False)
 
     # Metadatos
+    # Hash del contenido importado: si no cambia, la reimportación no toca la fila
+    content_hash = models.CharField(max_length=16, editable=False, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = HouseQuerySet.as_manager()
+
     class Meta:
         db_table = 'src_house'
+        indexes = [
+            models.Index(fields=['buy_price'], name='house_buy_price_idx'),
+            models.Index(fields=['rent_price'], name='house_rent_price_idx'),
+            models.Index(fields=['latitude', 'longitude'], name='house_lat_lon_idx'),
+            models.Index(fields=['updated_at'], name='house_updated_at_idx'),
+            # Compuestos: filtro por zona + rango de precio resuelto solo con el índice.
+            # Al empezar por district / neighborhood sirven también para la igualdad sola.
+            models.Index(fields=['district', 'buy_price'], name='house_district_price_idx'),
+            models.Index(fields=['neighborhood', 'buy_price'], name='house_neigh_price_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['address_key'], name='house_address_key_uniq'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Una vivienda sin calle conserva su clave (la del importador o la de la migración)
+        if normalizar_texto(self.street_name) or not (self.address_key or '').startswith(PREFIJO_SIN_CALLE):
+            self.address_key = clave_direccion(self.street_name, self.street_number, self.portal, self.pk)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.address
\ No newline at end of file
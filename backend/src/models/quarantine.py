@@ -0,0 +1,22 @@
+from django.db import models
+
+
+class QuarantinedHouse(models.Model):
+    """
+    Anuncio rechazado por las reglas de src.utils.validation. Se guarda la fila tal y
+    como llegó, con los códigos de motivo, para revisarla en vez de perderla.
+    """
+    origen = models.CharField(max_length=255)  # fichero del que procede
+    clave = models.CharField(max_length=16)  # hash del contenido: evita duplicados al reimportar
+    motivos = models.CharField(max_length=255)  # códigos separados por comas
+    datos = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'src_house_quarantine'
+        constraints = [
+            models.UniqueConstraint(fields=['origen', 'clave'], name='quarantine_origen_clave_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.origen}: {self.motivos}'
@@ -3,6 +3,22 @@ from . import api_views
 
 urlpatterns = [
     path('properties/', api_views.PropertyListAPIView.as_view(), name='api-properties'),
+    path('properties/facets/', api_views.PropertyFacetsAPIView.as_view(), name='api-properties-facets'),
+    path('properties/nearby/', api_views.NearbyPropertiesAPIView.as_view(), name='api-properties-nearby'),
+    path('properties/bbox/', api_views.BBoxPropertiesAPIView.as_view(), name='api-properties-bbox'),
     path('clustering/', api_views.ClusteringAPIView.as_view(), name='api-clustering'),
     path('predict/', api_views.PredictAPIView.as_view(), name='api-predict'),
+    path('search/', api_views.SearchAPIView.as_view(), name='api-search'),
+    path('search/autocomplete/', api_views.AutocompleteAPIView.as_view(), name='api-search-autocomplete'),
+    path('comps/', api_views.CompsAPIView.as_view(), name='api-comps'),
+    path('causal/', api_views.CausalGraphAPIView.as_view(), name='api-causal'),
+    path('tiles/<int:z>/<int:x>/<int:y>/', api_views.TileAPIView.as_view(), name='api-tiles'),
+    path('heatmap/<int:z>/<int:x>/<int:y>/', api_views.HeatmapAPIView.as_view(), name='api-heatmap'),
+    path(
+        'heatmap/<int:z>/<int:x>/<int:y>.png', api_views.HeatmapAPIView.as_view(), {'formato': 'png'},
+        name='api-heatmap-png',
+    ),
+    path('market/stats/', api_views.MarketStatsAPIView.as_view(), name='api-market-stats'),
+    path('meta/locations/', api_views.LocationsMetaAPIView.as_view(), name='api-meta-locations'),
+    path('geo/reverse/', api_views.ReverseGeocodingAPIView.as_view(), name='api-geo-reverse'),
 ]
\ No newline at end of file
@@ -2,34 +2,150 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.conf import settings
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
 import pandas as pd
 import joblib
 from pathlib import Path
 import numpy as np
+from src.models.houses import CAMPOS_LISTADO, House
+from src.services.versioning import MODELOS_KMEANS, condicional, dataset_path, firma_datos
+from src.services.compression import lectura_comprimida
+from src.services.bitmaps import indice_bitmap
+from src.services.causal import RESULTADOS_PCMCI, grafo_causal
+from src.services.comps import PREPROCESADOR_PRECIO, motor_comparables
+from src.services.geo import geocodificador
+from src.services.heatmap import piramide
+from src.services.location_meta import artefacto as metadatos_ubicacion, version_ubicaciones
+from src.services.market import cubo
+from src.services.search import CAMPOS_RESULTADO, indice_texto
+from src.services.spatial import indice_espacial
+from src.services.tiles import PROPIEDADES_TESELA, indice_teselas
+from src.utils.bitmaps import CATEGORICAS, EQUIPAMIENTO as EQUIPAMIENTO_BITMAP, contar
+from src.utils.comps import EQUIPAMIENTO, NUMERICAS_COMPS, pesos_completos
+from src.utils.heatmap import BITS_RASTER, MAX_BITS_RASTER, METRICAS, colorear, png
+from src.utils.locations import leer_viviendas_csv
+from src.utils.market import DIMENSIONES, registros
+from src.utils.spatial import rectangulo_valido
+from src.utils.tiles import tesela_valida
 
+# Valores aceptados en los parámetros booleanos (?has_lift=1, ?has_pool=false...)
+VERDADERO = ('1', 'true', 'yes', 'si', 'sí')
+FALSO = ('0', 'false', 'no')
+
+
+def filtros_bitmap(parametros):
+    """
+    Filtros de equipamiento y categorías de la petición para IndiceBitmap.filtrar:
+    ?has_pool=1&has_lift=0 (cada variable de equipamiento), ?energy_certificate=A,B y
+    ?n_rooms=3,4 (uno de los valores) y ?any=has_garden,has_terrace (al menos una).
+    None si no hay ninguno; ValueError si un valor no es válido.
+    """
+    equipamiento = {}
+    for columna in EQUIPAMIENTO_BITMAP:
+        valor = parametros.get(columna)
+        if valor is None or valor == '':
+            continue
+        if valor.lower() not in (*VERDADERO, *FALSO):
+            raise ValueError(f'{columna} debe ser verdadero o falso')
+        equipamiento[columna] = valor.lower() in VERDADERO
+    categorias = {
+        columna: [valor.strip() for valor in parametros[columna].split(',')]
+        for columna in CATEGORICAS if columna != 'district' and parametros.get(columna)
+    }
+    alguno = [columna.strip() for columna in parametros.get('any', '').split(',') if columna.strip()]
+    if not (equipamiento or categorias or alguno):
+        return None
+    return {'equipamiento': equipamiento, 'categorias': categorias, 'alguno': alguno}
+
+
+@method_decorator(lectura_comprimida(firmas=(firma_datos,)), name='dispatch')
 class PropertyListAPIView(APIView):
     def get(self, request):
         try:
-            data_path = Path(settings.BASE_DIR) / 'data' / 'unified_houses_madrid.csv'
-            df = pd.read_csv(data_path)
+            filtros = filtros_bitmap(request.GET)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        try:
             # Filtros
             min_price = request.GET.get('min_price')
             max_price = request.GET.get('max_price')
             district = request.GET.get('district')
+            limit = min(int(request.GET.get('limit', 1000)), 2000)
+            if filtros:
+                return self.con_bitmaps(filtros, min_price, max_price, district, limit)
+            if House.objects.exists():
+                # Con la tabla cargada se filtra en la base de datos: los índices de buy_price y
+                # (district, buy_price) acotan las filas, pero ninguno cubre además el orden por -id
+                properties = House.objects.filtrar_listado(
+                    min_price=float(min_price) if min_price else None,
+                    max_price=float(max_price) if max_price else None,
+                    district=district if district != 'Todos' else None,
+                ).listado(limit)
+                return Response({'count': len(properties), 'properties': properties})
+            # Sin la tabla, del CSV: los mismos campos y el mismo orden que listado()
+            df = leer_viviendas_csv(dataset_path(), CAMPOS_LISTADO)
             if min_price:
                 df = df[df['buy_price'] >= float(min_price)]
             if max_price:
                 df = df[df['buy_price'] <= float(max_price)]
             if district and district != 'Todos':
                 df = df[df['district'] == district]
-            limit = min(int(request.GET.get('limit', 1000)), 2000)
-            df = df.head(limit)
+            df = df.sort_values('id', ascending=False).head(limit)
             # 🔧 Limpia NaN, inf, -inf antes de convertir a dict (JSON compliant)
             df = df.replace([np.nan, np.inf, -np.inf], None)
             return Response({'count': len(df), 'properties': df.to_dict('records')})
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
+    def con_bitmaps(self, filtros, min_price, max_price, district, limit):
+        """Listado resuelto con el índice de bitmaps; `total` es el nº de viviendas que cumplen los filtros."""
+        if district and district != 'Todos':
+            filtros['categorias']['district'] = district.split(',')
+        indice = indice_bitmap()
+        try:
+            bitmap = indice.filtrar(
+                **filtros,
+                min_price=float(min_price) if min_price else None,
+                max_price=float(max_price) if max_price else None,
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        ids = indice.ids_de(bitmap, limit)
+        if House.objects.exists():
+            properties = House.objects.filter(id__in=ids.tolist()).listado(limit)
+        else:
+            df = leer_viviendas_csv(dataset_path(), CAMPOS_LISTADO)
+            df = df[df['id'].isin(ids)].sort_values('id', ascending=False).head(limit)
+            properties = df.replace([np.nan, np.inf, -np.inf], None).to_dict('records')
+        return Response({'count': len(properties), 'total': contar(bitmap), 'properties': properties})
+
+
+@method_decorator(lectura_comprimida(firmas=(firma_datos,)), name='dispatch')
+class PropertyFacetsAPIView(APIView):
+    """
+    Recuentos por district, neighborhood, n_rooms, n_bathrooms, house_type, energy_certificate y
+    cada variable de equipamiento bajo los mismos filtros que /api/properties/.
+    """
+
+    def get(self, request):
+        try:
+            filtros = filtros_bitmap(request.GET) or {'equipamiento': {}, 'categorias': {}, 'alguno': []}
+            district = request.GET.get('district')
+            if district and district != 'Todos':
+                filtros['categorias']['district'] = district.split(',')
+            for limite in ('min_price', 'max_price'):
+                filtros[limite] = float(request.GET[limite]) if request.GET.get(limite) else None
+            facetas = indice_bitmap().facetas(**filtros)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        return Response({
+            'total': facetas['total'],
+            'facets': {**facetas['categorias'], 'amenities': facetas['equipamiento']},
+        })
+
+@method_decorator(lectura_comprimida(modelos=('kmeans_model.joblib',)), name='dispatch')
 class ClusteringAPIView(APIView):
     def get(self, request):
         try:
@@ -79,6 +195,7 @@ class PredictAPIView(APIView):
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
+@method_decorator(condicional(), name='get')
 class PropertiesAPIView(APIView):
     def get(self, request):
         try:
@@ -88,4 +205,353 @@ class PropertiesAPIView(APIView):
             df = df.replace([np.nan, np.inf, -np.inf], None)
             return Response({'count': len(df), 'properties': df.to_dict('records')})
         except Exception as e:
-            return Response({'error': str(e)}, status=500)
\ No newline at end of file
+            return Response({'error': str(e)}, status=500)
+
+# Límites de la búsqueda por cercanía y por rectángulo
+MAX_RADIO_M = 10000
+VECINOS_POR_DEFECTO = 50
+MAX_VECINOS = 1000
+MAX_RESULTADOS_RECTANGULO = 2000
+
+
+@method_decorator(lectura_comprimida(firmas=(firma_datos,)), name='dispatch')
+class NearbyPropertiesAPIView(APIView):
+    """Viviendas cercanas a ?lat=&lon=, de la más cercana a la más lejana: ?radius= en metros y/o ?k="""
+
+    def get(self, request):
+        try:
+            lat, lon = float(request.GET['lat']), float(request.GET['lon'])
+            radio = float(request.GET['radius']) if request.GET.get('radius') else None
+            k = int(request.GET.get('k', VECINOS_POR_DEFECTO))
+        except (KeyError, ValueError):
+            return Response({'error': 'Parámetros lat y lon numéricos obligatorios; radius numérico y k entero'}, status=400)
+        if not (np.isfinite(lat) and np.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180):
+            return Response({'error': 'Coordenadas no válidas'}, status=400)
+        if radio is not None and not 0 < radio <= MAX_RADIO_M:
+            return Response({'error': f'radius debe estar entre 0 y {MAX_RADIO_M} metros'}, status=400)
+        if not 1 <= k <= MAX_VECINOS:
+            return Response({'error': f'k debe estar entre 1 y {MAX_VECINOS}'}, status=400)
+        indice = indice_espacial()
+        posiciones, distancias = indice.cercanas(lat, lon, radio=radio, k=k)
+        return Response({
+            'center': {'lat': lat, 'lon': lon},
+            'radius': radio,
+            'k': k,
+            'count': len(posiciones),
+            'properties': indice.registros(posiciones, distancias),
+        })
+
+
+@method_decorator(lectura_comprimida(firmas=(firma_datos,)), name='dispatch')
+class BBoxPropertiesAPIView(APIView):
+    """Viviendas dentro de ?bbox=oeste,sur,este,norte (grados), desde el centro hacia fuera; ?limit="""
+
+    def get(self, request):
+        try:
+            oeste, sur, este, norte = (float(valor) for valor in request.GET['bbox'].split(','))
+            limite = min(int(request.GET.get('limit', 1000)), MAX_RESULTADOS_RECTANGULO)
+        except (KeyError, ValueError):
+            return Response({'error': 'Parámetro bbox=oeste,sur,este,norte obligatorio y limit entero'}, status=400)
+        if not rectangulo_valido(oeste, sur, este, norte) or limite < 1:
+            return Response({'error': 'bbox no válido: oeste < este y sur < norte, en grados'}, status=400)
+        indice = indice_espacial()
+        posiciones = indice.en_rectangulo(oeste, sur, este, norte)
+        return Response({
+            'bbox': [oeste, sur, este, norte],
+            'count': len(posiciones),
+            'returned': min(len(posiciones), limite),
+            'properties': indice.registros(posiciones[:limite]),
+        })
+
+
+# Puntos por petición en la consulta por lotes
+MAX_PUNTOS_GEOCODIFICACION = 10000
+
+
+class ReverseGeocodingAPIView(APIView):
+    """Distrito y barrio de unas coordenadas: GET ?lat=&lon= o POST {"puntos": [[lat, lon], ...]}"""
+
+    def get(self, request):
+        try:
+            lat, lon = float(request.GET['lat']), float(request.GET['lon'])
+        except (KeyError, ValueError):
+            return Response({'error': 'Parámetros lat y lon numéricos obligatorios'}, status=400)
+        if not (np.isfinite(lat) and np.isfinite(lon)):
+            return Response({'error': 'Coordenadas no válidas'}, status=400)
+        ubicacion = geocodificador().ubicar(lat, lon)
+        if ubicacion is None:
+            return Response({'error': 'Las coordenadas no corresponden a Madrid'}, status=404)
+        return Response(ubicacion)
+
+    def post(self, request):
+        puntos = request.data.get('puntos') if isinstance(request.data, dict) else None
+        if not isinstance(puntos, list) or len(puntos) > MAX_PUNTOS_GEOCODIFICACION:
+            return Response(
+                {'error': f'Se espera "puntos": lista de como mucho {MAX_PUNTOS_GEOCODIFICACION} pares [lat, lon]'},
+                status=400,
+            )
+        try:
+            coordenadas = np.array(puntos, dtype='float64').reshape(-1, 2)
+        except (TypeError, ValueError):
+            return Response({'error': 'Cada punto debe ser un par [lat, lon] numérico'}, status=400)
+        ubicaciones = geocodificador().consultar(coordenadas[:, 0], coordenadas[:, 1])
+        ubicaciones = ubicaciones.replace([np.nan], None).to_dict('records')
+        # Fuera de cobertura: null en vez de un registro con todo a null
+        return Response({
+            'count': len(ubicaciones),
+            'resultados': [ubicacion if ubicacion['district'] is not None else None for ubicacion in ubicaciones],
+        })
+
+
+@method_decorator(condicional(modelos=(RESULTADOS_PCMCI,)), name='get')
+class CausalGraphAPIView(APIView):
+    """Enlaces del grafo PCMCI; filtros ?variable=, ?lag=, ?min_strength= y ?link= (-->, o-o)"""
+
+    def get(self, request):
+        grafo = grafo_causal()
+        variable = request.GET.get('variable') or None
+        if variable is not None and variable not in grafo.variables:
+            return Response({'error': f'Variable desconocida: {variable}', 'variables': list(grafo.variables)}, status=400)
+        try:
+            lag = int(request.GET['lag']) if request.GET.get('lag') else None
+            fuerza_min = float(request.GET.get('min_strength', 0))
+        except ValueError:
+            return Response({'error': 'lag debe ser entero y min_strength numérico'}, status=400)
+        enlaces = grafo.enlaces(variable=variable, lag=lag, fuerza_min=fuerza_min, tipo=request.GET.get('link') or None)
+        return Response({'variables': list(grafo.variables), 'count': len(enlaces), 'edges': enlaces})
+
+
+@method_decorator(lectura_comprimida(modelos=MODELOS_KMEANS, firmas=(firma_datos,)), name='dispatch')
+class TileAPIView(APIView):
+    """
+    GeoJSON de la tesela z/x/y: viviendas sueltas desde el zoom 15 y puntos agregados por debajo.
+    Filtros: ?cluster= (repetible), ?min_price=, ?max_price=, ?district= (repetible).
+    """
+
+    def get(self, request, z, x, y):
+        if not tesela_valida(z, x, y):
+            return Response({'error': f'Tesela fuera de rango: {z}/{x}/{y}'}, status=400)
+        try:
+            filtros = {}
+            if request.GET.getlist('cluster'):
+                filtros['cluster'] = [int(cluster) for cluster in request.GET.getlist('cluster')]
+            precios = [request.GET.get(clave) for clave in ('min_price', 'max_price')]
+            if any(precios):
+                filtros['buy_price'] = tuple(float(precio) if precio else None for precio in precios)
+        except ValueError:
+            return Response({'error': 'cluster debe ser entero y min_price / max_price numéricos'}, status=400)
+        distritos = [d for d in request.GET.getlist('district') if d and d != 'Todos']
+        if distritos:
+            filtros['district'] = distritos
+        return Response(indice_teselas().geojson(z, x, y, filtros, PROPIEDADES_TESELA))
+
+
+@method_decorator(lectura_comprimida(firmas=(firma_datos,)), name='dispatch')
+class HeatmapAPIView(APIView):
+    """
+    Mapa de calor de la tesela z/x/y desde la pirámide de rejillas: PNG (ruta .png) o arrays JSON.
+    ?metric= una de METRICAS (price_m2_median por defecto); ?detail= celdas por lado en potencias de 2.
+    """
+
+    def get(self, request, z, x, y, formato='json'):
+        if not tesela_valida(z, x, y):
+            return Response({'error': f'Tesela fuera de rango: {z}/{x}/{y}'}, status=400)
+        metrica = request.GET.get('metric', 'price_m2_median')
+        if metrica not in METRICAS:
+            return Response({'error': f'Métrica desconocida: {metrica}', 'metrics': list(METRICAS)}, status=400)
+        try:
+            detalle = int(request.GET.get('detail', BITS_RASTER))
+        except ValueError:
+            detalle = -1
+        if not 0 <= detalle <= MAX_BITS_RASTER:
+            return Response({'error': f'detail debe estar entre 0 y {MAX_BITS_RASTER}'}, status=400)
+
+        rejillas = piramide()
+        try:
+            nivel = rejillas.nivel_raster(z, detalle)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        valores = rejillas.rejilla(z, x, y, metrica, detalle)
+        minimo, maximo = rejillas.escala(nivel, metrica)
+        if formato == 'png':
+            # Teselas de 256 px: cada celda se repite en un bloque de píxeles
+            # La escala de color (percentiles 2-98 del nivel) es la `scale` de la variante JSON
+            imagen = png(colorear(valores, minimo, maximo), escala=max(1, 256 // len(valores)))
+            return HttpResponse(imagen, content_type='image/png')
+        return Response({
+            'tile': {'z': z, 'x': x, 'y': y},
+            'level': nivel,
+            'metric': metrica,
+            'size': len(valores),
+            'scale': [round(minimo, 2), round(maximo, 2)],
+            # Filas de norte a sur, columnas de oeste a este; null donde no hay viviendas
+            'values': [[None if v != v else round(v, 2) for v in fila] for fila in valores.tolist()],
+        })
+
+
+@method_decorator(lectura_comprimida(firmas=(firma_datos,)), name='dispatch')
+class MarketStatsAPIView(APIView):
+    """
+    Estadísticas precalculadas del mercado: recuento y percentiles 25/50/75 de buy_price, price_m2,
+    rent_price y gross_yield. ?group_by= dimensiones separadas por comas (district, neighborhood,
+    n_rooms, house_type; sin ellas, el total de Madrid) y filtros ?district=4&n_rooms=2,3.
+    """
+
+    def get(self, request):
+        agrupar = [dimension.strip() for dimension in request.GET.get('group_by', '').split(',') if dimension.strip()]
+        filtros = {
+            dimension: [valor.strip() for valor in request.GET[dimension].split(',') if valor.strip()]
+            for dimension in DIMENSIONES if request.GET.get(dimension) and request.GET[dimension] != 'Todos'
+        }
+        try:
+            tabla = cubo().consultar(agrupar, filtros)
+        except ValueError as e:
+            return Response({'error': str(e), 'dimensions': list(DIMENSIONES)}, status=400)
+        return Response({'group_by': agrupar, 'count': len(tabla), 'stats': registros(tabla)})
+
+
+# Los metadatos solo cambian con una importación: los clientes revalidan una vez al día con el ETag
+MAX_AGE_UBICACIONES = 24 * 60 * 60
+
+
+@method_decorator(cache_control(public=True, max_age=MAX_AGE_UBICACIONES), name='dispatch')
+@method_decorator(lectura_comprimida(firmas=(version_ubicaciones,)), name='dispatch')
+class LocationsMetaAPIView(APIView):
+    """
+    Distritos con sus barrios: código, nombre, nº de viviendas, centroide [lat, lon], rectángulo
+    [oeste, sur, este, norte] y €/m² medio. El JSON compilado en el build, con su `version`.
+    """
+
+    def get(self, request):
+        return HttpResponse(metadatos_ubicacion()[1], content_type='application/json')
+
+
+# Comparables por petición
+COMPARABLES_POR_DEFECTO = 10
+MAX_COMPARABLES = 100
+CAMPOS_COMPARABLE = ['id', 'address', 'buy_price', *NUMERICAS_COMPS]
+
+
+@method_decorator(
+    lectura_comprimida(modelos=(PREPROCESADOR_PRECIO,), firmas=(firma_datos,)), name='dispatch',
+)
+class CompsAPIView(APIView):
+    """
+    Las ?k= viviendas más parecidas a una del dataset (?id=) o a una descrita con ?lat=&lon=&sq_mt_built=
+    y opcionalmente n_rooms, n_bathrooms, built_year, floor y el equipamiento (has_lift=1...).
+    ?weights=location:3,sq_mt_built:2 cambia el peso de cada grupo de variables.
+    """
+
+    def get(self, request):
+        motor = motor_comparables()
+        try:
+            k = int(request.GET.get('k', COMPARABLES_POR_DEFECTO))
+            pesos = {}
+            for par in filter(None, request.GET.get('weights', '').split(',')):
+                grupo, peso = par.split(':')
+                pesos[grupo.strip()] = float(peso)
+        except ValueError:
+            return Response({'error': 'k debe ser entero y weights una lista grupo:peso'}, status=400)
+        if not 1 <= k <= MAX_COMPARABLES:
+            return Response({'error': f'k debe estar entre 1 y {MAX_COMPARABLES}'}, status=400)
+        try:
+            pesos = pesos_completos(pesos)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        vivienda_id = request.GET.get('id')
+        if vivienda_id:
+            try:
+                sujeto = motor.sujeto(int(vivienda_id))
+            except (KeyError, ValueError):
+                return Response({'error': f'No existe la vivienda {vivienda_id}'}, status=404)
+            excluir = sujeto['id']
+        else:
+            sujeto = {}
+            try:
+                for campo in NUMERICAS_COMPS:
+                    if request.GET.get(campo):
+                        sujeto[campo] = float(request.GET[campo])
+            except ValueError:
+                return Response({'error': 'Las variables numéricas del sujeto deben ser números'}, status=400)
+            if not {'latitude', 'longitude', 'sq_mt_built'} <= set(sujeto):
+                return Response(
+                    {'error': 'Indica ?id= o al menos latitude, longitude y sq_mt_built del sujeto'}, status=400,
+                )
+            for campo in EQUIPAMIENTO:
+                sujeto[campo] = request.GET.get(campo, '').lower() in VERDADERO
+            excluir = None
+
+        try:
+            posiciones, distancias = motor.buscar(sujeto, k=k, pesos=pesos, excluir_id=excluir)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        estimacion, similitud = motor.estimar(posiciones, distancias, sujeto.get('sq_mt_built'))
+        comparables = motor.registros(posiciones, CAMPOS_COMPARABLE)
+        for comparable, distancia, parecido in zip(comparables, distancias.tolist(), similitud.tolist()):
+            comparable.update(distance=round(distancia, 4), similarity=round(parecido, 4))
+        return Response({
+            'subject': sujeto,
+            'weights': pesos,
+            'count': len(comparables),
+            'estimate': {clave: None if valor is None else round(valor, 2) for clave, valor in estimacion.items()},
+            'comps': comparables,
+        })
+
+
+# Resultados por petición de la búsqueda de texto
+RESULTADOS_BUSQUEDA = 20
+MAX_RESULTADOS_BUSQUEDA = 100
+SUGERENCIAS_POR_DEFECTO = 8
+MAX_SUGERENCIAS = 20
+
+
+def _consulta_texto(request, por_defecto, maximo):
+    """(consulta, límite, desplazamiento) de ?q=&limit=&offset=, o un Response 400."""
+    consulta = request.GET.get('q', '').strip()
+    try:
+        limite = int(request.GET.get('limit', por_defecto))
+        desplazamiento = int(request.GET.get('offset', 0))
+    except ValueError:
+        return Response({'error': 'limit y offset deben ser enteros'}, status=400)
+    if not consulta:
+        return Response({'error': 'Parámetro q obligatorio'}, status=400)
+    if not 1 <= limite <= maximo or desplazamiento < 0:
+        return Response({'error': f'limit debe estar entre 1 y {maximo} y offset no ser negativo'}, status=400)
+    return consulta, limite, desplazamiento
+
+
+@method_decorator(lectura_comprimida(firmas=(firma_datos,)), name='dispatch')
+class SearchAPIView(APIView):
+    """Búsqueda de texto (BM25) en direcciones y títulos: ?q=&limit=&offset="""
+
+    def get(self, request):
+        parametros = _consulta_texto(request, RESULTADOS_BUSQUEDA, MAX_RESULTADOS_BUSQUEDA)
+        if isinstance(parametros, Response):
+            return parametros
+        consulta, limite, desplazamiento = parametros
+        indice = indice_texto()
+        posiciones, puntuaciones, total = indice.buscar(consulta, limite=limite, desplazamiento=desplazamiento)
+        return Response({
+            'query': consulta,
+            'count': total,
+            'results': indice.registros(posiciones, puntuaciones, CAMPOS_RESULTADO),
+        })
+
+
+@method_decorator(lectura_comprimida(firmas=(firma_datos,)), name='dispatch')
+class AutocompleteAPIView(APIView):
+    """Sugerencias de dirección para lo que se lleva escrito (?q=, el último token como prefijo); ?limit="""
+
+    def get(self, request):
+        parametros = _consulta_texto(request, SUGERENCIAS_POR_DEFECTO, MAX_SUGERENCIAS)
+        if isinstance(parametros, Response):
+            return parametros
+        consulta, limite, _ = parametros
+        indice = indice_texto()
+        posiciones, puntuaciones, total = indice.autocompletar(consulta, limite=limite)
+        return Response({
+            'query': consulta,
+            'count': total,
+            'suggestions': indice.registros(posiciones, puntuaciones, ['id', 'address', 'neighborhood_name']),
+        })
@@ -0,0 +1,23 @@
+"""
+Índice de bitmaps del proceso para los filtros de equipamiento de /api/properties/
+y las facetas de /api/properties/facets/ (versioning.vigente).
+"""
+import pandas as pd
+
+from src.models.houses import House
+from src.services.versioning import dataset_path, vigente
+from src.utils.bitmaps import COLUMNAS_BITMAP, IndiceBitmap
+from src.utils.locations import leer_viviendas_csv
+
+
+def viviendas_bitmap():
+    """Viviendas con las columnas de COLUMNAS_BITMAP."""
+    if House.objects.exists():
+        return pd.DataFrame.from_records(House.objects.values_list(*COLUMNAS_BITMAP), columns=COLUMNAS_BITMAP)
+    return leer_viviendas_csv(dataset_path(), COLUMNAS_BITMAP)
+
+
+@vigente()
+def indice_bitmap(previo):
+    """IndiceBitmap vigente (se construye la primera vez y cuando cambian los datos)."""
+    return IndiceBitmap(viviendas_bitmap())
@@ -0,0 +1,86 @@
+"""
+Grafo causal de PCMCI (tigramite) para la API.
+Los resultados se cargan una vez por proceso (y de nuevo solo si cambia el fichero) y
+los enlaces se extraen de la matriz `graph` con np.nonzero en vez de recorrer cada
+(var1, var2, lag) en Python. graph[i, j, lag] describe X_i(t - lag) -> X_j(t).
+"""
+from dataclasses import dataclass
+from pathlib import Path
+
+import joblib
+import numpy as np
+from django.conf import settings
+
+from src.services.versioning import checksum_fichero, vigente
+
+RESULTADOS_PCMCI = 'pcmci_results.joblib'
+
+
+@dataclass(frozen=True)
+class GrafoCausal:
+    variables: tuple
+    # Un elemento por enlace, en arrays paralelos
+    origen: np.ndarray
+    destino: np.ndarray
+    lag: np.ndarray
+    tipo: np.ndarray
+    fuerza: np.ndarray
+    p_valor: np.ndarray
+
+    @classmethod
+    def desde_resultados(cls, resultados):
+        graph = np.asarray(resultados['graph']).astype(str)
+        # var_names puede ser un array de numpy, sin valor de verdad
+        nombres = resultados.get('var_names')
+        variables = tuple(range(graph.shape[0]) if nombres is None else nombres)
+        origen, destino, lag = np.nonzero(graph != '')
+        tipo = graph[origen, destino, lag]
+        # Los enlaces contemporáneos (lag 0) aparecen en (i, j) y en (j, i): se deja uno
+        unicos = (tipo != '<--') & ((lag > 0) | (origen < destino) | (tipo == '-->'))
+        origen, destino, lag = origen[unicos], destino[unicos], lag[unicos]
+        p_matrix = resultados.get('p_matrix')
+        return cls(
+            variables=variables,
+            origen=origen,
+            destino=destino,
+            lag=lag,
+            tipo=graph[origen, destino, lag],
+            fuerza=np.asarray(resultados['val_matrix'])[origen, destino, lag],
+            p_valor=(
+                np.asarray(p_matrix)[origen, destino, lag] if p_matrix is not None else np.full(len(origen), np.nan)
+            ),
+        )
+
+    def enlaces(self, variable=None, lag=None, fuerza_min=0.0, tipo=None):
+        """Enlaces filtrados, ordenados por fuerza absoluta descendente, como diccionarios."""
+        mascara = np.abs(self.fuerza) >= fuerza_min
+        if variable is not None:
+            indice = self.variables.index(variable)
+            mascara &= (self.origen == indice) | (self.destino == indice)
+        if lag is not None:
+            mascara &= self.lag == lag
+        if tipo is not None:
+            mascara &= self.tipo == tipo
+        seleccion = np.flatnonzero(mascara)
+        seleccion = seleccion[np.argsort(-np.abs(self.fuerza[seleccion]), kind='stable')]
+        return [
+            {
+                'source': self.variables[self.origen[k]],
+                'target': self.variables[self.destino[k]],
+                'lag': int(self.lag[k]),
+                'link': str(self.tipo[k]),
+                'strength': round(float(self.fuerza[k]), 4),
+                'p_value': None if np.isnan(self.p_valor[k]) else float(self.p_valor[k]),
+            }
+            for k in seleccion
+        ]
+
+
+def ruta_resultados():
+    return Path(settings.ML_MODELS_PATH) / RESULTADOS_PCMCI
+
+
+@vigente(clave=lambda: checksum_fichero(ruta_resultados()))
+def grafo_causal(previo):
+    """GrafoCausal vigente; se recarga solo si cambia el checksum del fichero."""
+    return GrafoCausal.desde_resultados(joblib.load(ruta_resultados()))
@@ -0,0 +1,118 @@
+"""
+Caché de respuestas precomprimidas para los endpoints de lectura más usados.
+Se negocia br / gzip con Accept-Encoding y se guardan los bytes ya comprimidos
+por ETag, así una respuesta caliente no vuelve a serializar JSON ni a comprimir.
+"""
+import gzip
+import re
+from functools import wraps
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from src.services.versioning import condicional, etag_peticion
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él se sirve gzip
+    brotli = None
+
+CACHE_ALIAS = 'respuestas'
+
+# Por debajo de este tamaño comprimir no compensa
+MIN_BYTES_COMPRESION = 200
+
+_ACCEPT_ENCODING_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*')
+
+
+def codificaciones_disponibles():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negociar_codificacion(request):
+    """Codificación preferida según Accept-Encoding: 'br', 'gzip' o 'identity'."""
+    aceptadas = {}
+    for parte in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coincidencia = _ACCEPT_ENCODING_RE.fullmatch(parte)
+        if coincidencia:
+            try:
+                aceptadas[coincidencia.group(1).lower()] = float(coincidencia.group(2) or 1)
+            except ValueError:
+                continue
+    comodin = aceptadas.get('*', 0)
+    candidatas = [
+        (aceptadas.get(codificacion, comodin), -orden, codificacion)
+        for orden, codificacion in enumerate(codificaciones_disponibles())
+    ]
+    calidad, _, codificacion = max(candidatas)
+    return codificacion if calidad > 0 else 'identity'
+
+
+def comprimir(contenido, codificacion):
+    """Comprime los bytes; gzip con mtime=0 para que el resultado sea determinista."""
+    if codificacion == 'br':
+        return brotli.compress(contenido, quality=5)
+    if codificacion == 'gzip':
+        return gzip.compress(contenido, compresslevel=6, mtime=0)
+    return contenido
+
+
+def _construir_respuesta(entrada, codificacion):
+    content_type, cuerpo, codificada = entrada
+    response = HttpResponse(cuerpo, content_type=content_type)
+    if codificada:
+        response['Content-Encoding'] = codificacion
+    response['Content-Length'] = str(len(cuerpo))
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def cache_comprimida(modelos=(), ficheros=(), timeout=DEFAULT_TIMEOUT, firmas=()):
+    """
+    Decorador que sirve la vista desde la caché de bytes comprimidos.
+    La clave es el ETag de la representación, que ya incluye la versión del
+    dataset, los modelos, los parámetros normalizados y la codificación.
+    """
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            codificacion = negociar_codificacion(request)
+            clave = f'respuesta:{etag_peticion(request, modelos, ficheros, codificacion, firmas)}'
+            cache = caches[CACHE_ALIAS]
+            entrada = cache.get(clave)
+            if entrada is not None:
+                return _construir_respuesta(entrada, codificacion)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or getattr(response, 'streaming', False):
+                return response
+            if hasattr(response, 'render') and callable(response.render):
+                response = response.render()
+
+            contenido = response.content
+            codificada = codificacion != 'identity' and len(contenido) >= MIN_BYTES_COMPRESION
+            entrada = (
+                response['Content-Type'],
+                comprimir(contenido, codificacion) if codificada else contenido,
+                codificada,
+            )
+            cache.set(clave, entrada, timeout)
+            return _construir_respuesta(entrada, codificacion)
+
+        return inner
+
+    return decorator
+
+
+def lectura_comprimida(modelos=(), ficheros=(), timeout=DEFAULT_TIMEOUT, firmas=()):
+    """GET condicional con ETag por codificación más la caché de respuestas comprimidas."""
+    def decorator(view):
+        view = cache_comprimida(modelos, ficheros, timeout, firmas)(view)
+        return condicional(modelos, ficheros, negociar=negociar_codificacion, firmas=firmas)(view)
+
+    return decorator
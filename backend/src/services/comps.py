@@ -0,0 +1,36 @@
+"""
+Motor de comparables del proceso para /api/comps/.
+Tipifica con el escalador de preprocessor.joblib (el del modelo de precio). Vigente mientras
+no cambien los datos ni el preprocesador (versioning.vigente).
+"""
+from pathlib import Path
+
+import joblib
+import pandas as pd
+from django.conf import settings
+
+from src.models.houses import House
+from src.services.versioning import dataset_path, firma_datos, model_checksums, vigente
+from src.utils.comps import COLUMNAS_COMPS, MotorComparables, escalador_modelo
+from src.utils.locations import leer_viviendas_csv
+
+PREPROCESADOR_PRECIO = 'preprocessor.joblib'
+
+
+def viviendas_comps():
+    """Viviendas con las columnas de COLUMNAS_COMPS."""
+    if House.objects.exists():
+        return pd.DataFrame.from_records(House.objects.values_list(*COLUMNAS_COMPS), columns=COLUMNAS_COMPS)
+    return leer_viviendas_csv(dataset_path(), COLUMNAS_COMPS)
+
+
+def firma_comps():
+    """Versión del motor: la de los datos y el checksum del preprocesador."""
+    return f'{firma_datos()}|{model_checksums((PREPROCESADOR_PRECIO,))[PREPROCESADOR_PRECIO]}'
+
+
+@vigente(clave=firma_comps)
+def motor_comparables(previo):
+    """MotorComparables vigente (se construye la primera vez y cuando cambian los datos o el preprocesador)."""
+    preprocesador = joblib.load(Path(settings.ML_MODELS_PATH) / PREPROCESADOR_PRECIO)
+    return MotorComparables(viviendas_comps(), escalador_modelo(preprocesador))
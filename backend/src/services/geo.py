@@ -0,0 +1,27 @@
+"""
+Geocodificador inverso del proceso, construido con las viviendas etiquetadas (con los
+barrios de la última importación). Vigente mientras no cambien los datos (versioning.vigente).
+"""
+import pandas as pd
+
+from src.models.houses import House
+from src.services.versioning import dataset_path, vigente
+from src.utils.locations import leer_viviendas_csv
+from src.utils.reverse_geocoding import COLUMNAS_ETIQUETA, GeocodificadorInverso
+
+COLUMNAS_PUNTOS = ['latitude', 'longitude', *COLUMNAS_ETIQUETA]
+
+
+def puntos_etiquetados():
+    """Viviendas con coordenadas y sus etiquetas de distrito y barrio."""
+    if House.objects.exists():
+        filas = House.objects.exclude(district=None).values_list(*COLUMNAS_PUNTOS)
+        return pd.DataFrame.from_records(filas, columns=COLUMNAS_PUNTOS)
+    df = leer_viviendas_csv(dataset_path(), COLUMNAS_PUNTOS)
+    return df[df['district'].notna()].reset_index(drop=True)
+
+
+@vigente()
+def geocodificador(previo):
+    """GeocodificadorInverso vigente (se construye la primera vez y cuando cambian los datos)."""
+    return GeocodificadorInverso(puntos_etiquetados())
@@ -0,0 +1,48 @@
+"""
+Pirámide de rejillas del proceso para /api/heatmap/ (versioning.vigente).
+Cuando los datos cambian por una importación se aplican los cambios de
+DatasetVersion.cambios_desde() y solo se recalculan las celdas afectadas. Eso exige que la
+pirámide salga de House en una versión anterior: si salió del CSV (tabla vacía, con sus
+propios ids) o los datos cambian sin una versión nueva, se reconstruye entera.
+"""
+import pandas as pd
+
+from src.models.datasets import DatasetVersion
+from src.models.houses import House
+from src.services.versioning import dataset_path, vigente
+from src.utils.heatmap import PiramideRejilla, filas_rejilla
+from src.utils.locations import leer_viviendas_csv
+
+COLUMNAS_REJILLA = ['id', 'latitude', 'longitude', 'buy_price', 'sq_mt_built', 'rent_price']
+LOTE_IDS = 500
+
+
+def datos_rejilla(ids=None):
+    """Viviendas para la pirámide, de House o, si está vacía, del CSV; con `ids`, solo esas (de House)."""
+    if ids is not None:
+        filas = []
+        for inicio in range(0, len(ids), LOTE_IDS):
+            filas += House.objects.filter(id__in=ids[inicio:inicio + LOTE_IDS]).values_list(*COLUMNAS_REJILLA)
+        return pd.DataFrame.from_records(filas, columns=COLUMNAS_REJILLA)
+    if House.objects.exists():
+        return pd.DataFrame.from_records(House.objects.values_list(*COLUMNAS_REJILLA), columns=COLUMNAS_REJILLA)
+    return leer_viviendas_csv(dataset_path(), COLUMNAS_REJILLA)
+
+
+@vigente()
+def piramide(previo):
+    """PiramideRejilla vigente, actualizada de forma incremental tras cada importación."""
+    version = DatasetVersion.actual()
+    origen = 'house' if House.objects.exists() else 'csv'
+    metadatos = previo.metadatos if previo is not None else {}
+    if metadatos.get('origen') == origen == 'house' and 0 < metadatos.get('version', 0) < version:
+        cambios = DatasetVersion.cambios_desde(metadatos['version'])
+        previo.actualizar(
+            eliminadas=cambios['eliminadas'],
+            nuevas=filas_rejilla(datos_rejilla(cambios['nuevas'] + cambios['modificadas'])),
+        )
+        rejillas = previo
+    else:
+        rejillas = PiramideRejilla(filas_rejilla(datos_rejilla()))
+    rejillas.metadatos.update(version=version, origen=origen)
+    return rejillas
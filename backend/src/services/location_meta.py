@@ -0,0 +1,73 @@
+"""
+Metadatos de ubicación para /api/meta/locations/ y el frontend (distritos, barrios,
+centroides, rectángulos y recuentos).
+Se compilan en el build (comando compilar_ubicaciones) en DATA_PATH/meta/locations.json, un
+artefacto versionado por su contenido que se sirve tal cual. Tras cada importación (señal
+dataset_actualizado) se vuelve a compilar; sin el fichero se compilan en memoria desde House
+(o desde el CSV si la tabla está vacía).
+"""
+import json
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+
+from src.models.houses import House
+from src.services.versioning import checksum_fichero, dataset_path, firma_datos, vigente
+from src.utils.locations import leer_viviendas_csv
+from src.utils.location_meta import COLUMNAS_UBICACION, compilar, guardar, serializar, versionar
+
+METADATOS_UBICACION = Path('meta') / 'locations.json'
+
+
+def ruta_ubicaciones():
+    return Path(settings.DATA_PATH) / METADATOS_UBICACION
+
+
+def viviendas_ubicacion():
+    """Viviendas con las columnas de COLUMNAS_UBICACION, de House o, si está vacía, del CSV."""
+    columnas = list(COLUMNAS_UBICACION)
+    if House.objects.exists():
+        return pd.DataFrame.from_records(House.objects.values_list(*columnas), columns=columnas)
+    return leer_viviendas_csv(dataset_path(), columnas)
+
+
+def compilar_artefacto():
+    """(artefacto, bytes JSON) con los datos actuales."""
+    artefacto = versionar(compilar(viviendas_ubicacion()))
+    return artefacto, serializar(artefacto)
+
+
+def compilar_ubicaciones(ruta=None):
+    """Compila los metadatos en `ruta`. Devuelve (artefacto, tamaño en bytes, si ha cambiado el fichero)."""
+    ruta = Path(ruta or ruta_ubicaciones())
+    artefacto, contenido = compilar_artefacto()
+    return artefacto, len(contenido), guardar(contenido, ruta)
+
+
+def actualizar_tras_importacion(sender, **kwargs):
+    """Receptor de dataset_actualizado: vuelve a compilar el fichero, si existe."""
+    if ruta_ubicaciones().exists():
+        compilar_ubicaciones()
+
+
+def clave_ubicaciones():
+    """El checksum del fichero compilado o, sin él, la versión de los datos."""
+    ruta = ruta_ubicaciones()
+    return ('fichero', checksum_fichero(ruta)) if ruta.exists() else ('datos', firma_datos())
+
+
+@vigente(clave=clave_ubicaciones)
+def artefacto(previo):
+    """(version, bytes) vigentes: los del fichero compilado o, sin él, los de los datos actuales."""
+    ruta = ruta_ubicaciones()
+    if ruta.exists():
+        contenido = ruta.read_bytes()
+        return json.loads(contenido)['version'], contenido
+    datos, contenido = compilar_artefacto()
+    return datos['version'], contenido
+
+
+def version_ubicaciones():
+    """Versión de los metadatos vigentes (entra en el ETag de /api/meta/locations/)."""
+    return artefacto()[0]
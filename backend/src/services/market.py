@@ -0,0 +1,93 @@
+"""
+Cubo de estadísticas del mercado para /api/market/stats/.
+Se guarda precalculado en ML_MODELS_PATH/market_stats.joblib (comando
+generar_estadisticas_mercado) junto con la versión de los datos (versioning.firma_datos) y
+la DatasetVersion con las que se calculó. Tras cada importación (señal dataset_actualizado)
+y en el proceso, cuando cambian los datos, se aplican los cambios de
+DatasetVersion.cambios_desde() y solo se recalculan los grupos afectados; sin una versión
+de partida de la misma base de datos se recalcula entero.
+"""
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+from django.db import connection
+
+from src.models.datasets import DatasetVersion
+from src.models.houses import House
+from src.services.versioning import dataset_path, firma_datos, vigente
+from src.utils.locations import leer_viviendas_csv
+from src.utils.market import COLUMNAS_MERCADO, CuboMercado, filas_mercado
+
+ESTADISTICAS_MERCADO = 'market_stats.joblib'
+LOTE_IDS = 500
+
+
+def ruta_estadisticas():
+    return Path(settings.ML_MODELS_PATH) / ESTADISTICAS_MERCADO
+
+
+def _base():
+    """Base de datos de la que sale el cubo: las versiones de otra no le sirven."""
+    return str(connection.settings_dict['NAME'])
+
+
+def datos_mercado(ids=None):
+    """Viviendas con las columnas de COLUMNAS_MERCADO; con `ids`, solo esas (de House)."""
+    columnas = list(COLUMNAS_MERCADO)
+    if ids is not None:
+        filas = []
+        for inicio in range(0, len(ids), LOTE_IDS):
+            filas += House.objects.filter(id__in=ids[inicio:inicio + LOTE_IDS]).values_list(*columnas)
+        return pd.DataFrame.from_records(filas, columns=columnas)
+    if House.objects.exists():
+        return pd.DataFrame.from_records(House.objects.values_list(*columnas), columns=columnas)
+    return leer_viviendas_csv(dataset_path(), columnas)
+
+
+def cubo_al_dia(previo=None):
+    """
+    (cubo, modo): `previo` si sigue al día ('al día'), puesto al día con los cambios desde
+    su versión ('incremental') o uno nuevo ('completo').
+    """
+    firma, version, base = firma_datos(), DatasetVersion.actual(), _base()
+    metadatos = previo.metadatos if previo is not None else {}
+    if (metadatos.get('base'), metadatos.get('firma'), metadatos.get('version')) == (base, firma, version):
+        return previo, 'al día'
+    if metadatos.get('base') == base and 0 < metadatos.get('version', 0) < version:
+        cambios = DatasetVersion.cambios_desde(metadatos['version'])
+        previo.actualizar(
+            eliminadas=cambios['eliminadas'],
+            nuevas=filas_mercado(datos_mercado(cambios['nuevas'] + cambios['modificadas'])),
+        )
+        cubo, modo = previo, 'incremental'
+    else:
+        cubo, modo = CuboMercado(filas_mercado(datos_mercado())), 'completo'
+    cubo.metadatos.update(firma=firma, version=version, base=base)
+    return cubo, modo
+
+
+def generar_estadisticas(ruta=None, completo=False):
+    """Pone al día (o recalcula, con `completo`) el cubo guardado en `ruta`. Devuelve (cubo, modo)."""
+    ruta = Path(ruta or ruta_estadisticas())
+    previo = CuboMercado.cargar(ruta) if ruta.exists() and not completo else None
+    cubo, modo = cubo_al_dia(previo)
+    if modo != 'al día':
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        cubo.guardar(ruta)
+    return cubo, modo
+
+
+def actualizar_tras_importacion(sender, **kwargs):
+    """Receptor de dataset_actualizado: pone al día el cubo guardado, si es de esta base de datos."""
+    ruta = ruta_estadisticas()
+    if ruta.exists() and CuboMercado.cargar(ruta).metadatos.get('base') == _base():
+        generar_estadisticas(ruta)
+
+
+@vigente()
+def cubo(previo):
+    """CuboMercado vigente: el guardado la primera vez y, después, actualizado al cambiar los datos."""
+    if previo is None and ruta_estadisticas().exists():
+        previo = CuboMercado.cargar(ruta_estadisticas())
+    return cubo_al_dia(previo)[0]
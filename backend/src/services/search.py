@@ -0,0 +1,27 @@
+"""
+Índice de texto del proceso para /api/search/ y /api/search/autocomplete/
+(versioning.vigente).
+"""
+import pandas as pd
+
+from src.models.houses import House
+from src.services.versioning import dataset_path, vigente
+from src.utils.locations import leer_viviendas_csv
+from src.utils.search import CAMPOS_TEXTO, IndiceTexto
+
+# Campos que se devuelven en los resultados
+CAMPOS_RESULTADO = ['id', 'address', 'title', 'subtitle', 'buy_price', 'sq_mt_built', 'n_rooms', 'neighborhood_name']
+COLUMNAS_BUSQUEDA = list(dict.fromkeys(['id', *CAMPOS_TEXTO, *CAMPOS_RESULTADO]))
+
+
+def documentos_busqueda():
+    """Viviendas con los campos de texto y los de CAMPOS_RESULTADO."""
+    if House.objects.exists():
+        return pd.DataFrame.from_records(House.objects.values_list(*COLUMNAS_BUSQUEDA), columns=COLUMNAS_BUSQUEDA)
+    return leer_viviendas_csv(dataset_path(), COLUMNAS_BUSQUEDA)
+
+
+@vigente()
+def indice_texto(previo):
+    """IndiceTexto vigente (se construye la primera vez y cuando cambian los datos)."""
+    return IndiceTexto(documentos_busqueda())
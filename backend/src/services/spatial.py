@@ -0,0 +1,30 @@
+"""
+Índice espacial del proceso para /api/properties/nearby/ y /api/properties/bbox/
+(versioning.vigente).
+"""
+import pandas as pd
+
+from src.models.houses import House
+from src.services.versioning import dataset_path, vigente
+from src.utils.locations import leer_viviendas_csv
+from src.utils.spatial import IndiceEspacial
+
+# Campos de cada vivienda en las respuestas
+COLUMNAS_ESPACIALES = [
+    'id', 'latitude', 'longitude', 'address', 'buy_price', 'rent_price', 'sq_mt_built',
+    'n_rooms', 'n_bathrooms', 'district', 'district_name', 'neighborhood_name',
+]
+
+
+def puntos_espaciales():
+    """Viviendas con coordenadas y los campos de COLUMNAS_ESPACIALES."""
+    if House.objects.exists():
+        filas = House.objects.values_list(*COLUMNAS_ESPACIALES)
+        return pd.DataFrame.from_records(filas, columns=COLUMNAS_ESPACIALES)
+    return leer_viviendas_csv(dataset_path(), COLUMNAS_ESPACIALES)
+
+
+@vigente()
+def indice_espacial(previo):
+    """IndiceEspacial vigente (se construye la primera vez y cuando cambian los datos)."""
+    return IndiceEspacial(puntos_espaciales())
@@ -0,0 +1,51 @@
+"""
+Índice de teselas del proceso para /api/tiles/, con el cluster K-means de cada vivienda.
+Vigente mientras no cambien los datos ni los modelos de clustering (versioning.vigente).
+"""
+from pathlib import Path
+
+import joblib
+import pandas as pd
+from django.conf import settings
+
+from src.models.houses import House
+from src.services.versioning import MODELOS_KMEANS, dataset_path, firma_datos, model_checksums, vigente
+from src.utils.locations import leer_viviendas_csv
+from src.utils.tiles import IndiceTeselas
+
+# Variables del preprocesador K-means, en su orden
+COLUMNAS_KMEANS = ['latitude', 'longitude', 'sq_mt_built', 'n_rooms', 'n_bathrooms', 'buy_price', 'rent_price']
+COLUMNAS_MAPA = ['id', *COLUMNAS_KMEANS, 'district']
+# Propiedades de cada vivienda en las teselas de detalle
+PROPIEDADES_TESELA = ('id', 'buy_price', 'sq_mt_built', 'n_rooms', 'district', 'cluster')
+
+
+def clusters_kmeans(df):
+    """Cluster K-means de cada fila, con el mismo preprocesado que clustering_table_view."""
+    modelos = [joblib.load(Path(settings.ML_MODELS_PATH) / nombre) for nombre in MODELOS_KMEANS]
+    preprocessor, pca, kmeans = modelos
+    datos = df[COLUMNAS_KMEANS].astype('float64')
+    return kmeans.predict(pca.transform(preprocessor.transform(datos.fillna(datos.median()))))
+
+
+def puntos_mapa():
+    """Viviendas con coordenadas, precio, distrito y cluster."""
+    if House.objects.exists():
+        filas = House.objects.values_list(*COLUMNAS_MAPA)
+        df = pd.DataFrame.from_records(filas, columns=COLUMNAS_MAPA)
+    else:
+        df = leer_viviendas_csv(dataset_path(), COLUMNAS_MAPA)
+    df = df.dropna(subset=['latitude', 'longitude']).reset_index(drop=True)
+    df['cluster'] = clusters_kmeans(df)
+    return df
+
+
+def firma_teselas():
+    """Versión del índice: la de los datos y los checksums de los modelos de clustering."""
+    return f'{firma_datos()}|{sorted(model_checksums(MODELOS_KMEANS).items())}'
+
+
+@vigente(clave=firma_teselas)
+def indice_teselas(previo):
+    """IndiceTeselas vigente (se construye la primera vez y cuando cambian los datos o los modelos)."""
+    return IndiceTeselas(puntos_mapa())
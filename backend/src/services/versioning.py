@@ -0,0 +1,185 @@
+"""
+Versionado del dataset y de los modelos para ETags y GET condicionales.
+Las vistas de lectura calculan su ETag a partir de la versión del CSV, los
+checksums de los modelos que usan y los parámetros de la consulta, de modo
+que un cliente con la versión vigente recibe un 304 sin recomputar nada.
+Los índices del proceso (vigente) se reconstruyen con la misma versión de los datos.
+"""
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache, wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.views.decorators.http import condition
+
+from src.models.houses import House
+
+DATASET_FILENAME = 'unified_houses_madrid.csv'
+
+# Modelos que participan en cada vista de clustering
+MODELOS_KMEANS = ('preprocessor_kmeans.joblib', 'pca_kmeans.joblib', 'kmeans_model.joblib')
+
+
+@lru_cache(maxsize=64)
+def _sha256(path, mtime_ns, size):
+    """Hash del contenido de un fichero; se memoriza por (ruta, mtime, tamaño)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fichero:
+        for bloque in iter(lambda: fichero.read(1 << 20), b''):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def checksum_fichero(path):
+    """Checksum del fichero, recalculado solo si cambia su mtime o su tamaño."""
+    path = Path(path)
+    stat = path.stat()
+    return _sha256(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def dataset_path():
+    return Path(settings.DATA_PATH) / DATASET_FILENAME
+
+
+def dataset_version():
+    """Versión del dataset: prefijo del hash del CSV unificado."""
+    return checksum_fichero(dataset_path())[:16]
+
+
+# Firmas ya calculadas en la petición en curso (ver memoria_peticion)
+_peticion = threading.local()
+
+
+@contextmanager
+def memoria_peticion():
+    """Mientras dura, firma_datos() se calcula una sola vez (el ETag y los índices la comparten)."""
+    if getattr(_peticion, 'firmas', None) is not None:
+        yield
+        return
+    _peticion.firmas = {}
+    try:
+        yield
+    finally:
+        _peticion.firmas = None
+
+
+def firma_datos():
+    """
+    Versión de los datos de los índices del proceso: la firma de House y la del CSV, del que
+    salen cuando la tabla está vacía. Dentro de una petición se calcula una sola vez.
+    """
+    firmas = getattr(_peticion, 'firmas', None)
+    if firmas is None:
+        return f'{House.objects.firma()}|{dataset_version()}'
+    if 'datos' not in firmas:
+        firmas['datos'] = f'{House.objects.firma()}|{dataset_version()}'
+    return firmas['datos']
+
+
+def vigente(clave=firma_datos):
+    """
+    Decorador para el objeto vigente del proceso (índices, motores, cubos...). La función
+    decorada recibe el objeto anterior (None la primera vez, para actualizarlo en vez de
+    reconstruirlo) y devuelve el nuevo; se llama sin argumentos y solo vuelve a construir
+    cuando cambia `clave()`. Así cada worker se entera de una importación aunque se haga en
+    otro proceso.
+    """
+    def decorator(construir):
+        cerrojo = threading.Lock()
+        actual = {'clave': None, 'objeto': None}
+
+        @wraps(construir)
+        def obtener():
+            valor = clave()
+            if actual['clave'] != valor:
+                with cerrojo:
+                    if actual['clave'] != valor:
+                        actual['objeto'] = construir(actual['objeto'])
+                        actual['clave'] = valor
+            return actual['objeto']
+
+        return obtener
+
+    return decorator
+
+
+def model_checksums(modelos):
+    """Checksums de los artefactos en data/models (None si no existen)."""
+    checksums = {}
+    for nombre in modelos:
+        path = Path(settings.ML_MODELS_PATH) / nombre
+        checksums[nombre] = checksum_fichero(path)[:16] if path.exists() else None
+    return checksums
+
+
+def normalizar_parametros(query_dict):
+    """Parámetros GET ordenados, para que ?a=1&b=2 y ?b=2&a=1 compartan ETag."""
+    return tuple((clave, tuple(sorted(query_dict.getlist(clave)))) for clave in sorted(query_dict))
+
+
+def calcular_etag(request, modelos=(), ficheros=(), codificacion=None, firmas=()):
+    """
+    ETag fuerte para la ruta, la versión del dataset, los modelos y los parámetros.
+    `firmas` son funciones que devuelven la versión de otras fuentes (p. ej. la tabla House).
+    Si la respuesta se sirve comprimida, la codificación forma parte del ETag:
+    cada representación (identity, gzip, br) tiene el suyo.
+    """
+    partes = [request.path, dataset_version()]
+    partes += [f'{nombre}={checksum}' for nombre, checksum in sorted(model_checksums(modelos).items())]
+    partes += [checksum_fichero(path)[:16] for path in ficheros if Path(path).exists()]
+    partes += [str(firma()) for firma in firmas]
+    partes.append(repr(normalizar_parametros(request.GET)))
+    if codificacion:
+        partes.append(codificacion)
+    return hashlib.sha256('|'.join(partes).encode('utf-8')).hexdigest()[:32]
+
+
+def etag_peticion(request, modelos=(), ficheros=(), codificacion=None, firmas=()):
+    """
+    calcular_etag una sola vez por petición: condicional y la caché de respuestas piden el
+    mismo ETag, y cada firma puede ser una consulta a la base de datos.
+    """
+    calculados = request.__dict__.setdefault('_etags', {})
+    clave = (tuple(modelos), tuple(ficheros), codificacion, tuple(firmas))
+    if clave not in calculados:
+        calculados[clave] = calcular_etag(request, modelos, ficheros, codificacion, firmas)
+    return calculados[clave]
+
+
+def ultima_modificacion(modelos=(), ficheros=()):
+    """Fecha de modificación más reciente entre el dataset, los modelos y los ficheros servidos."""
+    paths = [dataset_path(), *ficheros]
+    paths += [Path(settings.ML_MODELS_PATH) / nombre for nombre in modelos]
+    mtimes = [Path(path).stat().st_mtime for path in paths if Path(path).exists()]
+    return datetime.fromtimestamp(max(mtimes), tz=timezone.utc) if mtimes else None
+
+
+def condicional(modelos=(), ficheros=(), negociar=None, firmas=()):
+    """
+    Decorador de vistas de lectura: responde 304 a If-None-Match / If-Modified-Since
+    antes de ejecutar la vista. Para APIView se aplica con method_decorator sobre get.
+    `negociar` es opcional y devuelve la codificación elegida para la petición.
+    Con `firmas` no hay Last-Modified: las fechas de los ficheros no reflejan una importación
+    en House, y un If-Modified-Since daría un 304 con datos viejos; solo vale el ETag.
+    """
+    def etag(request, *args, **kwargs):
+        codificacion = negociar(request) if negociar else None
+        return etag_peticion(request, modelos, ficheros, codificacion, firmas)
+
+    def last_modified(request, *args, **kwargs):
+        return ultima_modificacion(modelos, ficheros)
+
+    def decorator(view):
+        condicionada = condition(etag_func=etag, last_modified_func=None if firmas else last_modified)(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            with memoria_peticion():
+                return condicionada(request, *args, **kwargs)
+
+        return inner
+
+    return decorator
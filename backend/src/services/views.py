@@ -8,27 +8,20 @@ import numpy as np
 from src.services.custom_transformers import convert_to_float
 from django.views.decorators.csrf import csrf_exempt
 import json
+from src.services.versioning import MODELOS_KMEANS
+from src.services.compression import lectura_comprimida
+from src.services.causal import grafo_causal
+from src.services.geo import geocodificador
 
 # Las cargas de modelos se hacen dentro de las funciones/vistas
 
 
-# Vista para el análisis causal
+# Vista para el análisis causal (la API estructurada está en /api/causal/)
 def get_causal_relationships():
-    results = joblib.load('data/models/pcmci_results.joblib')
-    graph = results['graph']
-    var_names = results['var_names'] if 'var_names' in results else list(range(len(graph)))
-    relaciones = []
-    for i, var1 in enumerate(var_names):
-        for j, var2 in enumerate(var_names):
-            relation = graph[i][j]
-            if isinstance(relation, (np.ndarray, list)):
-                for lag, rel in enumerate(relation):
-                    if rel:
-                        relaciones.append(f"{var1} {rel} {var2} (lag={lag})")
-            else:
-                if relation:
-                    relaciones.append(f"{var1} {relation} {var2}")
-    return relaciones
+    return [
+        f"{enlace['source']} {enlace['link']} {enlace['target']} (lag={enlace['lag']})"
+        for enlace in grafo_causal().enlaces()
+    ]
 
 
 # Vista para el clustering
@@ -36,6 +29,7 @@ from django.http import JsonResponse
 import pandas as pd
 import joblib
 
+@lectura_comprimida(modelos=MODELOS_KMEANS)
 def clustering_table_view(request):
     # Cargar los datos originales
     datos_originales = pd.read_csv('data/unified_houses_madrid.csv')
@@ -76,13 +70,15 @@ def clustering_table_view(request):
 
 
 # Vista para la visualización geográfica
+MAPA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    'notebooks',
+    'madrid_clusters_kmeans_map.html'
+)
+
+@lectura_comprimida(ficheros=(MAPA_PATH,))
 def geographic_visualization_view(request):
-    file_path = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
-        'notebooks',
-        'madrid_clusters_kmeans_map.html'
-    )
-    with open(file_path, 'r', encoding='utf-8') as file:
+    with open(MAPA_PATH, 'r', encoding='utf-8') as file:
         map_html = file.read()
     return HttpResponse(map_html, content_type='text/html')
 
@@ -150,8 +146,13 @@ def xgboost_prediction_view(request):
                 # Campos categóricos
                 data['house_type'] = 1  # Asumimos tipo flat por defecto
                 data['energy_certificate'] = form_data.get('energy_certificate', 'E')
-                data['district'] = form_data.get('district', 'Centro')
-                data['neighborhood'] = form_data.get('neighborhood', 'Sol')
+                # Distrito y barrio salen de las coordenadas (códigos, como en el entrenamiento),
+                # no de los nombres que mande el cliente
+                ubicacion = geocodificador().ubicar(data['latitude'], data['longitude'])
+                if ubicacion is None:
+                    return JsonResponse({'error': 'Las coordenadas no corresponden a Madrid'}, status=400)
+                data['district'] = ubicacion['district']
+                data['neighborhood'] = ubicacion['neighborhood']
                 
                 print("Datos procesados:", data)
                 
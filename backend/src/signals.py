@@ -0,0 +1,10 @@
+"""
+Señales del dominio.
+
+dataset_actualizado: se envía tras cada importación que cambia la tabla House, con
+`version` (DatasetVersion) y `cambios` ({'nuevas', 'modificadas', 'eliminadas'} -> ids).
+Los precálculos se conectan a ella para actualizar solo las viviendas afectadas.
+"""
+from django.dispatch import Signal
+
+dataset_actualizado = Signal()
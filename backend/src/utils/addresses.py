@@ -0,0 +1,152 @@
+"""
+Normalización de direcciones.
+La clave de dirección de House (calle|número|portal) se calcula igual en Python
+(House.save) que de forma vectorizada sobre DataFrames (importador). Sin calle no hay
+dirección que compartir: la clave es 'sin-calle#<id del anuncio>', como en la migración
+0004, para no fundir anuncios sin relación en una sola fila.
+"""
+import re
+import unicodedata
+import uuid
+
+import pandas as pd
+
+SEPARADOR_CLAVE = '|'
+PREFIJO_SIN_CALLE = 'sin-calle#'
+
+_ESPACIOS_RE = re.compile(r'\s+')
+
+
+def normalizar_texto(valor):
+    """Minúsculas, sin acentos y con los espacios colapsados; None -> ''."""
+    if valor is None or (isinstance(valor, float) and pd.isna(valor)):
+        return ''
+    texto = unicodedata.normalize('NFKD', str(valor)).encode('ascii', 'ignore').decode('ascii')
+    return _ESPACIOS_RE.sub(' ', texto).strip().lower()
+
+
+def normalizar_serie(serie):
+    """Versión vectorizada de normalizar_texto para una columna de pandas."""
+    return (
+        serie.astype('string').fillna('')
+        .str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+        .str.replace(_ESPACIOS_RE, ' ', regex=True).str.strip().str.lower()
+        .astype(object)
+    )
+
+
+def clave_direccion(street_name, street_number, portal, identificador=None):
+    """Clave calle|número|portal; sin calle, 'sin-calle#<identificador>' (uno aleatorio si es None)."""
+    if not normalizar_texto(street_name):
+        return f'{PREFIJO_SIN_CALLE}{uuid.uuid4().hex if identificador is None else identificador}'
+    return SEPARADOR_CLAVE.join(normalizar_texto(v) for v in (street_name, street_number, portal))
+
+
+def claves_direccion(df):
+    """
+    Clave de dirección de cada fila de un DataFrame con street_name / street_number / portal.
+    Las filas sin calle usan la columna `id` (el id del anuncio en el CSV) o, si no la hay,
+    el hash de la fila, que es estable entre importaciones del mismo fichero.
+    """
+    partes = [
+        normalizar_serie(df[columna]) if columna in df else pd.Series('', index=df.index, dtype=object)
+        for columna in ('street_name', 'street_number', 'portal')
+    ]
+    claves = partes[0] + SEPARADOR_CLAVE + partes[1] + SEPARADOR_CLAVE + partes[2]
+    sin_calle = partes[0] == ''
+    if sin_calle.any():
+        filas = df[sin_calle]
+        identificadores = pd.util.hash_pandas_object(filas.astype(str), index=False).map('{:016x}'.format)
+        if 'id' in filas:
+            identificadores = filas['id'].astype('string').str.strip().replace('', pd.NA).fillna(identificadores)
+        claves[sin_calle] = PREFIJO_SIN_CALLE + identificadores.astype(object)
+    return claves
+
+
+# Tipos de vía y sus abreviaturas, ya normalizadas (sin acentos, '/' y '.' como espacios)
+TIPOS_VIA = {
+    'calle': ('c', 'cl', 'cll', 'calle'),
+    'avenida': ('av', 'avd', 'avda', 'avenida'),
+    'paseo': ('p o', 'po', 'pso', 'paseo'),
+    'plaza': ('pl', 'pza', 'plz', 'plza', 'plaza'),
+    'carretera': ('ctra', 'carretera'),
+    'glorieta': ('gta', 'glorieta'),
+    'travesia': ('trv', 'trav', 'travesia'),
+    'camino': ('cno', 'camino'),
+    'ronda': ('rda', 'ronda'),
+    'pasaje': ('psje', 'pasaje'),
+    'costanilla': ('costanilla',),
+    'urbanizacion': ('urb', 'urbanizacion'),
+}
+_TIPO_VIA_RE = re.compile(
+    r'^(?P<tipo>' + '|'.join(
+        sorted((re.escape(abreviatura) for abreviaturas in TIPOS_VIA.values() for abreviatura in abreviaturas),
+               key=len, reverse=True)
+    ) + r')\b\s*(?P<nombre>.*)$'
+)
+_TIPO_CANONICO = {abreviatura: tipo for tipo, abreviaturas in TIPOS_VIA.items() for abreviatura in abreviaturas}
+# Artículos y preposiciones que unas fuentes ponen y otras no ("Calle de la Paz" / "Calle Paz")
+_PARTICULAS_RE = re.compile(r'\b(?:de|del|la|las|los|el|y)\b')
+# "Calle X, 12, Barrio, Madrid" / "Calle X, 12 3ºB" / "Calle X, Barrio, Madrid"
+_DIRECCION_RE = re.compile(r'^(?P<calle>[^,]*)(?:,\s*(?P<numero>\d+)[^,]*)?(?:,\s*(?P<barrio>[^,]*))?')
+
+
+def _calle_canonica(serie):
+    """(tipo de vía, nombre con partículas, nombre sin partículas) de una columna de calles normalizadas."""
+    serie = serie.str.replace(r'[/.]', ' ', regex=True).str.replace(_ESPACIOS_RE, ' ', regex=True).str.strip()
+    partes = serie.str.extract(_TIPO_VIA_RE)
+    # Sin tipo de vía ("ALHAMBRA", "Alcala") se asume calle, que es lo que son casi todas
+    tipo = partes['tipo'].map(_TIPO_CANONICO).fillna('calle')
+    nombre = partes['nombre'].fillna(serie).str.strip()
+    sin_particulas = nombre.str.replace(_PARTICULAS_RE, ' ', regex=True).str.replace(_ESPACIOS_RE, ' ', regex=True)
+    return tipo, nombre, sin_particulas.str.strip()
+
+
+def _columna(df, nombre):
+    if nombre in df:
+        return df[nombre].astype('string').str.strip().replace('', pd.NA)
+    return pd.Series(pd.NA, index=df.index, dtype='string')
+
+
+def edificios(df, columna_direccion='raw_address'):
+    """
+    Clave canónica del edificio de cada fila, a partir de street_name, street_number,
+    subtitle y la dirección completa (raw_address o 'Calle X, 12, Barrio, Madrid'), lo que
+    haya. Normaliza mayúsculas, acentos y abreviaturas (C/, Avda., Pº...), ignora artículos
+    y todo lo que sigue al número (piso, puerta). Sin número, el barrio entra en la clave:
+    la calle entera no es un edificio. Devuelve un DataFrame con `clave` y `consulta`
+    (texto que se manda al geocodificador) por fila; clave '' si no hay calle.
+    """
+    partes = _columna(df, columna_direccion).str.extract(_DIRECCION_RE)
+    calle = _columna(df, 'street_name').str.split(',').str[0].fillna(partes['calle'])
+    numero = _columna(df, 'street_number').str.extract(r'(\d+)', expand=False).fillna(partes['numero'])
+    barrio = _columna(df, 'subtitle').str.split(',').str[0].fillna(partes['barrio'])
+    barrio = normalizar_serie(barrio)
+    barrio = barrio.where(barrio != 'madrid', '')
+
+    tipo, nombre, sin_particulas = _calle_canonica(normalizar_serie(calle))
+    numero = numero.fillna('').astype(object)
+    via = tipo + ' ' + sin_particulas
+    clave = via + SEPARADOR_CLAVE + numero + SEPARADOR_CLAVE + barrio.where(numero == '', '')
+    clave = clave.where(sin_particulas != '', '')
+
+    consulta = tipo + ' ' + nombre
+    consulta = consulta + (', ' + numero).where(numero != '', '')
+    consulta = consulta + (', ' + barrio).where(barrio != '', '') + ', madrid'
+    return pd.DataFrame({'clave': clave, 'consulta': consulta}, index=df.index)
+
+
+def agrupar_edificios(df, columna_direccion='raw_address'):
+    """
+    (códigos, únicos): `códigos[i]` es la posición en `únicos` del edificio de la fila i
+    (-1 si no tiene calle) y `únicos` tiene una fila por edificio con su consulta (la de su
+    primera aparición) y el número de filas que lo comparten.
+    """
+    claves = edificios(df, columna_direccion)
+    con_calle = claves[claves['clave'] != '']
+    codigos = pd.Series(-1, index=df.index, dtype='int64')
+    posiciones, _ = pd.factorize(con_calle['clave'])
+    codigos[con_calle.index] = posiciones
+    unicos = con_calle.drop_duplicates('clave').reset_index(drop=True)
+    unicos['filas'] = pd.Series(posiciones).value_counts().sort_index().to_numpy()
+    return codigos.to_numpy(), unicos
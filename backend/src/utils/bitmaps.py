@@ -0,0 +1,216 @@
+"""
+Índice de bitmaps para filtrar viviendas por combinaciones de equipamiento y categorías.
+Cada variable booleana de EQUIPAMIENTO y cada valor de las CATEGORICAS (distrito, barrio,
+certificado energético, habitaciones...) es un bitset empaquetado con np.packbits: un bit
+por vivienda, n/8 bytes. Combinar filtros es hacer AND/OR/NOT byte a byte y el recuento
+es un popcount sobre palabras de 64 bits, sin volver a recorrer el DataFrame.
+Las viviendas se guardan ordenadas por id, así que la posición del bit ordena también por id.
+No depende de Django.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+EQUIPAMIENTO = (
+    'has_lift', 'is_exterior', 'has_parking', 'is_new_development', 'is_renewal_needed', 'is_floor_under',
+    'has_central_heating', 'has_individual_heating', 'are_pets_allowed', 'has_ac', 'has_fitted_wardrobes',
+    'has_garden', 'has_pool', 'has_terrace', 'has_balcony', 'has_storage_room', 'is_furnished',
+    'is_kitchen_equipped', 'is_accessible', 'has_green_zones', 'has_private_parking', 'has_public_parking',
+    'is_parking_included_in_price', 'is_orientation_north', 'is_orientation_west', 'is_orientation_south',
+    'is_orientation_east',
+)
+CATEGORICAS = ('district', 'neighborhood', 'energy_certificate', 'n_rooms', 'n_bathrooms', 'house_type')
+# Columna con el nombre legible de cada código
+ETIQUETAS = {'district': 'district_name', 'neighborhood': 'neighborhood_name', 'house_type': 'house_type_name'}
+COLUMNAS_BITMAP = ('id', 'buy_price', *EQUIPAMIENTO, *CATEGORICAS, *ETIQUETAS.values())
+# Combinaciones de filtros cuyas facetas se guardan
+MAX_FACETAS_CACHE = 256
+
+_M1, _M2, _M4, _H01 = (np.uint64(mascara) for mascara in (
+    0x5555555555555555, 0x3333333333333333, 0x0F0F0F0F0F0F0F0F, 0x0101010101010101,
+))
+
+
+def empaquetar(mascara):
+    """Bitset de una máscara booleana."""
+    return np.packbits(np.asarray(mascara, dtype=bool), bitorder='little')
+
+
+def contar(bitmap):
+    """Número de bits a 1 (popcount SWAR sobre palabras de 64 bits)."""
+    palabras = np.concatenate((bitmap, np.zeros(-len(bitmap) % 8, dtype='uint8'))).view('uint64')
+    palabras = palabras - ((palabras >> np.uint64(1)) & _M1)
+    palabras = (palabras & _M2) + ((palabras >> np.uint64(2)) & _M2)
+    palabras = (palabras + (palabras >> np.uint64(4))) & _M4
+    return int(((palabras * _H01) >> np.uint64(56)).sum(dtype='int64'))
+
+
+def valor_categoria(valor):
+    """Valor de una categórica como texto ('3' y 3.0 son la misma categoría); None si falta."""
+    if valor is None or pd.isna(valor):
+        return None
+    if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+        valor = int(valor)
+    return str(valor)
+
+
+def clave_filtros(equipamiento=None, categorias=None, alguno=(), min_price=None, max_price=None):
+    """Filtros normalizados (mismo significado, misma clave) para la caché de facetas."""
+    return (
+        tuple(sorted((columna, bool(valor)) for columna, valor in (equipamiento or {}).items())),
+        tuple(sorted(
+            (columna, tuple(sorted({valor_categoria(valor) for valor in valores} - {None})))
+            for columna, valores in (categorias or {}).items()
+        )),
+        tuple(sorted(set(alguno))),
+        min_price,
+        max_price,
+    )
+
+
+class IndiceBitmap:
+    """
+    `viviendas` es un DataFrame con id y las columnas de EQUIPAMIENTO, CATEGORICAS, ETIQUETAS
+    y buy_price que haya (las que falten no se pueden filtrar).
+    """
+
+    def __init__(self, viviendas):
+        viviendas = viviendas.sort_values('id', kind='stable').reset_index(drop=True)
+        self.n = len(viviendas)
+        self.ids = viviendas['id'].to_numpy()
+        self.todas = empaquetar(np.ones(self.n, dtype=bool))
+        self.precios = (
+            pd.to_numeric(viviendas['buy_price'], errors='coerce').to_numpy(dtype='float64')
+            if 'buy_price' in viviendas else np.full(self.n, np.nan)
+        )
+        self.equipamiento = {
+            columna: empaquetar(viviendas[columna].astype('boolean').fillna(False).to_numpy(dtype=bool))
+            for columna in EQUIPAMIENTO if columna in viviendas
+        }
+        # Por categórica: código de cada vivienda (-1 si falta), valores, nombres y un bitset por valor
+        self.codigos, self.valores, self.etiquetas, self.categorias = {}, {}, {}, {}
+        for columna in CATEGORICAS:
+            if columna not in viviendas:
+                continue
+            # Se normalizan los valores distintos, no las filas
+            crudos, unicos = pd.factorize(viviendas[columna])
+            normalizados = pd.Series([valor_categoria(valor) for valor in unicos], dtype=object)
+            codigos_unicos, valores = pd.factorize(normalizados, sort=True)
+            # El -1 de los que faltan toma el -1 añadido al final
+            codigos = np.append(codigos_unicos, -1)[crudos].astype('int32')
+            self.codigos[columna] = codigos
+            self.valores[columna] = list(valores)
+            self.categorias[columna] = {valor: empaquetar(codigos == codigo) for codigo, valor in enumerate(valores)}
+            etiqueta = ETIQUETAS.get(columna)
+            if etiqueta in viviendas:
+                nombres = viviendas[etiqueta].astype(object).where(viviendas[etiqueta].notna(), None).to_numpy()
+                con_nombre = codigos >= 0
+                primeras = pd.Series(nombres[con_nombre]).groupby(codigos[con_nombre]).first()
+                self.etiquetas[columna] = {valores[codigo]: nombre for codigo, nombre in primeras.items()}
+        self._facetas = {}
+        self._cerrojo = threading.Lock()
+
+    def __len__(self):
+        return self.n
+
+    def filtrar(self, equipamiento=None, categorias=None, alguno=(), min_price=None, max_price=None):
+        """
+        Bitset de las viviendas que cumplen todos los filtros (AND):
+        `equipamiento` {columna: bool} exige que la variable valga eso; `categorias`
+        {columna: [valores]} exige uno de los valores (OR); `alguno` exige al menos una de sus
+        variables de equipamiento (OR). ValueError si una columna no está en el índice.
+        """
+        resultado = self.todas.copy()
+        for columna, valor in (equipamiento or {}).items():
+            bitmap = self._equipamiento(columna)
+            resultado &= bitmap if valor else ~bitmap
+        for columna, valores in (categorias or {}).items():
+            if columna not in self.categorias:
+                raise ValueError(f'No se puede filtrar por {columna}')
+            union = np.zeros_like(self.todas)
+            for valor in valores:
+                bitmap = self.categorias[columna].get(valor_categoria(valor))
+                if bitmap is not None:
+                    union |= bitmap
+            resultado &= union
+        if alguno:
+            union = np.zeros_like(self.todas)
+            for columna in alguno:
+                union |= self._equipamiento(columna)
+            resultado &= union
+        if min_price is not None or max_price is not None:
+            with np.errstate(invalid='ignore'):
+                en_rango = np.ones(self.n, dtype=bool)
+                if min_price is not None:
+                    en_rango &= self.precios >= min_price
+                if max_price is not None:
+                    en_rango &= self.precios <= max_price
+            resultado &= empaquetar(en_rango)
+        # Los bits de relleno del último byte quedan a 0 (ahí ~bitmap los habría puesto a 1)
+        return resultado & self.todas
+
+    def _equipamiento(self, columna):
+        if columna not in self.equipamiento:
+            raise ValueError(f'No se puede filtrar por {columna}')
+        return self.equipamiento[columna]
+
+    def posiciones(self, bitmap):
+        """Posiciones (en orden de id) de los bits a 1."""
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.n, bitorder='little'))
+
+    def ids_de(self, bitmap, limite=None):
+        """Ids de las viviendas del bitset, de mayor a menor; como mucho `limite`."""
+        ids = self.ids[self.posiciones(bitmap)][::-1]
+        return ids if limite is None else ids[:limite]
+
+    def facetas(self, equipamiento=None, categorias=None, alguno=(), min_price=None, max_price=None):
+        """
+        Recuentos por valor de cada categórica y por variable de equipamiento bajo los filtros.
+        La faceta de una columna filtrada se cuenta sin su propio filtro, para que se vean las
+        alternativas. Se guardan las MAX_FACETAS_CACHE últimas combinaciones de filtros.
+        """
+        filtros = {
+            'equipamiento': dict(equipamiento or {}), 'categorias': dict(categorias or {}), 'alguno': list(alguno),
+            'min_price': min_price, 'max_price': max_price,
+        }
+        clave = clave_filtros(**filtros)
+        with self._cerrojo:
+            if clave in self._facetas:
+                # El último usado queda al final: se descarta el más antiguo
+                self._facetas[clave] = self._facetas.pop(clave)
+                return self._facetas[clave]
+
+        base = self.filtrar(**filtros)
+        posiciones_base = self.posiciones(base)
+        resultado = {'total': len(posiciones_base), 'categorias': {}, 'equipamiento': {}}
+        for columna, codigos in self.codigos.items():
+            posiciones = posiciones_base
+            if columna in filtros['categorias']:
+                sin_propio = {**filtros, 'categorias': {c: v for c, v in filtros['categorias'].items() if c != columna}}
+                posiciones = self.posiciones(self.filtrar(**sin_propio))
+            # Un solo bincount por faceta; el -1 de los que faltan cae en la casilla 0
+            seleccion = codigos if len(posiciones) == self.n else codigos[posiciones]
+            cuentas = np.bincount(seleccion + 1, minlength=len(self.valores[columna]) + 1)[1:]
+            etiquetas = self.etiquetas.get(columna, {})
+            resultado['categorias'][columna] = sorted(
+                (
+                    {'value': valor, 'label': etiquetas.get(valor), 'count': int(cuenta)}
+                    for valor, cuenta in zip(self.valores[columna], cuentas.tolist()) if cuenta
+                ),
+                key=lambda faceta: (-faceta['count'], faceta['value']),
+            )
+        for columna, bitmap in self.equipamiento.items():
+            con_filtros = base
+            if columna in filtros['equipamiento']:
+                sin_propio = {
+                    **filtros, 'equipamiento': {c: v for c, v in filtros['equipamiento'].items() if c != columna},
+                }
+                con_filtros = self.filtrar(**sin_propio)
+            resultado['equipamiento'][columna] = contar(con_filtros & bitmap)
+
+        with self._cerrojo:
+            self._facetas[clave] = resultado
+            while len(self._facetas) > MAX_FACETAS_CACHE:
+                del self._facetas[next(iter(self._facetas))]
+        return resultado
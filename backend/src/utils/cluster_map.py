@@ -0,0 +1,110 @@
+"""
+Mapa HTML de los clusters K-means (madrid_clusters_kmeans_map.html).
+Los marcadores se crean en el navegador: cada cluster es una capa FastMarkerCluster que
+recibe sus filas como un array JSON compacto y un callback de JavaScript que dibuja el
+círculo y el popup, en lugar de un folium.CircleMarker (y su HTML) por vivienda. Las
+filas se preparan por columnas con numpy. No depende de Django.
+"""
+import numpy as np
+import pandas as pd
+import folium
+from folium.plugins import FastMarkerCluster
+
+CENTRO_MADRID = (40.4168, -3.7038)
+# Los mismos colores que el notebook de clustering
+COLORES = ['red', 'blue', 'green', 'purple', 'orange', 'yellow', 'pink', 'brown', 'gray', 'cyan']
+# Columnas de cada fila del array: latitud, longitud y los datos del popup
+COLUMNAS_POPUP = ['buy_price', 'sq_mt_built', 'n_rooms', 'n_bathrooms']
+DECIMALES_COORDENADAS = 5  # ~1 m
+
+CALLBACK = """function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 5, color: '%(color)s', fill: true, fillColor: '%(color)s', fillOpacity: 0.7
+    });
+    marker.bindPopup(
+        'Cluster: %(cluster)s<br>Precio: ' + (row[2] === null ? '-' : row[2].toLocaleString('es-ES') + ' EUR') +
+        '<br>Tamaño: ' + (row[3] === null ? '-' : row[3] + ' m²') +
+        '<br>Habitaciones: ' + row[4] + ', Baños: ' + row[5]
+    );
+    return marker;
+}"""
+
+# Los grupos de cada capa llevan el color de su cluster
+ICONO_GRUPO = """function (cluster) {
+    var n = cluster.getChildCount();
+    var lado = n < 100 ? 30 : n < 1000 ? 36 : 44;
+    return L.divIcon({
+        html: '<div style="background:%(color)s;opacity:0.75;border-radius:50%%;width:' + lado + 'px;height:' +
+            lado + 'px;line-height:' + lado + 'px;text-align:center;color:white;font-weight:bold">' + n + '</div>',
+        className: '', iconSize: L.point(lado, lado)
+    });
+}"""
+
+
+def color_cluster(cluster):
+    return COLORES[int(cluster) % len(COLORES)]
+
+
+def filas_marcadores(df):
+    """
+    Filas [lat, lon, precio, m², habitaciones, baños] de cada vivienda como listas de Python,
+    con las coordenadas redondeadas, los enteros sin decimales y None donde falta el dato.
+    """
+    columnas = {
+        'latitude': df['latitude'].astype('float64').round(DECIMALES_COORDENADAS),
+        'longitude': df['longitude'].astype('float64').round(DECIMALES_COORDENADAS),
+        **{columna: df[columna].astype('float64').round() for columna in COLUMNAS_POPUP},
+    }
+    tabla = pd.DataFrame(columnas)
+    # Int64 para que los enteros salgan sin ".0"; object para que NaN pase a None
+    tabla[COLUMNAS_POPUP] = tabla[COLUMNAS_POPUP].astype('Int64')
+    return tabla.astype(object).where(tabla.notna(), None).to_numpy().tolist()
+
+
+def mapa_clusters(df, columna='cluster'):
+    """
+    folium.Map con una capa por cluster (activables desde el control de capas). `df` lleva
+    latitude, longitude, la columna del cluster y las de COLUMNAS_POPUP.
+    """
+    df = df.dropna(subset=['latitude', 'longitude'])
+    mapa = folium.Map(location=CENTRO_MADRID, zoom_start=11, prefer_canvas=True)
+    clusters = df[columna].to_numpy()
+    for cluster in np.unique(clusters):
+        seleccion = df[clusters == cluster]
+        color = color_cluster(cluster)
+        FastMarkerCluster(
+            filas_marcadores(seleccion),
+            callback=CALLBACK % {'color': color, 'cluster': cluster},
+            icon_create_function=ICONO_GRUPO % {'color': color},
+            name=f'Cluster {cluster} ({len(seleccion)} viviendas)',
+            chunkedLoading=True,
+            disableClusteringAtZoom=17,
+        ).add_to(mapa)
+    folium.LayerControl(collapsed=False).add_to(mapa)
+    return mapa
+
+
+def mapa_por_filas(df, columna='cluster'):
+    """
+    Método de los notebooks (un folium.CircleMarker con popup por fila de df.iterrows()).
+    Se conserva para comparar tiempos y tamaños.
+    """
+    mapa = folium.Map(location=CENTRO_MADRID, zoom_start=11)
+    for _, row in df.dropna(subset=['latitude', 'longitude']).iterrows():
+        cluster = row[columna]
+        color = color_cluster(cluster)
+        folium.CircleMarker(
+            location=[row['latitude'], row['longitude']],
+            radius=5,
+            color=color,
+            fill=True,
+            fill_color=color,
+            fill_opacity=0.7,
+            popup=(
+                f"Cluster: {cluster}<br>"
+                f"Precio: {row['buy_price']:.2f} EUR<br>"
+                f"Tamaño: {row['sq_mt_built']} m²<br>"
+                f"Habitaciones: {row['n_rooms']}, Baños: {row['n_bathrooms']}"
+            ),
+        ).add_to(mapa)
+    return mapa
@@ -0,0 +1,191 @@
+"""
+Comparables (comps) de una vivienda: las k más parecidas por ubicación, superficie,
+habitaciones, baños, año de construcción, planta y equipamiento.
+Las variables numéricas se tipifican con el StandardScaler del preprocesador del modelo de
+precio (preprocessor.joblib), así que "parecido" se mide en las mismas unidades con las que
+se entrenó. Cada columna se multiplica por su peso y las viviendas se indexan en un
+BallTree euclídeo: una consulta cuesta O(log n + k).
+No depende de Django.
+"""
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+# Variables numéricas (del StandardScaler del modelo de precio) y binarias de equipamiento
+NUMERICAS_COMPS = ('latitude', 'longitude', 'sq_mt_built', 'n_rooms', 'n_bathrooms', 'built_year', 'floor')
+EQUIPAMIENTO = (
+    'has_lift', 'is_exterior', 'has_parking', 'is_new_development', 'has_central_heating',
+    'has_individual_heating', 'has_ac', 'has_garden', 'has_pool', 'has_terrace', 'has_storage_room',
+    'is_furnished', 'is_orientation_north', 'is_orientation_south', 'is_orientation_east', 'is_orientation_west',
+)
+# Grupos con peso configurable: location pondera latitud y longitud, y amenities cada binaria
+GRUPOS = {
+    'location': ('latitude', 'longitude'),
+    'sq_mt_built': ('sq_mt_built',),
+    'n_rooms': ('n_rooms',),
+    'n_bathrooms': ('n_bathrooms',),
+    'built_year': ('built_year',),
+    'floor': ('floor',),
+    'amenities': EQUIPAMIENTO,
+}
+PESOS_POR_DEFECTO = {
+    'location': 3.0, 'sq_mt_built': 2.0, 'n_rooms': 1.0, 'n_bathrooms': 1.0,
+    'built_year': 0.5, 'floor': 0.5, 'amenities': 0.25,
+}
+COLUMNAS_COMPS = ('id', 'address', 'buy_price', *NUMERICAS_COMPS, *EQUIPAMIENTO)
+MAX_INDICES_PESOS = 8
+
+
+def pesos_completos(pesos=None):
+    """PESOS_POR_DEFECTO con los grupos de `pesos` sustituidos (ValueError si alguno no existe o es negativo)."""
+    pesos = dict(pesos or {})
+    desconocidos = set(pesos) - set(GRUPOS)
+    if desconocidos:
+        raise ValueError(f'Grupos de pesos desconocidos: {", ".join(sorted(desconocidos))}')
+    if any(not np.isfinite(peso) or peso < 0 for peso in pesos.values()):
+        raise ValueError('Los pesos deben ser números no negativos')
+    return {**PESOS_POR_DEFECTO, **pesos}
+
+
+def matriz_caracteristicas(df, escalador):
+    """
+    Matriz (n, variables) sin ponderar: numéricas tipificadas con `escalador` (media y escala
+    por nombre de columna) y binarias 0/1. Los valores que faltan quedan en la media (0).
+    """
+    numericas = pd.DataFrame({
+        columna: pd.to_numeric(df[columna], errors='coerce') if columna in df else np.nan
+        for columna in NUMERICAS_COMPS
+    }, index=df.index).astype('float64')
+    media = np.array([escalador['mean'][columna] for columna in NUMERICAS_COMPS])
+    escala = np.array([escalador['scale'][columna] for columna in NUMERICAS_COMPS])
+    tipificadas = np.nan_to_num((numericas.to_numpy() - media) / escala, nan=0.0)
+    binarias = np.column_stack([
+        df[columna].astype('boolean').astype('float64').fillna(0).to_numpy() if columna in df
+        else np.zeros(len(df))
+        for columna in EQUIPAMIENTO
+    ]) if len(df) else np.empty((0, len(EQUIPAMIENTO)))
+    return np.hstack((tipificadas, binarias))
+
+
+def vector_caracteristicas(sujeto, escalador):
+    """Fila de matriz_caracteristicas para un solo sujeto (dict), sin pasar por pandas."""
+    fila = []
+    for columna in NUMERICAS_COMPS:
+        try:
+            valor = float(sujeto.get(columna))
+        except (TypeError, ValueError):
+            valor = math.nan
+        fila.append((valor - escalador['mean'][columna]) / escalador['scale'][columna] if math.isfinite(valor) else 0.0)
+    for columna in EQUIPAMIENTO:
+        valor = sujeto.get(columna)
+        fila.append(float(valor is not None and not pd.isna(valor) and bool(valor)))
+    return np.array(fila)
+
+
+def vector_pesos(pesos):
+    """Peso de cada columna de matriz_caracteristicas."""
+    por_columna = {columna: pesos[grupo] for grupo, columnas in GRUPOS.items() for columna in columnas}
+    return np.array([por_columna[columna] for columna in (*NUMERICAS_COMPS, *EQUIPAMIENTO)])
+
+
+def escalador_modelo(preprocesador):
+    """Media y escala por variable del StandardScaler numérico del preprocesador del modelo de precio."""
+    for _, transformador, columnas in preprocesador.transformers_:
+        pasos = getattr(transformador, 'named_steps', {})
+        if 'scaler' in pasos:
+            escalador = pasos['scaler']
+            return {
+                'mean': dict(zip(columnas, escalador.mean_)),
+                'scale': dict(zip(columnas, escalador.scale_)),
+            }
+    raise ValueError('El preprocesador no tiene un StandardScaler numérico')
+
+
+class MotorComparables:
+    """
+    `viviendas` es un DataFrame con COLUMNAS_COMPS; `escalador` como lo devuelve escalador_modelo.
+    El índice de los pesos por defecto se construye al crear el motor; los de otros pesos, la
+    primera vez que se piden (se guardan los MAX_INDICES_PESOS últimos).
+    """
+
+    def __init__(self, viviendas, escalador):
+        viviendas = viviendas.dropna(subset=['latitude', 'longitude']).reset_index(drop=True)
+        # Columnas como arrays de objetos (None donde falta el dato) para montar las respuestas
+        self.columnas = {
+            columna: viviendas[columna].astype(object).where(viviendas[columna].notna(), None).to_numpy()
+            for columna in viviendas.columns
+        }
+        self.escalador = escalador
+        self.caracteristicas = matriz_caracteristicas(viviendas, escalador)
+        self.ids = viviendas['id'].to_numpy()
+        self.posicion_id = pd.Series(np.arange(len(viviendas)), index=self.ids)
+        self.precios = pd.to_numeric(viviendas['buy_price'], errors='coerce').to_numpy(dtype='float64')
+        self.superficies = pd.to_numeric(viviendas['sq_mt_built'], errors='coerce').to_numpy(dtype='float64')
+        self._arboles = {}
+        self._cerrojo = threading.Lock()
+        self.arbol(PESOS_POR_DEFECTO)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def arbol(self, pesos):
+        """BallTree de las características ponderadas con `pesos` (completos)."""
+        clave = tuple(sorted(pesos.items()))
+        with self._cerrojo:
+            arbol = self._arboles.pop(clave, None)
+            if arbol is None and len(self):
+                arbol = BallTree(self.caracteristicas * vector_pesos(pesos))
+            # El último usado queda al final: se descarta el más antiguo
+            self._arboles[clave] = arbol
+            while len(self._arboles) > MAX_INDICES_PESOS:
+                del self._arboles[next(iter(self._arboles))]
+        return arbol
+
+    def sujeto(self, vivienda_id):
+        """Vivienda `vivienda_id` del índice como dict (KeyError si no está)."""
+        return self.registros([self.posicion_id[vivienda_id]])[0]
+
+    def registros(self, posiciones, columnas=None):
+        """Viviendas de `posiciones` como diccionarios."""
+        valores = [(columna, self.columnas[columna][posiciones].tolist()) for columna in (columnas or self.columnas)]
+        return [{columna: lista[i] for columna, lista in valores} for i in range(len(posiciones))]
+
+    def buscar(self, sujeto, k=10, pesos=None, excluir_id=None):
+        """
+        (posiciones, distancias) de las k viviendas más parecidas a `sujeto` (dict con
+        las variables de NUMERICAS_COMPS y EQUIPAMIENTO), de la más a la menos parecida.
+        """
+        pesos = pesos_completos(pesos)
+        arbol = self.arbol(pesos)
+        if arbol is None:
+            return np.empty(0, dtype='int64'), np.empty(0)
+        consulta = vector_caracteristicas(sujeto, self.escalador) * vector_pesos(pesos)
+        distancias, posiciones = arbol.query(consulta[np.newaxis], k=min(k + (excluir_id is not None), len(self)))
+        posiciones, distancias = posiciones[0], distancias[0]
+        if excluir_id is not None:
+            conservar = self.ids[posiciones] != excluir_id
+            posiciones, distancias = posiciones[conservar][:k], distancias[conservar][:k]
+        return posiciones, distancias
+
+    def estimar(self, posiciones, distancias, superficie=None):
+        """
+        Precio estimado con los comparables ponderados por similitud (1 / (1 + distancia)):
+        media ponderada del precio y del €/m² y, si se conoce la superficie del sujeto, €/m² × m².
+        Devuelve (estimación, similitudes).
+        """
+        similitud = 1.0 / (1.0 + distancias)
+        precios = self.precios[posiciones]
+        superficies = self.superficies[posiciones]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            precio_m2 = np.where(superficies > 0, precios / superficies, np.nan)
+        estimacion = {'buy_price': None, 'price_m2': None, 'buy_price_by_area': None}
+        for clave, valores in (('buy_price', precios), ('price_m2', precio_m2)):
+            conocidos = ~np.isnan(valores)
+            if conocidos.any():
+                estimacion[clave] = float(np.average(valores[conocidos], weights=similitud[conocidos]))
+        if estimacion['price_m2'] is not None and superficie is not None and superficie > 0:
+            estimacion['buy_price_by_area'] = estimacion['price_m2'] * superficie
+        return estimacion, similitud
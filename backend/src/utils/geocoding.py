@@ -0,0 +1,194 @@
+"""
+Geocodificación por lotes contra un Nominatim local (http://localhost:8080/search).
+Sustituye al bucle del notebook data_madrid.ipynb (un requests.get bloqueante por
+dirección, sin caché ni reintentos) por un cliente asyncio con concurrencia acotada,
+reintentos con backoff exponencial y una caché SQLite persistente por dirección
+normalizada. Los resultados se guardan en la caché al terminar cada lote, así que una
+ejecución interrumpida se retoma donde se quedó. No depende de Django.
+"""
+import asyncio
+import json
+import random
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import aiohttp
+
+from src.utils.addresses import normalizar_texto
+
+URL_NOMINATIM = 'http://localhost:8080/search'
+# Respuestas que merece la pena repetir: saturación o fallo del servidor
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+_COMAS_RE = re.compile(r'\s*,\s*')
+
+
+def clave_geocodificacion(direccion):
+    """Dirección normalizada (minúsculas, sin acentos ni espacios de más) que indexa la caché."""
+    return _COMAS_RE.sub(',', normalizar_texto(direccion)).strip(',')
+
+
+class CacheGeocodificacion:
+    """Caché SQLite clave -> (latitude, longitude); las direcciones sin resultado se guardan con NULL."""
+
+    def __init__(self, ruta):
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.execute('PRAGMA journal_mode=WAL')
+        self.conexion.execute(
+            'CREATE TABLE IF NOT EXISTS geocodificacion ('
+            'clave TEXT PRIMARY KEY, direccion TEXT NOT NULL, latitude REAL, longitude REAL, '
+            'actualizada TEXT NOT NULL)'
+        )
+
+    def obtener(self, claves):
+        """{clave: (latitude, longitude)} de las claves ya resueltas; (None, None) si no hubo resultado."""
+        resultado = {}
+        claves = list(claves)
+        # SQLite limita el número de parámetros por consulta
+        for inicio in range(0, len(claves), 500):
+            trozo = claves[inicio:inicio + 500]
+            filas = self.conexion.execute(
+                f'SELECT clave, latitude, longitude FROM geocodificacion '
+                f'WHERE clave IN ({", ".join("?" * len(trozo))})',
+                trozo,
+            )
+            resultado.update((clave, (lat, lon)) for clave, lat, lon in filas)
+        return resultado
+
+    def guardar(self, filas):
+        """Guarda [(clave, direccion, latitude, longitude)] en una sola transacción."""
+        ahora = datetime.now(timezone.utc).isoformat()
+        with self.conexion:
+            self.conexion.executemany(
+                'INSERT OR REPLACE INTO geocodificacion VALUES (?, ?, ?, ?, ?)',
+                [(*fila, ahora) for fila in filas],
+            )
+
+    def olvidar_sin_resultado(self):
+        """Borra las direcciones sin resultado para volver a intentarlas."""
+        with self.conexion:
+            return self.conexion.execute('DELETE FROM geocodificacion WHERE latitude IS NULL').rowcount
+
+    def cerrar(self):
+        self.conexion.close()
+
+
+class ErrorGeocodificacion(Exception):
+    """El servidor no respondió bien tras todos los reintentos."""
+
+
+@dataclass
+class ClienteNominatim:
+    url: str = URL_NOMINATIM
+    concurrencia: int = 8
+    reintentos: int = 3
+    espera: float = 0.5  # segundos antes del primer reintento; se duplica en cada uno
+    timeout: float = 10.0
+
+    async def buscar(self, sesion, semaforo, direccion):
+        """(latitude, longitude) de la dirección, o (None, None) si Nominatim no la encuentra."""
+        parametros = {'q': direccion, 'format': 'json', 'limit': 1}
+        for intento in range(self.reintentos + 1):
+            try:
+                async with semaforo:
+                    async with sesion.get(self.url, params=parametros) as respuesta:
+                        if respuesta.status not in ESTADOS_REINTENTABLES:
+                            respuesta.raise_for_status()
+                            return self.coordenadas(await respuesta.text())
+                        error = f'HTTP {respuesta.status}'
+            except aiohttp.ClientResponseError as e:
+                # 4xx distinto de 429: la petición está mal, repetirla no sirve
+                raise ErrorGeocodificacion(f'HTTP {e.status}') from e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+            if intento < self.reintentos:
+                # Backoff exponencial con algo de aleatoriedad para no reintentar todas a la vez
+                await asyncio.sleep(self.espera * 2 ** intento * random.uniform(0.5, 1.5))
+        raise ErrorGeocodificacion(error)
+
+    @staticmethod
+    def coordenadas(cuerpo):
+        """(latitude, longitude) del primer resultado de una respuesta 200; (None, None) si no hay ninguno."""
+        try:
+            datos = json.loads(cuerpo)
+            if not datos:
+                return None, None
+            return float(datos[0]['lat']), float(datos[0]['lon'])
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            # Cuerpo que no es JSON o sin lat/lon: cuenta como error y se reintenta en otra ejecución
+            raise ErrorGeocodificacion(f'Respuesta mal formada: {type(e).__name__}') from e
+
+    def sesion(self):
+        return aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            connector=aiohttp.TCPConnector(limit=self.concurrencia),
+        )
+
+
+@dataclass
+class ResultadoGeocodificacion:
+    direcciones: int = 0  # direcciones distintas (por clave normalizada)
+    en_cache: int = 0
+    encontradas: int = 0
+    sin_resultado: int = 0
+    errores: int = 0  # no se guardan: se reintentan en la siguiente ejecución
+    lotes: int = 0
+    segundos: float = 0.0
+
+    @property
+    def consultadas(self):
+        return self.encontradas + self.sin_resultado + self.errores
+
+    @property
+    def por_segundo(self):
+        return self.consultadas / self.segundos if self.segundos else 0.0
+
+
+async def geocodificar(direcciones, cache, cliente, lote=500, progreso=None):
+    """
+    Geocodifica las direcciones que no están en la caché, guardando cada lote al terminarlo.
+    Devuelve ({clave: (latitude, longitude)} de todas las direcciones, ResultadoGeocodificacion).
+    """
+    inicio = time.perf_counter()
+    resultado = ResultadoGeocodificacion()
+    unicas = {}
+    for direccion in direcciones:
+        unicas.setdefault(clave_geocodificacion(direccion), direccion)
+    unicas.pop('', None)
+    resultado.direcciones = len(unicas)
+
+    coordenadas = cache.obtener(unicas)
+    resultado.en_cache = len(coordenadas)
+    pendientes = [(clave, direccion) for clave, direccion in unicas.items() if clave not in coordenadas]
+
+    semaforo = asyncio.Semaphore(cliente.concurrencia)
+    async with cliente.sesion() as sesion:
+        for desde in range(0, len(pendientes), lote):
+            trozo = pendientes[desde:desde + lote]
+            respuestas = await asyncio.gather(
+                *(cliente.buscar(sesion, semaforo, direccion) for _, direccion in trozo),
+                return_exceptions=True,
+            )
+            guardar = []
+            for (clave, direccion), respuesta in zip(trozo, respuestas):
+                if isinstance(respuesta, ErrorGeocodificacion):
+                    resultado.errores += 1
+                    continue
+                if isinstance(respuesta, BaseException):
+                    raise respuesta
+                coordenadas[clave] = respuesta
+                guardar.append((clave, direccion, *respuesta))
+                if respuesta[0] is None:
+                    resultado.sin_resultado += 1
+                else:
+                    resultado.encontradas += 1
+            cache.guardar(guardar)
+            resultado.lotes += 1
+            resultado.segundos = time.perf_counter() - inicio
+            if progreso:
+                progreso(resultado)
+    resultado.segundos = time.perf_counter() - inicio
+    return coordenadas, resultado
@@ -0,0 +1,235 @@
+"""
+Pirámide de rejillas para mapas de calor de precios.
+Cada nivel es una rejilla de celdas cuadradas que coinciden con las teselas z/x/y de ese
+zoom (de ~30 km a ~230 m de lado en Madrid). Por celda se guardan el recuento y la media
+y la mediana de buy_price, €/m² y rent_price, calculadas sin bucles de Python: bincount
+para las medias y una ordenación (celda, valor) para las medianas.
+
+Las celdas se identifican por su código Morton (src.utils.tiles), así que la celda de un
+nivel inferior es un desplazamiento de bits de la del nivel superior y las celdas de una
+tesela son un rango contiguo. Cuando cambian viviendas solo se recalculan las celdas que
+las contienen (antes y después del cambio), en todos los niveles. No depende de Django.
+"""
+import struct
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from src.utils.tiles import ZOOM_MAXIMO, morton, separar_morton, teselas
+
+NIVELES = tuple(range(10, 18))
+VARIABLES = ('buy_price', 'price_m2', 'rent_price')
+METRICAS = ('count', *(f'{variable}_{estadistico}' for variable in VARIABLES for estadistico in ('mean', 'median')))
+# Celdas por lado de tesela en el raster: 2 ** 6 = 64
+BITS_RASTER = 6
+MAX_BITS_RASTER = 8
+
+
+def filas_rejilla(df):
+    """
+    De un DataFrame con id, latitude, longitude, buy_price, sq_mt_built y rent_price a las
+    filas de la pirámide, indexadas por id: código Morton en ZOOM_MAXIMO y las variables.
+    """
+    df = df.dropna(subset=['latitude', 'longitude'])
+    x, y = teselas(df['latitude'], df['longitude'], ZOOM_MAXIMO)
+    precio = df['buy_price'].astype('float64').to_numpy()
+    superficie = df['sq_mt_built'].astype('float64').to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        precio_m2 = np.where(superficie > 0, precio / superficie, np.nan)
+    return pd.DataFrame(
+        {
+            'codigo': morton(x, y),
+            'buy_price': precio,
+            'price_m2': precio_m2,
+            'rent_price': df['rent_price'].astype('float64').to_numpy(),
+        },
+        index=pd.Index(df['id'].to_numpy(), name='id'),
+    )
+
+
+def estadisticas(celdas, filas, por_valor=None):
+    """
+    Métricas por celda. `celdas` es el código de celda de cada fila, en orden no decreciente
+    (las filas van ordenadas por código Morton, así que cada celda es un tramo contiguo).
+    `por_valor` ({variable: orden de las filas por valor}) evita reordenar en cada nivel.
+    Devuelve un DataFrame indexado por los códigos de celda.
+    """
+    primera = np.ones(len(celdas), dtype=bool)
+    primera[1:] = celdas[1:] != celdas[:-1]
+    unicas = celdas[primera]
+    inversa = np.cumsum(primera) - 1
+    n = len(unicas)
+    # Con hasta 65.536 celdas el orden estable por celda es un radix sort de 16 bits
+    tipo_celda = 'uint16' if n <= 1 << 16 else 'int64'
+    resultado = {'count': np.bincount(inversa, minlength=n)}
+    for variable in VARIABLES:
+        valores = filas[variable].to_numpy(dtype='float64')
+        orden = por_valor[variable] if por_valor else orden_por_valor(valores)
+        # Valores conocidos de menor a mayor y, sin perder ese orden, agrupados por celda
+        orden = orden[np.argsort(inversa[orden].astype(tipo_celda), kind='stable')]
+        ordenados = valores[orden]
+        k = np.bincount(inversa[orden], minlength=n)
+        inicio = np.concatenate(([0], np.cumsum(k)[:-1]))
+        con_datos = k > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            resultado[f'{variable}_mean'] = np.bincount(inversa[orden], ordenados, minlength=n) / k
+        if len(ordenados):
+            bajo = np.where(con_datos, inicio + (k - 1) // 2, 0)
+            alto = np.where(con_datos, inicio + k // 2, 0)
+            resultado[f'{variable}_median'] = np.where(con_datos, (ordenados[bajo] + ordenados[alto]) / 2, np.nan)
+        else:
+            resultado[f'{variable}_median'] = np.full(n, np.nan)
+    return pd.DataFrame(resultado, index=pd.Index(unicas, name='celda'))[list(METRICAS)]
+
+
+def orden_por_valor(valores):
+    """Posiciones de los valores conocidos, de menor a mayor (los NaN se descartan)."""
+    conocidos = np.flatnonzero(~np.isnan(valores))
+    return conocidos[np.argsort(valores[conocidos], kind='stable')]
+
+
+def _desplazamiento(nivel):
+    return np.uint64(2 * (ZOOM_MAXIMO - nivel))
+
+
+class PiramideRejilla:
+    """`filas` como las devuelve filas_rejilla."""
+
+    def __init__(self, filas, niveles=NIVELES):
+        # Datos de origen (p. ej. la DatasetVersion con la que está al día)
+        self.metadatos = {}
+        self.filas = filas.iloc[np.argsort(filas['codigo'].to_numpy(), kind='stable')]
+        codigos = self.filas['codigo'].to_numpy()
+        por_valor = {variable: orden_por_valor(self.filas[variable].to_numpy(dtype='float64')) for variable in VARIABLES}
+        self.niveles = {
+            nivel: estadisticas(codigos >> _desplazamiento(nivel), self.filas, por_valor)
+            for nivel in niveles
+        }
+
+    def actualizar(self, eliminadas=(), nuevas=None):
+        """
+        Quita las viviendas `eliminadas` (ids) y añade o sustituye las `nuevas` (filas_rejilla).
+        Devuelve el número de celdas recalculadas en todos los niveles.
+        """
+        nuevas = nuevas if nuevas is not None else self.filas.iloc[:0]
+        salientes = self.filas.index.intersection(pd.Index(eliminadas).union(nuevas.index))
+        codigos = np.concatenate((self.filas.loc[salientes, 'codigo'].to_numpy(), nuevas['codigo'].to_numpy()))
+        filas = self.filas.drop(salientes)
+        if len(nuevas):
+            filas = pd.concat([filas, nuevas])
+        # Casi ordenado: el orden estable (timsort) aprovecha los tramos ya ordenados
+        self.filas = filas.iloc[np.argsort(filas['codigo'].to_numpy(), kind='stable')]
+
+        # Las celdas sucias de cada nivel están dentro de las del nivel más grueso: sus filas se
+        # ordenan por valor una sola vez y cada nivel filtra ese orden
+        codigos = codigos.astype('uint64')
+        gruesas = np.unique(codigos >> _desplazamiento(min(self.niveles)))
+        todas = self.filas['codigo'].to_numpy()
+        candidatas = self.filas[np.isin(todas >> _desplazamiento(min(self.niveles)), gruesas)]
+        codigos_candidatas = candidatas['codigo'].to_numpy()
+        por_valor = {
+            variable: orden_por_valor(candidatas[variable].to_numpy(dtype='float64')) for variable in VARIABLES
+        }
+
+        recalculadas = 0
+        for nivel, tabla in self.niveles.items():
+            sucias = np.unique(codigos >> _desplazamiento(nivel))
+            celdas = codigos_candidatas >> _desplazamiento(nivel)
+            afectadas = np.isin(celdas, sucias)
+            posicion = np.cumsum(afectadas) - 1
+            nuevas_estadisticas = estadisticas(
+                celdas[afectadas], candidatas[afectadas],
+                {variable: posicion[orden[afectadas[orden]]] for variable, orden in por_valor.items()},
+            )
+            # Las celdas que se han quedado vacías desaparecen
+            tabla = tabla.drop(sucias, errors='ignore')
+            self.niveles[nivel] = pd.concat([tabla, nuevas_estadisticas]).sort_index()
+            recalculadas += len(sucias)
+        return recalculadas
+
+    def nivel_raster(self, zoom, detalle=BITS_RASTER):
+        """
+        Nivel de la pirámide para una tesela de `zoom` con 2 ** detalle celdas por lado.
+        Por encima del nivel más fino se usa ese; por debajo del más grueso no hay rejilla de
+        ese tamaño (las medianas no se pueden agregar desde celdas más finas): ValueError.
+        """
+        if zoom + detalle < min(self.niveles):
+            raise ValueError(
+                f'Con z={zoom} detail debe ser al menos {min(self.niveles) - zoom}: '
+                f'el nivel más grueso del mapa de calor es {min(self.niveles)}'
+            )
+        return min(zoom + detalle, max(self.niveles))
+
+    def rejilla(self, zoom, x, y, metrica, detalle=BITS_RASTER):
+        """
+        Valores de la métrica en la tesela como array 2D (fila = y, columna = x; NaN sin datos).
+        Si el zoom supera el nivel más fino, la tesela es una sola celda de ese nivel.
+        ValueError si zoom + detalle no llega al nivel más grueso (ver nivel_raster).
+        """
+        nivel = self.nivel_raster(zoom, detalle)
+        tabla = self.niveles[nivel]
+        if nivel >= zoom:
+            lado = 1 << (nivel - zoom)
+            bits = np.uint64(2 * (nivel - zoom))
+            base = morton(x, y) << bits
+            fin = base + (np.uint64(1) << bits)
+        else:
+            lado = 1
+            reduccion = zoom - nivel
+            base = morton(x >> reduccion, y >> reduccion)
+            fin = base + np.uint64(1)
+        codigos = tabla.index.to_numpy(dtype='uint64')
+        inicio, final = np.searchsorted(codigos, [base, fin])
+        valores = np.full((lado, lado), np.nan)
+        cx, cy = separar_morton(codigos[inicio:final] - base)
+        valores[cy, cx] = tabla[metrica].to_numpy(dtype='float64')[inicio:final]
+        return valores
+
+    def escala(self, nivel, metrica):
+        """(mínimo, máximo) para la rampa de color: percentiles 2 y 98 del nivel."""
+        valores = self.niveles[nivel][metrica].dropna().to_numpy()
+        if not len(valores):
+            return 0.0, 1.0
+        minimo, maximo = np.percentile(valores, [2, 98])
+        return float(minimo), float(max(maximo, minimo + 1e-9))
+
+
+# Rampa de color (de azul a rojo pasando por amarillo), interpolada a 256 entradas
+_PUNTOS_RAMPA = np.array([
+    (49, 54, 149), (69, 117, 180), (116, 173, 209), (171, 217, 233), (254, 224, 144),
+    (253, 174, 97), (244, 109, 67), (215, 48, 39), (165, 0, 38),
+], dtype='float64')
+RAMPA = np.stack([
+    np.interp(np.linspace(0, len(_PUNTOS_RAMPA) - 1, 256), np.arange(len(_PUNTOS_RAMPA)), _PUNTOS_RAMPA[:, canal])
+    for canal in range(3)
+], axis=1).astype('uint8')
+
+
+def colorear(valores, minimo, maximo, opacidad=180):
+    """Array 2D de valores -> imagen RGBA (alto, ancho, 4); las celdas sin datos, transparentes."""
+    posiciones = np.clip((valores - minimo) / (maximo - minimo) * 255, 0, 255)
+    imagen = np.zeros((*valores.shape, 4), dtype='uint8')
+    con_datos = ~np.isnan(valores)
+    imagen[con_datos, :3] = RAMPA[posiciones[con_datos].astype('int64')]
+    imagen[con_datos, 3] = opacidad
+    return imagen
+
+
+def _bloque_png(tipo, datos):
+    return struct.pack('>I', len(datos)) + tipo + datos + struct.pack('>I', zlib.crc32(tipo + datos))
+
+
+def png(imagen, escala=1):
+    """PNG RGBA de 8 bits con zlib; `escala` repite cada celda en escala × escala píxeles."""
+    if escala > 1:
+        imagen = imagen.repeat(escala, axis=0).repeat(escala, axis=1)
+    alto, ancho = imagen.shape[:2]
+    # Cada fila va precedida del tipo de filtro (0: ninguno)
+    filas = np.concatenate([np.zeros((alto, 1), dtype='uint8'), imagen.reshape(alto, ancho * 4)], axis=1)
+    return b''.join((
+        b'\x89PNG\r\n\x1a\n',
+        _bloque_png(b'IHDR', struct.pack('>IIBBBBB', ancho, alto, 8, 6, 0, 0, 0)),
+        _bloque_png(b'IDAT', zlib.compress(filas.tobytes(), 6)),
+        _bloque_png(b'IEND', b''),
+    ))
@@ -0,0 +1,390 @@
+"""
+Importación masiva, incremental e idempotente de viviendas desde CSV.
+Lee el fichero por bloques, convierte los tipos de forma vectorizada con pandas y
+descarta en memoria las direcciones repetidas del fichero. Las filas que incumplen las
+reglas de src.utils.validation van a la tabla de cuarentena. Cada fila lleva un hash de
+su contenido: comparándolo con el guardado se clasifica como nueva, modificada o sin
+cambios, y solo se escriben las nuevas y las modificadas. Las direcciones de la tabla
+que ya no vienen en el fichero se dan de baja. Cada importación con cambios crea una
+DatasetVersion y envía la señal dataset_actualizado con los ids afectados; el fallo de
+un receptor se registra en el log sin impedir que se ejecuten los demás.
+La escritura depende del motor:
+- PostgreSQL: COPY ... FROM STDIN de cada bloque a una tabla temporal y un único
+  INSERT ... SELECT ... ON CONFLICT (address_key) DO UPDATE al final.
+- SQLite (y el resto): executemany del upsert de una fila, por lotes.
+"""
+import time
+from dataclasses import dataclass, field
+from io import StringIO
+from itertools import chain
+from pathlib import Path
+
+import pandas as pd
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from src.models import DatasetVersion, House, QuarantinedHouse
+from src.services.versioning import checksum_fichero
+from src.signals import dataset_actualizado
+from src.utils.addresses import claves_direccion
+from src.utils.locations import COLUMNAS_EMPAQUETADAS, expandir_campos
+from src.utils.validation import contar_motivos, separar
+
+VALORES_VERDADEROS = ('true', '1', '1.0', 'yes', 'si', 'sí')
+
+# latitude / longitude son obligatorias en House: sin ellas en la cabecera no se importa nada
+COLUMNAS_OBLIGATORIAS = ('latitude', 'longitude')
+
+
+def _campos_por_tipo():
+    """Agrupa los campos editables de House según la conversión que necesitan."""
+    tipos = {'bool': [], 'int': [], 'float': [], 'decimal': [], 'texto': []}
+    for campo in House._meta.concrete_fields:
+        if campo.primary_key or not campo.editable:
+            continue
+        if isinstance(campo, models.BooleanField):
+            tipos['bool'].append(campo.name)
+        elif isinstance(campo, models.IntegerField):
+            tipos['int'].append(campo.name)
+        elif isinstance(campo, models.FloatField):
+            tipos['float'].append(campo.name)
+        elif isinstance(campo, models.DecimalField):
+            tipos['decimal'].append((campo.name, campo.decimal_places))
+        else:
+            tipos['texto'].append(campo.name)
+    return tipos
+
+
+CAMPOS = _campos_por_tipo()
+COLUMNAS_HOUSE = (
+    CAMPOS['bool'] + CAMPOS['int'] + CAMPOS['float']
+    + [nombre for nombre, _ in CAMPOS['decimal']] + CAMPOS['texto']
+)
+
+# Columnas que se escriben, en orden: las del CSV normalizadas, la clave de dirección y el hash
+COLUMNAS_ESCRITURA = COLUMNAS_HOUSE + ['address_key', 'content_hash']
+COLUMNAS_FECHA = ['created_at', 'updated_at']
+
+TABLA_STAGING = 'house_staging'
+NULO_COPY = '\\N'
+
+
+@dataclass
+class ResultadoImportacion:
+    leidas: int = 0
+    cuarentena: int = 0  # filas que incumplen alguna regla de validación
+    duplicadas: int = 0
+    nuevas: int = 0
+    modificadas: int = 0
+    sin_cambios: int = 0
+    eliminadas: int = 0
+    escritas: int = 0  # filas insertadas o actualizadas en la base de datos
+    version: int = 0  # DatasetVersion vigente tras la importación
+    segundos: float = 0.0
+    metodo: str = ''  # 'copy' en PostgreSQL, 'executemany' en el resto
+    motivos: dict = field(default_factory=dict)  # {código de regla: filas en cuarentena}
+    receptores_fallidos: list = field(default_factory=list)  # receptores de dataset_actualizado que fallaron
+    # address_key de las filas nuevas / modificadas, para el conjunto de cambios
+    claves_nuevas: list = field(default_factory=list, repr=False)
+    claves_modificadas: list = field(default_factory=list, repr=False)
+
+    @property
+    def filas_por_segundo(self):
+        return self.leidas / self.segundos if self.segundos else 0.0
+
+
+def leer_bloques(ruta_csv, chunksize):
+    """
+    Iterador de DataFrames con las columnas de House (y las empaquetadas), todas como texto,
+    y el `id` del anuncio si lo trae el CSV (clave de las viviendas sin calle).
+    """
+    cabecera = pd.read_csv(ruta_csv, nrows=0).columns
+    faltan = [columna for columna in COLUMNAS_OBLIGATORIAS if columna not in cabecera]
+    if faltan:
+        raise ValueError(f'Faltan columnas obligatorias en el CSV: {", ".join(faltan)}')
+    usecols = [columna for columna in ['id', *COLUMNAS_HOUSE, *COLUMNAS_EMPAQUETADAS] if columna in cabecera]
+    return pd.read_csv(ruta_csv, usecols=usecols, dtype=str, keep_default_na=True, chunksize=chunksize)
+
+
+def convertir_bloque(df):
+    """Convierte un bloque leído como texto a los tipos de House, columna a columna."""
+    df = expandir_campos(df)
+    convertido = pd.DataFrame(index=df.index)
+    for nombre in CAMPOS['bool']:
+        if nombre in df:
+            convertido[nombre] = df[nombre].str.strip().str.lower().isin(VALORES_VERDADEROS)
+    for nombre in CAMPOS['int']:
+        if nombre in df:
+            convertido[nombre] = pd.to_numeric(df[nombre], errors='coerce').round().astype('Int64')
+    for nombre in CAMPOS['float']:
+        if nombre in df:
+            convertido[nombre] = pd.to_numeric(df[nombre], errors='coerce')
+    for nombre, decimales in CAMPOS['decimal']:
+        if nombre in df:
+            convertido[nombre] = pd.to_numeric(df[nombre], errors='coerce').round(decimales)
+    for nombre in CAMPOS['texto']:
+        if nombre in df:
+            convertido[nombre] = df[nombre]
+    # Las columnas que no trae el CSV toman el valor por defecto del modelo
+    for nombre in COLUMNAS_HOUSE:
+        if nombre not in convertido:
+            convertido[nombre] = House._meta.get_field(nombre).get_default()
+    # NaN / <NA> -> None para que se escriba NULL; el id del anuncio solo sirve para la clave
+    convertido = convertido[COLUMNAS_HOUSE]
+    if 'id' in df:
+        convertido.insert(0, 'id', df['id'])
+    return convertido.astype(object).where(convertido.notna(), None)
+
+
+def deduplicar(df, vistas):
+    """Añade address_key y quita las filas cuya dirección ya ha aparecido antes en el fichero."""
+    df = df.assign(address_key=claves_direccion(df))
+    mascara = ~df['address_key'].duplicated() & ~df['address_key'].isin(vistas)
+    vistas.update(df['address_key'][mascara])
+    return df[mascara]
+
+
+def hash_contenido(df):
+    """Hash de 64 bits (en hex) de las columnas importadas de cada fila, vectorizado."""
+    hashes = pd.util.hash_pandas_object(df[COLUMNAS_HOUSE].astype(str), index=False)
+    return hashes.map('{:016x}'.format)
+
+
+def clasificar(df, existentes):
+    """
+    Compara el bloque con la tabla; `existentes` es {address_key: (id, content_hash)}.
+    Devuelve las máscaras de filas nuevas y modificadas; el resto no ha cambiado.
+    """
+    guardados = df['address_key'].map(lambda clave: existentes.get(clave, (None, None))[1])
+    nuevas = guardados.isna()
+    modificadas = ~nuevas & (guardados != df['content_hash'])
+    return nuevas, modificadas
+
+
+def _sql_conflicto(columnas):
+    """
+    Cláusula ON CONFLICT (address_key) DO UPDATE. Solo llegan filas nuevas o modificadas,
+    pero la condición sobre content_hash evita igualmente reescribir (y tocar updated_at)
+    una fila idéntica. Postgres y SQLite (>= 3.24) comparten la sintaxis; solo cambia el
+    operador de desigualdad que trata NULL como valor.
+    """
+    qn = connection.ops.quote_name
+    tabla = qn(House._meta.db_table)
+    actualizables = [c for c in columnas if c != 'address_key'] + ['updated_at']
+    distinto = 'IS DISTINCT FROM' if connection.vendor == 'postgresql' else 'IS NOT'
+    asignaciones = ', '.join(f'{qn(c)} = excluded.{qn(c)}' for c in actualizables)
+    cambio = f'{tabla}.{qn("content_hash")} {distinto} excluded.{qn("content_hash")}'
+    return f'ON CONFLICT ({qn("address_key")}) DO UPDATE SET {asignaciones} WHERE {cambio}'
+
+
+def sql_upsert(columnas):
+    """Upsert de una fila, pensado para executemany."""
+    qn = connection.ops.quote_name
+    nombres = ', '.join(qn(c) for c in columnas + COLUMNAS_FECHA)
+    marcadores = ', '.join(['%s'] * (len(columnas) + len(COLUMNAS_FECHA)))
+    return (
+        f'INSERT INTO {qn(House._meta.db_table)} ({nombres}) VALUES ({marcadores}) '
+        f'{_sql_conflicto(columnas)}'
+    )
+
+
+def sql_merge(columnas):
+    """Vuelca la tabla temporal en src_house con una sola sentencia (solo PostgreSQL)."""
+    qn = connection.ops.quote_name
+    origen = ', '.join(qn(c) for c in columnas)
+    return (
+        f'INSERT INTO {qn(House._meta.db_table)} ({origen}, {", ".join(qn(c) for c in COLUMNAS_FECHA)}) '
+        f'SELECT {origen}, %s, %s FROM {qn(TABLA_STAGING)} {_sql_conflicto(columnas)}'
+    )
+
+
+def _ahora():
+    return House._meta.get_field('updated_at').get_db_prep_save(timezone.now(), connection)
+
+
+def upsert_viviendas(df, batch_size=1000):
+    """Escribe el bloque con un executemany por lote y devuelve las filas insertadas o actualizadas."""
+    if df.empty:
+        return 0
+    ahora = _ahora()
+    valores = [fila + [ahora, ahora] for fila in df[COLUMNAS_ESCRITURA].to_numpy().tolist()]
+    sql = sql_upsert(COLUMNAS_ESCRITURA)
+    escritas = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for inicio in range(0, len(valores), batch_size):
+            cursor.executemany(sql, valores[inicio:inicio + batch_size])
+            escritas += cursor.rowcount
+    return escritas
+
+
+def _copy(cursor, sql, buffer):
+    """COPY ... FROM STDIN con psycopg2 (copy_expert) o psycopg 3 (cursor.copy)."""
+    crudo = cursor.cursor
+    if hasattr(crudo, 'copy_expert'):
+        crudo.copy_expert(sql, buffer)
+    else:
+        with crudo.copy(sql) as copia:
+            copia.write(buffer.getvalue())
+
+
+def copiar_viviendas(bloques):
+    """
+    Solo PostgreSQL: cada bloque se envía con COPY en formato CSV a una tabla temporal
+    (sin índices ni restricciones) y al final se fusiona con src_house en una sola
+    sentencia, todo dentro de una transacción. Devuelve las filas insertadas o actualizadas.
+    """
+    primero = next(bloques, None)
+    if primero is None:
+        return 0
+    qn = connection.ops.quote_name
+    columnas = ', '.join(qn(c) for c in COLUMNAS_ESCRITURA)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMP TABLE {qn(TABLA_STAGING)} AS '
+            f'SELECT {columnas} FROM {qn(House._meta.db_table)} WITH NO DATA'
+        )
+        copy = f"COPY {qn(TABLA_STAGING)} ({columnas}) FROM STDIN WITH (FORMAT csv, NULL '{NULO_COPY}')"
+        for df in chain([primero], bloques):
+            buffer = StringIO()
+            df[COLUMNAS_ESCRITURA].to_csv(buffer, header=False, index=False, na_rep=NULO_COPY)
+            buffer.seek(0)
+            _copy(cursor, copy, buffer)
+        ahora = _ahora()
+        cursor.execute(sql_merge(COLUMNAS_ESCRITURA), [ahora, ahora])
+        escritas = cursor.rowcount
+        cursor.execute(f'DROP TABLE {qn(TABLA_STAGING)}')
+    return escritas
+
+
+def bloques_a_escribir(ruta_csv, chunksize, existentes, vistas, resultado, progreso=None):
+    """
+    Bloques con solo las filas nuevas o modificadas (convertidas, válidas, sin direcciones
+    repetidas y con su hash); acumula contadores y claves en `resultado`.
+    """
+    inicio = time.perf_counter()
+    for bloque in leer_bloques(ruta_csv, chunksize):
+        filas = convertir_bloque(bloque)
+        validas, rechazadas = separar(filas)
+        poner_en_cuarentena(rechazadas, Path(ruta_csv).name)
+        unicas = deduplicar(validas, vistas)
+        unicas = unicas.assign(content_hash=hash_contenido(unicas))
+        nuevas, modificadas = clasificar(unicas, existentes)
+        resultado.leidas += len(bloque)
+        resultado.cuarentena += len(rechazadas)
+        for codigo, filas_motivo in contar_motivos(rechazadas).items():
+            resultado.motivos[codigo] = resultado.motivos.get(codigo, 0) + filas_motivo
+        resultado.duplicadas += len(validas) - len(unicas)
+        resultado.nuevas += int(nuevas.sum())
+        resultado.modificadas += int(modificadas.sum())
+        resultado.sin_cambios += int((~nuevas & ~modificadas).sum())
+        resultado.claves_nuevas.extend(unicas['address_key'][nuevas])
+        resultado.claves_modificadas.extend(unicas['address_key'][modificadas])
+        cambios = unicas[nuevas | modificadas]
+        if not cambios.empty:
+            yield cambios
+        resultado.segundos = time.perf_counter() - inicio
+        if progreso:
+            progreso(resultado)
+
+
+def poner_en_cuarentena(rechazadas, origen, lote=500):
+    """Guarda las filas rechazadas; las que ya estaban (mismo origen y contenido) se ignoran."""
+    if rechazadas.empty:
+        return
+    claves = hash_contenido(rechazadas).tolist()
+    filas = rechazadas.drop(columns='motivos').to_dict('records')
+    QuarantinedHouse.objects.bulk_create(
+        [
+            QuarantinedHouse(origen=origen, clave=clave, motivos=motivos, datos=datos)
+            for clave, motivos, datos in zip(claves, rechazadas['motivos'], filas)
+        ],
+        batch_size=lote,
+        ignore_conflicts=True,
+    )
+
+
+def eliminar_viviendas(ids, lote=500):
+    for inicio in range(0, len(ids), lote):
+        House.objects.filter(id__in=ids[inicio:inicio + lote]).delete()
+
+
+def registrar_version(ruta_csv, resultado, existentes, ids_eliminados):
+    """Crea la DatasetVersion con el conjunto de cambios."""
+    claves = resultado.claves_nuevas
+    # Pocas altas: se buscan por clave; muchas (primera carga): una sola lectura de la tabla
+    consulta = House.objects.filter(address_key__in=claves) if len(claves) <= 500 else House.objects.all()
+    ids = dict(consulta.values_list('address_key', 'id'))
+    cambios = {
+        'nuevas': sorted(ids[clave] for clave in claves),
+        'modificadas': sorted(existentes[clave][0] for clave in resultado.claves_modificadas),
+        'eliminadas': sorted(ids_eliminados),
+    }
+    version = DatasetVersion.objects.create(
+        numero=DatasetVersion.actual() + 1,
+        fichero=Path(ruta_csv).name,
+        huella=checksum_fichero(ruta_csv),
+        nuevas=resultado.nuevas,
+        modificadas=resultado.modificadas,
+        sin_cambios=resultado.sin_cambios,
+        eliminadas=resultado.eliminadas,
+        cambios=cambios,
+    )
+    return version
+
+
+def avisar_consumidores(version):
+    """
+    Envía dataset_actualizado a todos los receptores aunque alguno falle (send_robust
+    registra cada error con su traza en el logger django.dispatch). Devuelve los nombres
+    de los que fallan.
+    """
+    respuestas = dataset_actualizado.send_robust(sender=DatasetVersion, version=version, cambios=version.cambios)
+    return [
+        f'{receptor.__module__}.{receptor.__qualname__}'
+        for receptor, respuesta in respuestas if isinstance(respuesta, Exception)
+    ]
+
+
+def importar_viviendas(ruta_csv, chunksize=5000, batch_size=1000, progreso=None, conservar_ausentes=False):
+    """
+    Importa el CSV en bloques de `chunksize` filas y escribe solo las filas nuevas o
+    modificadas: en PostgreSQL con COPY + merge; en el resto de motores, con executemany
+    en lotes de `batch_size` filas. Las direcciones que ya no vienen en el fichero se
+    eliminan salvo con `conservar_ausentes`.
+    Es idempotente: volver a importar el mismo fichero no escribe nada ni crea versión.
+    La escritura, las bajas y la versión van en una transacción; la señal
+    dataset_actualizado se envía después, con los datos ya confirmados.
+    `progreso` recibe el ResultadoImportacion acumulado tras cada bloque.
+    """
+    resultado = ResultadoImportacion()
+    inicio = time.perf_counter()
+    existentes = {
+        clave: (id_, hash_)
+        for clave, id_, hash_ in House.objects.values_list('address_key', 'id', 'content_hash').iterator()
+    }
+    vistas = set()
+    version = None
+    with transaction.atomic():
+        bloques = bloques_a_escribir(ruta_csv, chunksize, existentes, vistas, resultado, progreso)
+        if connection.vendor == 'postgresql':
+            resultado.metodo = 'copy'
+            resultado.escritas = copiar_viviendas(bloques)
+        else:
+            resultado.metodo = 'executemany'
+            for df in bloques:
+                resultado.escritas += upsert_viviendas(df, batch_size)
+
+        ausentes = [] if conservar_ausentes else existentes.keys() - vistas
+        ids_eliminados = [existentes[clave][0] for clave in ausentes]
+        eliminar_viviendas(ids_eliminados)
+        resultado.eliminadas = len(ids_eliminados)
+
+        if resultado.nuevas or resultado.modificadas or resultado.eliminadas:
+            version = registrar_version(ruta_csv, resultado, existentes, ids_eliminados)
+    if version is not None:
+        resultado.receptores_fallidos = avisar_consumidores(version)
+        resultado.version = version.numero
+    else:
+        resultado.version = DatasetVersion.actual()
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
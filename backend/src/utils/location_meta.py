@@ -0,0 +1,137 @@
+"""
+Metadatos de ubicación para el frontend y /api/meta/locations/: los distritos y, dentro de
+cada uno, sus barrios, con el número de viviendas, el centroide (mediana de las
+coordenadas), el rectángulo (oeste, sur, este, norte) de los percentiles 1 y 99 y el €/m²
+medio de Idealista. Las medianas y los percentiles no se dejan engañar por las viviendas
+mal geolocalizadas, pero no se pueden sumar: se agrupa una vez por barrio y otra por distrito.
+El artefacto es un JSON cuya `version` es la huella de su contenido: con los mismos datos
+se obtiene el mismo fichero y, por tanto, el mismo ETag.
+No depende de Django.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.utils.bitmaps import valor_categoria
+from src.utils.validation import LIMITES_MADRID
+
+COLUMNAS_UBICACION = (
+    'district', 'district_name', 'neighborhood', 'neighborhood_name', 'neighborhood_price_m2', 'latitude', 'longitude',
+)
+DECIMALES_COORDENADAS = 5
+
+
+def _codigos(serie):
+    """Códigos como texto ('3' y 3.0 son el mismo), normalizando solo los valores distintos."""
+    crudos, unicos = pd.factorize(serie)
+    normalizados = np.array([valor_categoria(valor) for valor in unicos] + [None], dtype=object)
+    return normalizados[crudos]
+
+
+# Percentiles del rectángulo. Con el más cercano (sin interpolar) un grupo de hasta 50
+# viviendas conserva todas; en los grandes se descartan las más alejadas
+CUANTILES_RECTANGULO = (0.01, 0.99)
+
+
+def _agregar(grupos, nombre):
+    """Recuento, €/m², centroide y rectángulo de cada grupo de viviendas."""
+    tabla = grupos.agg(
+        viviendas=('latitude', 'size'),
+        con_coordenadas=('latitude', 'count'),
+        precio=('precio', 'sum'),
+        con_precio=('precio', 'count'),
+        nombre=(nombre, 'first'),
+    )
+    coordenadas = grupos[['latitude', 'longitude']]
+    tabla[['latitud', 'longitud']] = coordenadas.median()
+    inferior, superior = (
+        coordenadas.quantile(cuantil, interpolation='nearest') for cuantil in CUANTILES_RECTANGULO
+    )
+    tabla['oeste'], tabla['sur'] = inferior['longitude'], inferior['latitude']
+    tabla['este'], tabla['norte'] = superior['longitude'], superior['latitude']
+    return tabla
+
+
+def _entrada(codigo, fila):
+    centroide = rectangulo = None
+    if fila.con_coordenadas:
+        centroide = [fila.latitud, fila.longitud]
+        rectangulo = [fila.oeste, fila.sur, fila.este, fila.norte]
+    return {
+        'code': codigo,
+        'name': fila.nombre,
+        'count': int(fila.viviendas),
+        'centroid': centroide and [round(valor, DECIMALES_COORDENADAS) for valor in centroide],
+        'bbox': rectangulo and [round(valor, DECIMALES_COORDENADAS) for valor in rectangulo],
+        'price_m2': int(round(fila.precio / fila.con_precio)) if fila.con_precio else None,
+    }
+
+
+def _por_nombre(entrada):
+    # Los que no tienen nombre, al final
+    return (entrada['name'] is None, entrada['name'] or '', entrada['code'])
+
+
+def compilar(df):
+    """
+    Metadatos de un DataFrame con COLUMNAS_UBICACION: {'count', 'districts': [...]}, cada
+    distrito con sus 'neighborhoods', ordenados por nombre. Las viviendas sin barrio cuentan
+    en su distrito; las que no tienen distrito, solo en el total.
+    """
+    datos = pd.DataFrame({
+        'district': _codigos(df['district']),
+        'neighborhood': _codigos(df['neighborhood']),
+        'latitude': pd.to_numeric(df['latitude'], errors='coerce').to_numpy(dtype='float64'),
+        'longitude': pd.to_numeric(df['longitude'], errors='coerce').to_numpy(dtype='float64'),
+        'precio': pd.to_numeric(df['neighborhood_price_m2'], errors='coerce').to_numpy(dtype='float64'),
+        'nombre': df['neighborhood_name'].astype(object).where(df['neighborhood_name'].notna(), None).to_numpy(),
+        'nombre_distrito': df['district_name'].astype(object).where(df['district_name'].notna(), None).to_numpy(),
+    })
+    # Las viviendas sin coordenadas o fuera de Madrid (las que la importación deja en cuarentena)
+    # cuentan, pero no entran en el centroide ni en el rectángulo
+    lat, lon = datos['latitude'], datos['longitude']
+    en_madrid = (
+        lat.between(LIMITES_MADRID['lat_min'], LIMITES_MADRID['lat_max'])
+        & lon.between(LIMITES_MADRID['lon_min'], LIMITES_MADRID['lon_max'])
+    )
+    datos.loc[~en_madrid, ['latitude', 'longitude']] = np.nan
+    con_distrito = datos[datos['district'].notna()]
+    barrios = _agregar(con_distrito.groupby(['district', 'neighborhood'], dropna=False, sort=False), 'nombre')
+    distritos = _agregar(con_distrito.groupby('district', sort=False), 'nombre_distrito')
+
+    entradas = {fila.Index: {**_entrada(fila.Index, fila), 'neighborhoods': []} for fila in distritos.itertuples()}
+    for fila in barrios.itertuples():
+        distrito, barrio = fila.Index
+        if not pd.isna(barrio):
+            entradas[distrito]['neighborhoods'].append(_entrada(barrio, fila))
+    for entrada in entradas.values():
+        entrada['neighborhoods'].sort(key=_por_nombre)
+    return {'count': len(df), 'districts': sorted(entradas.values(), key=_por_nombre)}
+
+
+def versionar(metadatos):
+    """Artefacto: los metadatos con su `version`, la huella de su contenido."""
+    canonico = json.dumps(metadatos, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return {'version': hashlib.sha256(canonico.encode('utf-8')).hexdigest()[:16], **metadatos}
+
+
+def serializar(artefacto):
+    """Bytes JSON del artefacto, tal como se guardan y se sirven."""
+    return json.dumps(artefacto, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def guardar(contenido, ruta):
+    """
+    Escribe `contenido` en `ruta` con reemplazo atómico, salvo que ya sea igual (así no
+    cambian la fecha ni el ETag). Devuelve si se ha escrito.
+    """
+    if ruta.exists() and ruta.read_bytes() == contenido:
+        return False
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(f'.{ruta.name}.tmp')
+    temporal.write_bytes(contenido)
+    os.replace(temporal, ruta)
+    return True
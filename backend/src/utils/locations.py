@@ -0,0 +1,92 @@
+"""
+Campos empaquetados del volcado de Idealista, separados en columnas tipadas.
+neighborhood_id y house_type_id juntan código, nombre y precio en una cadena:
+  'Neighborhood 135: San Cristóbal (1308.89 €/m2) - District 21: Villaverde'
+  'HouseType 1: Pisos'
+Se parsean una sola vez al importar (str.extract vectorizado) y los consumidores leen
+las columnas resultantes. No depende de Django (se ejecuta en los workers del pipeline).
+"""
+import re
+
+import pandas as pd
+
+PATRON_BARRIO = (
+    r'^Neighborhood (?P<neighborhood>\d+): (?P<neighborhood_name>.+?) '
+    r'\((?P<neighborhood_price_m2>[\d.]+|None) €/m2\) - District (?P<district>\d+): (?P<district_name>.+)$'
+)
+PATRON_TIPO_VIVIENDA = r'^HouseType (?P<house_type>\d+): (?P<house_type_name>.+)$'
+
+# Columna empaquetada -> patrón con un grupo por columna tipada
+COLUMNAS_EMPAQUETADAS = {
+    'neighborhood_id': PATRON_BARRIO,
+    'house_type_id': PATRON_TIPO_VIVIENDA,
+}
+COLUMNAS_CODIGO = ('neighborhood', 'district', 'house_type')
+COLUMNAS_PRECIO = ('neighborhood_price_m2',)
+# Enteros de House (IntegerField); el resto de columnas numéricas son FloatField
+COLUMNAS_ENTERAS = ('id', 'n_rooms', 'n_bathrooms', 'n_floors', 'built_year')
+
+
+def parsear(serie, patron):
+    """DataFrame con una columna por grupo del patrón (NA si la cadena no encaja)."""
+    partes = serie.astype('string').str.strip().str.extract(patron)
+    for columna in partes:
+        if columna in COLUMNAS_CODIGO:
+            partes[columna] = pd.to_numeric(partes[columna]).astype('Int64')
+        elif columna in COLUMNAS_PRECIO:
+            # 'None' cuando Idealista no publica el precio del barrio
+            partes[columna] = pd.to_numeric(partes[columna], errors='coerce').astype('Float64')
+    return partes
+
+
+def expandir_campos(df):
+    """
+    Sustituye neighborhood_id / house_type_id por sus columnas tipadas. Los códigos que ya
+    trae el fichero (neighborhood, district, house_type) se respetan; solo se rellenan los
+    que faltan. Una columna de texto sigue siendo de texto; una numérica pasa al dtype con
+    nulos de la parseada (int64 -> Int64), que admite los NA de las cadenas que no encajan.
+    """
+    empaquetadas = [columna for columna in COLUMNAS_EMPAQUETADAS if columna in df]
+    if not empaquetadas:
+        return df
+    df = df.copy()
+    for columna in empaquetadas:
+        partes = parsear(df[columna], COLUMNAS_EMPAQUETADAS[columna])
+        for nombre in partes:
+            if nombre in df and pd.api.types.is_numeric_dtype(df[nombre]):
+                df[nombre] = df[nombre].astype(partes[nombre].dtype).fillna(partes[nombre])
+            elif nombre in df:
+                valores = partes[nombre].astype('string').astype(df[nombre].dtype)
+                df[nombre] = df[nombre].fillna(valores)
+            else:
+                df[nombre] = partes[nombre]
+    return df.drop(columns=empaquetadas)
+
+
+def leer_viviendas_csv(ruta, columnas):
+    """
+    Columnas `columnas` de las viviendas del CSV unificado, con los tipos con los que salen de
+    House: los códigos (neighborhood, district, house_type) como texto, los nombres y el precio
+    del barrio separados de las columnas empaquetadas, float64 salvo en COLUMNAS_ENTERAS y None
+    en los textos que faltan. Las columnas que no trae el fichero salen vacías.
+    """
+    columnas = list(columnas)
+    empaquetadas = [
+        columna for columna, patron in COLUMNAS_EMPAQUETADAS.items()
+        if not set(re.compile(patron).groupindex).isdisjoint(columnas)
+    ]
+    df = pd.read_csv(
+        ruta, usecols=lambda columna: columna in columnas or columna in empaquetadas,
+        dtype={columna: 'string' for columna in COLUMNAS_CODIGO},
+    )
+    df = expandir_campos(df).reindex(columns=columnas)
+    for nombre in df:
+        serie = df[nombre].astype('string') if nombre in COLUMNAS_CODIGO else df[nombre]
+        if pd.api.types.is_bool_dtype(serie) or nombre in COLUMNAS_ENTERAS:
+            continue
+        if pd.api.types.is_numeric_dtype(serie):
+            # Float64 de las columnas parseadas e int64 del CSV -> float64, como los FloatField de House
+            df[nombre] = serie.astype('float64')
+        else:
+            df[nombre] = serie.astype(object).where(serie.notna(), None)
+    return df
@@ -0,0 +1,293 @@
+"""
+Cubo de estadísticas del mercado: por cada combinación de distrito, barrio, habitaciones y
+tipo de vivienda, y por cada agregado superior (roll-up, hasta el total de Madrid), el número
+de anuncios y los percentiles 25, 50 y 75 de buy_price, €/m², rent_price y rentabilidad bruta
+(alquiler anual / precio de compra, en %).
+Los percentiles no se pueden agregar desde los grupos hijos, así que cada nivel se calcula
+sobre las viviendas: cada variable se ordena por valor una vez y, en cada nivel, un radix sort
+estable por grupo deja los valores de cada grupo ordenados y contiguos (como las medianas del
+mapa de calor). Cuando cambian viviendas solo se
+recalculan los grupos que las contienen (antes y después del cambio), en todos los niveles;
+los grupos grandes (el total, por habitaciones) se recalculan enteros, así que el ahorro está
+en los niveles finos.
+No depende de Django.
+"""
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.utils.bitmaps import valor_categoria
+from src.utils.heatmap import orden_por_valor
+
+DIMENSIONES = ('district', 'neighborhood', 'n_rooms', 'house_type')
+# Columna con el nombre legible de cada código
+ETIQUETAS = {'district': 'district_name', 'neighborhood': 'neighborhood_name', 'house_type': 'house_type_name'}
+VARIABLES = ('buy_price', 'price_m2', 'rent_price', 'gross_yield')
+PERCENTILES = {'p25': 0.25, 'median': 0.5, 'p75': 0.75}
+# Niveles del cubo (el barrio va siempre con su distrito); () es el total
+NIVELES = tuple(
+    (*geografia, *habitaciones, *tipo)
+    for geografia in ((), ('district',), ('district', 'neighborhood'))
+    for habitaciones in ((), ('n_rooms',))
+    for tipo in ((), ('house_type',))
+)
+# Fracción de viviendas en grupos sucios a partir de la cual un nivel se recalcula entero
+FRACCION_NIVEL_COMPLETO = 0.5
+COLUMNAS_MERCADO = ('id', *DIMENSIONES, *ETIQUETAS.values(), 'buy_price', 'sq_mt_built', 'rent_price')
+
+
+def nivel_de(dimensiones):
+    """Nivel del cubo que contiene `dimensiones` (ValueError si alguna no existe)."""
+    dimensiones = set(dimensiones)
+    desconocidas = dimensiones - set(DIMENSIONES)
+    if desconocidas:
+        raise ValueError(f'Dimensiones desconocidas: {", ".join(sorted(desconocidas))}')
+    if 'neighborhood' in dimensiones:
+        dimensiones.add('district')
+    return tuple(dimension for dimension in DIMENSIONES if dimension in dimensiones)
+
+
+def _como_texto(serie):
+    """
+    Códigos como texto ('3' y 3.0 son el mismo), normalizando solo los valores distintos.
+    Categórica: agrupar por sus códigos enteros es mucho más rápido que por objetos.
+    """
+    crudos, unicos = pd.factorize(serie)
+    normalizados = np.array([valor_categoria(valor) for valor in unicos] + [None], dtype=object)
+    return pd.Categorical(normalizados[crudos])
+
+
+def filas_mercado(df):
+    """
+    De un DataFrame con COLUMNAS_MERCADO a las filas del cubo, indexadas por id: dimensiones
+    como categóricas de texto, sus nombres y las variables en float32.
+    """
+    precio = pd.to_numeric(df['buy_price'], errors='coerce').to_numpy(dtype='float64')
+    superficie = pd.to_numeric(df['sq_mt_built'], errors='coerce').to_numpy(dtype='float64')
+    alquiler = pd.to_numeric(df['rent_price'], errors='coerce').to_numpy(dtype='float64')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Precios y alquileres <= 0 son datos erróneos del origen: cuentan como desconocidos
+        precio = np.where(precio > 0, precio, np.nan)
+        alquiler = np.where(alquiler > 0, alquiler, np.nan)
+        precio_m2 = np.where(superficie > 0, precio / superficie, np.nan)
+        rentabilidad = np.where(precio > 0, alquiler * 12 / precio * 100, np.nan)
+    filas = pd.DataFrame(
+        {dimension: _como_texto(df[dimension]) for dimension in DIMENSIONES},
+        index=pd.Index(df['id'].to_numpy(), name='id'),
+    )
+    for etiqueta in ETIQUETAS.values():
+        filas[etiqueta] = df[etiqueta].astype(object).where(df[etiqueta].notna(), None).to_numpy()
+    for variable, valores in zip(VARIABLES, (precio, precio_m2, alquiler, rentabilidad)):
+        filas[variable] = valores.astype('float32')
+    return filas
+
+
+def _grupos(filas, nivel):
+    """
+    Grupo de cada fila en `nivel` (-1 si le falta alguna dimensión) y valores de cada dimensión
+    por grupo. Los grupos salen en el orden de las claves, como un groupby(sort=True).
+    """
+    clave = np.zeros(len(filas), dtype='int64')
+    validas = np.ones(len(filas), dtype=bool)
+    espacio = 1
+    for dimension in nivel:
+        # Clave en base mixta con los códigos de las categóricas; el -1 de los que faltan es el 0
+        codigos = filas[dimension].cat.codes.to_numpy().astype('int64') + 1
+        validas &= codigos > 0
+        clave = clave * (len(filas[dimension].cat.categories) + 1) + codigos
+        espacio *= len(filas[dimension].cat.categories) + 1
+    if espacio <= max(len(filas), 1 << 16):
+        # Pocas claves posibles: las presentes salen de un bincount, sin ordenar las filas
+        presentes = np.bincount(clave[validas], minlength=espacio) > 0
+        unicas = np.flatnonzero(presentes)
+        inversa = (np.cumsum(presentes) - 1)[clave[validas]]
+    else:
+        unicas, inversa = np.unique(clave[validas], return_inverse=True)
+    grupo = np.full(len(filas), -1, dtype='int64')
+    grupo[validas] = inversa
+    n = len(unicas)
+    valores = {}
+    for dimension in reversed(nivel):
+        categorias = filas[dimension].cat.categories
+        valores[dimension] = np.asarray(categorias, dtype=object)[unicas % (len(categorias) + 1) - 1]
+        unicas = unicas // (len(categorias) + 1)
+    return grupo, n, valores
+
+
+def estadisticas(filas, nivel, por_valor=None):
+    """
+    Recuento y percentiles (interpolación lineal, como pandas) por grupo de `nivel`, indexado
+    por sus dimensiones. Las viviendas sin valor en alguna dimensión del nivel no cuentan en él.
+    `por_valor` ({variable: orden de las filas por valor}) evita reordenar en cada nivel.
+    """
+    grupo, n, valores = _grupos(filas, nivel)
+    # Con hasta 65.536 grupos el orden estable por grupo es un radix sort de 16 bits
+    tipo_grupo = 'uint16' if n <= 1 << 16 else 'int64'
+    resultado = {'count': np.bincount(grupo[grupo >= 0], minlength=n).astype('int32')}
+    for variable in VARIABLES:
+        datos = filas[variable].to_numpy(dtype='float64')
+        orden = por_valor[variable] if por_valor else orden_por_valor(datos)
+        orden = orden[grupo[orden] >= 0]
+        # Valores conocidos de menor a mayor y, sin perder ese orden, agrupados por grupo
+        orden = orden[np.argsort(grupo[orden].astype(tipo_grupo), kind='stable')]
+        ordenados = datos[orden]
+        k = np.bincount(grupo[orden], minlength=n)
+        inicio = np.cumsum(k) - k
+        con_datos = k > 0
+        resultado[f'{variable}_count'] = k.astype('int32')
+        for nombre, cuantil in PERCENTILES.items():
+            if not len(ordenados):
+                resultado[f'{variable}_{nombre}'] = np.full(n, np.nan, dtype='float32')
+                continue
+            posicion = cuantil * np.maximum(k - 1, 0)
+            bajo = np.floor(posicion).astype('int64')
+            alto = np.minimum(bajo + 1, np.maximum(k - 1, 0))
+            inferior = ordenados[np.where(con_datos, inicio + bajo, 0)]
+            superior = ordenados[np.where(con_datos, inicio + alto, 0)]
+            interpolado = inferior + (superior - inferior) * (posicion - bajo)
+            resultado[f'{variable}_{nombre}'] = np.where(con_datos, interpolado, np.nan).astype('float32')
+    # Claves como objetos: las tablas de distintas actualizaciones se concatenan sin conflictos
+    indice = _claves(pd.DataFrame(valores), nivel) if nivel else pd.RangeIndex(n)
+    return pd.DataFrame(resultado, index=indice)[list(resultado)]
+
+
+def _claves(df, nivel):
+    """Índice con la clave de `nivel` de cada fila (el mismo tipo de índice que estadisticas)."""
+    if len(nivel) == 1:
+        return pd.Index(df[nivel[0]].astype(object), name=nivel[0])
+    return pd.MultiIndex.from_frame(df[list(nivel)].astype(object))
+
+
+def _por_valor(filas):
+    return {variable: orden_por_valor(filas[variable].to_numpy(dtype='float64')) for variable in VARIABLES}
+
+
+def nombres(filas):
+    """{dimensión: {código: nombre}} de las dimensiones con nombre legible."""
+    resultado = {}
+    for dimension, etiqueta in ETIQUETAS.items():
+        pares = filas[[dimension, etiqueta]].dropna().drop_duplicates(dimension)
+        resultado[dimension] = dict(zip(pares[dimension].astype(object), pares[etiqueta]))
+    return resultado
+
+
+class CuboMercado:
+    """
+    `filas` como las devuelve filas_mercado. `tablas` (las de un cubo guardado) evita
+    recalcular los niveles; `metadatos` viaja con el cubo al guardarlo.
+    """
+
+    def __init__(self, filas, niveles=NIVELES, tablas=None, metadatos=None):
+        self.filas = filas
+        if tablas is None:
+            por_valor = _por_valor(filas)
+            tablas = {nivel: estadisticas(filas, nivel, por_valor) for nivel in niveles}
+        self.niveles = tablas
+        self.metadatos = dict(metadatos or {})
+        self.nombres = nombres(filas)
+
+    def __len__(self):
+        return len(self.filas)
+
+    def actualizar(self, eliminadas=(), nuevas=None):
+        """
+        Quita las viviendas `eliminadas` (ids) y añade o sustituye las `nuevas` (filas_mercado).
+        Devuelve el número de grupos recalculados en todos los niveles.
+        """
+        nuevas = nuevas if nuevas is not None else self.filas.iloc[:0]
+        salientes = self.filas.index.intersection(pd.Index(eliminadas).union(nuevas.index))
+        # Grupos sucios: los de las viviendas antes del cambio y los de después
+        afectadas = pd.concat([self.filas.loc[salientes, list(DIMENSIONES)], nuevas[list(DIMENSIONES)]])
+        filas = self.filas.drop(salientes)
+        if len(nuevas):
+            # Con categorías distintas concat devuelve objetos: se vuelven a codificar una vez
+            filas = pd.concat([filas, nuevas])
+            filas = filas.astype({dimension: 'category' for dimension in DIMENSIONES})
+        self.filas = filas
+        # Los nombres de códigos que ya no están no molestan: solo se añaden los de las nuevas
+        for dimension, pares in nombres(nuevas).items():
+            self.nombres[dimension].update(pares)
+
+        if not len(afectadas):
+            return 0
+        # Las filas se ordenan por valor una sola vez y cada nivel filtra ese orden
+        por_valor = _por_valor(self.filas)
+        recalculados = 0
+        for nivel, tabla in self.niveles.items():
+            if not nivel:
+                self.niveles[nivel] = estadisticas(self.filas, nivel, por_valor)
+                recalculados += 1
+                continue
+            sucias = afectadas[list(nivel)].dropna().drop_duplicates()
+            # Filas con cada dimensión en los valores sucios: grupos completos, los sucios y
+            # quizá alguno más, que se recalcula igual
+            en_sucios = np.ones(len(self.filas), dtype=bool)
+            for dimension in nivel:
+                en_sucios &= self.filas[dimension].isin(sucias[dimension].unique()).to_numpy()
+            if en_sucios.mean() > FRACCION_NIVEL_COMPLETO:
+                # Casi todo el nivel está sucio: recalcularlo entero ahorra quitar, concatenar y ordenar
+                self.niveles[nivel] = estadisticas(self.filas, nivel, por_valor)
+                recalculados += len(self.niveles[nivel])
+                continue
+            posicion = np.cumsum(en_sucios) - 1
+            recalculadas = estadisticas(
+                self.filas.loc[en_sucios, [*nivel, *VARIABLES]], nivel,
+                {variable: posicion[orden[en_sucios[orden]]] for variable, orden in por_valor.items()},
+            )
+            # Los grupos que se han quedado vacíos desaparecen
+            tabla = tabla.drop(_claves(sucias, nivel).union(recalculadas.index), errors='ignore')
+            self.niveles[nivel] = pd.concat([tabla, recalculadas]).sort_index()
+            recalculados += len(recalculadas)
+        return recalculados
+
+    def consultar(self, agrupar=(), filtros=None):
+        """
+        Grupos del nivel que contiene las dimensiones de `agrupar` y de `filtros`
+        ({dimensión: [valores]}), como DataFrame con las dimensiones y sus nombres en columnas.
+        """
+        filtros = {dimension: valores for dimension, valores in (filtros or {}).items() if valores}
+        nivel = nivel_de([*agrupar, *filtros])
+        tabla = self.niveles[nivel]
+        seleccion = np.ones(len(tabla), dtype=bool)
+        for dimension, valores in filtros.items():
+            valores = [valor_categoria(valor) for valor in valores]
+            seleccion &= tabla.index.get_level_values(dimension).isin(valores)
+        resultado = tabla[seleccion].reset_index(drop=not nivel)
+        for posicion, dimension in enumerate(nivel):
+            if dimension in ETIQUETAS:
+                nombre = resultado[dimension].map(self.nombres[dimension]).astype(object)
+                resultado.insert(nivel.index(dimension) + posicion + 1, ETIQUETAS[dimension], nombre)
+        return resultado
+
+    def guardar(self, ruta):
+        """Guarda el cubo comprimido, con reemplazo atómico (nunca se lee un fichero a medias)."""
+        temporal = ruta.with_name(f'.{ruta.name}.tmp')
+        joblib.dump({'filas': self.filas, 'niveles': self.niveles, 'metadatos': self.metadatos}, temporal, compress=3)
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta):
+        datos = joblib.load(ruta)
+        return cls(datos['filas'], tablas=datos['niveles'], metadatos=datos['metadatos'])
+
+
+def registros(tabla):
+    """
+    Filas de CuboMercado.consultar() como diccionarios: dimensiones y nombres, count y, por
+    variable, {count, p25, median, p75} (None si el grupo no tiene ningún valor).
+    """
+    columnas = {columna: tabla[columna].tolist() for columna in tabla.columns}
+    claves = [columna for columna in tabla.columns if columna in DIMENSIONES or columna in ETIQUETAS.values()]
+    resultado = []
+    for i in range(len(tabla)):
+        fila = {clave: columnas[clave][i] for clave in claves}
+        fila['count'] = columnas['count'][i]
+        for variable in VARIABLES:
+            fila[variable] = {'count': columnas[f'{variable}_count'][i]}
+            for nombre in PERCENTILES:
+                valor = columnas[f'{variable}_{nombre}'][i]
+                fila[variable][nombre] = None if valor != valor else round(valor, 2)
+        resultado.append(fila)
+    return resultado
@@ -0,0 +1,29 @@
+"""
+Ejecutores para los pipelines que reparten trabajo entre procesos (data_processing,
+causal_discovery). Con un solo worker se ejecuta en el propio proceso con la misma
+interfaz, sin el coste de arrancar un pool. No depende de Django.
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+
+
+class EjecutorLocal:
+    """Misma interfaz que ProcessPoolExecutor, en el propio proceso (workers=1)."""
+
+    def submit(self, funcion, *args):
+        futuro = Future()
+        futuro.set_result(funcion(*args))
+        return futuro
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def crear_ejecutor(workers, initializer, initargs=()):
+    """
+    ProcessPoolExecutor con `workers` procesos, cada uno preparado con initializer(*initargs),
+    o, con un worker, EjecutorLocal tras preparar el propio proceso.
+    """
+    if workers > 1:
+        return ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+    initializer(*initargs)
+    return EjecutorLocal()
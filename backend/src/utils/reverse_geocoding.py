@@ -0,0 +1,91 @@
+"""
+Geocodificación inversa sin servicios externos: (latitud, longitud) -> distrito y barrio.
+Se construye con las propias viviendas etiquetadas: cada punto toma el distrito y el
+barrio de la vivienda más cercana (KD-tree sobre coordenadas proyectadas a metros).
+Un punto a más de `distancia_maxima` metros de cualquier vivienda queda fuera de
+cobertura, lo que sustituye a la comprobación de rectángulo de Madrid del frontend.
+No depende de Django.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+# Proyección equirectangular centrada en Madrid: a esta escala el error es < 0,1 %
+LATITUD_REFERENCIA = 40.42
+METROS_POR_GRADO_LAT = 110_574.0
+METROS_POR_GRADO_LON = 111_320.0 * math.cos(math.radians(LATITUD_REFERENCIA))
+
+DISTANCIA_MAXIMA_M = 1500
+COLUMNAS_ETIQUETA = ('district', 'district_name', 'neighborhood', 'neighborhood_name')
+
+
+def a_metros(latitud, longitud):
+    """Coordenadas (N, 2) en metros para el KD-tree."""
+    latitud = np.asarray(latitud, dtype='float64')
+    longitud = np.asarray(longitud, dtype='float64')
+    return np.column_stack((latitud * METROS_POR_GRADO_LAT, longitud * METROS_POR_GRADO_LON))
+
+
+def _codigo(valor):
+    """Código como texto, igual que en House ('21', no '21.0'); None si falta."""
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor)
+
+
+class GeocodificadorInverso:
+    """Vecino etiquetado más cercano; `puntos` es un DataFrame con latitude, longitude y las etiquetas."""
+
+    def __init__(self, puntos, distancia_maxima=DISTANCIA_MAXIMA_M):
+        puntos = puntos.dropna(subset=['latitude', 'longitude', 'district'])
+        if puntos.empty:
+            raise ValueError('No hay viviendas con coordenadas y distrito para construir el índice')
+        self.distancia_maxima = distancia_maxima
+        self.arbol = cKDTree(a_metros(puntos['latitude'], puntos['longitude']))
+        # Etiquetas como arrays de objetos: indexarlas por posición es lo más rápido
+        self.etiquetas = {
+            columna: (
+                puntos[columna].astype(object).where(puntos[columna].notna(), None).to_numpy()
+                if columna in puntos else np.full(len(puntos), None, dtype=object)
+            )
+            for columna in COLUMNAS_ETIQUETA
+        }
+        for columna in ('district', 'neighborhood'):
+            self.etiquetas[columna] = np.array([_codigo(valor) for valor in self.etiquetas[columna]], dtype=object)
+
+    def __len__(self):
+        return self.arbol.n
+
+    def consultar(self, latitud, longitud):
+        """
+        Versión por lotes: DataFrame con las etiquetas y `distancia_m` de cada punto.
+        Los puntos fuera de cobertura (o con coordenadas no válidas) llevan etiquetas nulas.
+        """
+        consulta = a_metros(np.atleast_1d(latitud), np.atleast_1d(longitud))
+        validas = np.isfinite(consulta).all(axis=1)
+        distancias = np.full(len(consulta), np.inf)
+        posiciones = np.full(len(consulta), len(self), dtype='int64')
+        distancias[validas], posiciones[validas] = self.arbol.query(
+            consulta[validas], distance_upper_bound=self.distancia_maxima,
+        )
+        # query devuelve posición n y distancia inf cuando no hay vecino dentro del umbral
+        encontradas = posiciones < len(self)
+        resultado = pd.DataFrame({
+            columna: np.where(encontradas, valores[np.minimum(posiciones, len(self) - 1)], None)
+            for columna, valores in self.etiquetas.items()
+        })
+        resultado['distancia_m'] = np.where(encontradas, np.round(distancias, 1), np.nan)
+        return resultado
+
+    def ubicar(self, latitud, longitud):
+        """Un punto: diccionario con distrito, barrio y distancia, o None si está fuera de cobertura."""
+        distancia, posicion = self.arbol.query(a_metros([latitud], [longitud])[0], distance_upper_bound=self.distancia_maxima)
+        if posicion >= len(self):
+            return None
+        ubicacion = {columna: valores[posicion] for columna, valores in self.etiquetas.items()}
+        ubicacion['distancia_m'] = round(float(distancia), 1)
+        return ubicacion
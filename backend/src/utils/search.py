@@ -0,0 +1,171 @@
+"""
+Búsqueda de texto sobre las direcciones y los títulos de los anuncios.
+Índice invertido en memoria: tokens en minúsculas y sin acentos (normalizar_texto), con
+las abreviaturas de tipo de vía expandidas (C/ -> calle, Avda. -> avenida) y sin artículos.
+Cada campo pesa distinto en la frecuencia del término (BM25F simplificado) y la aportación
+BM25 de cada posting se precalcula al construir, así que una consulta es sumar arrays.
+El vocabulario está ordenado: los términos que empiezan por un prefijo son un rango
+contiguo que se localiza con dos búsquedas binarias (autocompletado).
+No depende de Django.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from src.utils.addresses import TIPOS_VIA, normalizar_serie, normalizar_texto
+
+# Campo -> peso en la frecuencia del término
+CAMPOS_TEXTO = {'street_name': 2.0, 'address': 1.5, 'title': 1.0, 'subtitle': 1.0, 'raw_address': 1.0}
+K1 = 1.2
+B = 0.75
+# Términos a los que se expande como mucho un prefijo (los de más documentos)
+MAX_EXPANSIONES = 50
+PALABRAS_VACIAS = frozenset(('de', 'del', 'la', 'las', 'los', 'el', 'y', 'en', 'a'))
+_ABREVIATURAS = {
+    abreviatura: tipo for tipo, abreviaturas in TIPOS_VIA.items() for abreviatura in abreviaturas
+    if ' ' not in abreviatura
+}
+_NO_ALFANUMERICO_RE = re.compile(r'[^a-z0-9]+')
+
+
+def tokenizar(texto, expandir=True):
+    """Tokens de un texto, en orden; con `expandir`, las abreviaturas de vía pasan a su forma completa."""
+    return [
+        _ABREVIATURAS.get(token, token) if expandir else token
+        for token in _NO_ALFANUMERICO_RE.split(normalizar_texto(texto))
+        if token and token not in PALABRAS_VACIAS
+    ]
+
+
+def tokens_columna(serie):
+    """Serie con un token por fila (índice = fila de origen), vectorizada."""
+    tokens = normalizar_serie(serie).str.split(_NO_ALFANUMERICO_RE).explode()
+    tokens = tokens[tokens.notna() & (tokens != '') & ~tokens.isin(PALABRAS_VACIAS)]
+    return tokens.map(_ABREVIATURAS).fillna(tokens)
+
+
+class IndiceTexto:
+    """
+    `documentos` es un DataFrame con id, los campos de CAMPOS_TEXTO que haya y las columnas
+    que se quieran devolver en los resultados.
+    """
+
+    def __init__(self, documentos):
+        documentos = documentos.reset_index(drop=True)
+        n = len(documentos)
+        self.columnas = {
+            columna: documentos[columna].astype(object).where(documentos[columna].notna(), None).to_numpy()
+            for columna in documentos.columns
+        }
+        # Los textos se repiten mucho (el mismo edificio en varios anuncios y campos):
+        # se tokeniza cada texto distinto una vez y sus tokens se reparten a sus filas
+        campos = [(campo, peso) for campo, peso in CAMPOS_TEXTO.items() if campo in documentos]
+        textos = pd.Series([], dtype=object)
+        if campos:
+            textos = pd.concat([documentos[campo].astype(object) for campo, _ in campos], ignore_index=True)
+        docs_texto = np.tile(np.arange(n), len(campos))
+        pesos_texto = np.repeat([peso for _, peso in campos], n).astype('float64')
+        codigos_texto, unicos = pd.factorize(textos)
+        tokens = tokens_columna(pd.Series(unicos, dtype=object))
+        codigos_termino, vocabulario = pd.factorize(tokens, sort=True)
+        self.terminos = np.asarray(vocabulario, dtype=str)
+        inicio_texto = np.searchsorted(tokens.index.to_numpy(), np.arange(len(unicos) + 1))
+        validos = codigos_texto >= 0
+        repeticiones = np.diff(inicio_texto)[codigos_texto[validos]]
+        desplazamiento = np.arange(repeticiones.sum()) - np.repeat(np.cumsum(repeticiones) - repeticiones, repeticiones)
+        codigos = codigos_termino[np.repeat(inicio_texto[codigos_texto[validos]], repeticiones) + desplazamiento]
+        docs_tabla = np.repeat(docs_texto[validos], repeticiones)
+        pesos = np.repeat(pesos_texto[validos], repeticiones)
+
+        # Postings (término, documento) ordenados por término y, dentro, por documento
+        clave = codigos.astype('int64') * max(n, 1) + docs_tabla
+        unicas, inversa = np.unique(clave, return_inverse=True)
+        frecuencia = np.bincount(inversa, weights=pesos, minlength=len(unicas))
+        termino = unicas // max(n, 1)
+        self.docs = unicas % max(n, 1)
+        self.inicio = np.searchsorted(termino, np.arange(len(self.terminos) + 1))
+        self.df = np.diff(self.inicio)
+
+        longitud = np.bincount(docs_tabla, weights=pesos, minlength=n)
+        media = longitud.mean() if n and longitud.mean() > 0 else 1.0
+        idf = np.log(1 + (n - self.df + 0.5) / (self.df + 0.5))
+        normalizacion = K1 * (1 - B + B * longitud[self.docs] / media)
+        self.impacto = idf[termino] * frecuencia * (K1 + 1) / (frecuencia + normalizacion)
+        self.n = n
+
+    def __len__(self):
+        return self.n
+
+    def terminos_de(self, token, prefijo=False):
+        """Posiciones en el vocabulario del token exacto o, con `prefijo`, de los que empiezan por él."""
+        inicio = int(np.searchsorted(self.terminos, token))
+        if not prefijo:
+            existe = inicio < len(self.terminos) and self.terminos[inicio] == token
+            return np.array([inicio] if existe else [], dtype='int64')
+        fin = int(np.searchsorted(self.terminos, token + '\uffff'))
+        rango = np.arange(inicio, fin)
+        if len(rango) > MAX_EXPANSIONES:
+            rango = rango[np.argsort(-self.df[rango], kind='stable')[:MAX_EXPANSIONES]]
+        return rango
+
+    def puntuar(self, consulta, prefijo_final=False, todos=False):
+        """
+        Puntuación BM25 de cada documento. Con `prefijo_final` el último token cuenta como
+        prefijo (se toma el mejor de sus términos); con `todos` solo puntúan los documentos
+        que contienen todos los tokens.
+        """
+        tokens = tokenizar(consulta)
+        terminos_tokens = [self.terminos_de(token) for token in tokens]
+        if prefijo_final and tokens:
+            # Lo que se está escribiendo es un prefijo ("c" aún no es "calle"); si ya es una
+            # abreviatura completa ("avda") cuenta también su forma expandida
+            crudo = tokenizar(consulta, expandir=False)[-1]
+            terminos_tokens[-1] = np.union1d(self.terminos_de(crudo, prefijo=True), terminos_tokens[-1])
+        # Un token repetido cuenta una vez
+        terminos_tokens = list({tuple(terminos): terminos for terminos in terminos_tokens}.values())
+        puntuacion = np.zeros(self.n)
+        coincidencias = np.zeros(self.n, dtype='int64')
+        for terminos in terminos_tokens:
+            if not len(terminos):
+                continue
+            tramos = [np.arange(self.inicio[t], self.inicio[t + 1]) for t in terminos]
+            postings = np.concatenate(tramos)
+            del_token = np.zeros(self.n)
+            np.maximum.at(del_token, self.docs[postings], self.impacto[postings])
+            puntuacion += del_token
+            coincidencias += del_token > 0
+        if todos and tokens:
+            puntuacion[coincidencias < len(terminos_tokens)] = 0
+        return puntuacion
+
+    def buscar(self, consulta, limite=20, desplazamiento=0, prefijo_final=False, todos=False):
+        """(posiciones, puntuaciones, total) de los mejores documentos, de mayor a menor puntuación."""
+        puntuacion = self.puntuar(consulta, prefijo_final=prefijo_final, todos=todos)
+        candidatos = np.flatnonzero(puntuacion > 0)
+        hasta = desplazamiento + limite
+        if len(candidatos) > hasta:
+            # Se conservan todos los empatados con el corte para que la paginación sea estable
+            corte = -np.partition(-puntuacion[candidatos], hasta - 1)[hasta - 1]
+            candidatos = candidatos[puntuacion[candidatos] >= corte]
+        # A igual puntuación, por posición: el orden es estable entre llamadas
+        orden = candidatos[np.lexsort((candidatos, -puntuacion[candidatos]))][desplazamiento:hasta]
+        return orden, puntuacion[orden], int((puntuacion > 0).sum())
+
+    def autocompletar(self, consulta, limite=10, columna='address'):
+        """
+        Mejores documentos que contienen todos los tokens, con el último como prefijo (lo que
+        se lleva escrito), sin repetir el valor de `columna`: (posiciones, puntuaciones, total).
+        """
+        posiciones, puntuaciones, total = self.buscar(consulta, limite=limite * 5, prefijo_final=True, todos=True)
+        unicas = ~pd.Series(self.columnas[columna][posiciones]).duplicated().to_numpy()
+        return posiciones[unicas][:limite], puntuaciones[unicas][:limite], total
+
+    def registros(self, posiciones, puntuaciones, columnas=None):
+        """Documentos de `posiciones` como diccionarios, con su `score`."""
+        columnas = [columna for columna in (columnas or self.columnas) if columna in self.columnas]
+        valores = [(columna, self.columnas[columna][posiciones].tolist()) for columna in columnas]
+        filas = [{columna: lista[i] for columna, lista in valores} for i in range(len(posiciones))]
+        for fila, puntuacion in zip(filas, puntuaciones.tolist()):
+            fila['score'] = round(puntuacion, 4)
+        return filas
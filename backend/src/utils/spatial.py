@@ -0,0 +1,102 @@
+"""
+Búsqueda de viviendas por radio y por rectángulo con un BallTree de distancia haversine.
+El árbol se construye una vez con las coordenadas en radianes; cada consulta cuesta
+O(log n + resultados), frente a calcular la distancia a todas las viviendas.
+El rectángulo se resuelve con una consulta por radio desde su centro (el círculo que lo
+circunscribe) y un filtro exacto de latitud y longitud sobre los candidatos.
+No depende de Django.
+"""
+import math
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+RADIO_TIERRA_M = 6_371_008.8
+
+
+def a_radianes(latitud, longitud):
+    """Coordenadas (N, 2) [lat, lon] en radianes, el formato de la métrica haversine."""
+    return np.radians(np.column_stack((
+        np.asarray(latitud, dtype='float64').ravel(), np.asarray(longitud, dtype='float64').ravel(),
+    )))
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Distancia en metros sobre la esfera (vectorizada)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype='float64')) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RADIO_TIERRA_M * np.arcsin(np.sqrt(a))
+
+
+class IndiceEspacial:
+    """
+    `puntos` es un DataFrame con latitude, longitude y las columnas que se quieran devolver.
+    Las filas sin coordenadas se descartan.
+    """
+
+    def __init__(self, puntos):
+        puntos = puntos.dropna(subset=['latitude', 'longitude']).reset_index(drop=True)
+        self.columnas = {
+            columna: puntos[columna].astype(object).where(puntos[columna].notna(), None).to_numpy()
+            for columna in puntos.columns
+        }
+        self.latitud = puntos['latitude'].to_numpy(dtype='float64')
+        self.longitud = puntos['longitude'].to_numpy(dtype='float64')
+        self.arbol = BallTree(a_radianes(self.latitud, self.longitud), metric='haversine') if len(puntos) else None
+
+    def __len__(self):
+        return len(self.latitud)
+
+    def cercanas(self, latitud, longitud, radio=None, k=None):
+        """
+        (posiciones, distancias en metros) de menor a mayor distancia: las `k` más cercanas,
+        las que están a `radio` metros o menos, o las `k` más cercanas dentro del radio.
+        """
+        if self.arbol is None:
+            return np.empty(0, dtype='int64'), np.empty(0)
+        centro = a_radianes(latitud, longitud)
+        if radio is None:
+            distancias, posiciones = self.arbol.query(centro, k=min(k, len(self)))
+            return posiciones[0], distancias[0] * RADIO_TIERRA_M
+        if k is not None and k < len(self):
+            # Las k más cercanas y, de ellas, las que caen en el radio: no recorre todo el círculo
+            distancias, posiciones = self.arbol.query(centro, k=k)
+            dentro = distancias[0] * RADIO_TIERRA_M <= radio
+            return posiciones[0][dentro], distancias[0][dentro] * RADIO_TIERRA_M
+        posiciones, distancias = self.arbol.query_radius(
+            centro, r=radio / RADIO_TIERRA_M, return_distance=True, sort_results=True,
+        )
+        return posiciones[0], distancias[0] * RADIO_TIERRA_M
+
+    def en_rectangulo(self, oeste, sur, este, norte):
+        """Posiciones de las viviendas dentro del rectángulo, de la más cercana a la más lejana a su centro."""
+        if self.arbol is None:
+            return np.empty(0, dtype='int64')
+        latitud, longitud = (sur + norte) / 2, (oeste + este) / 2
+        # Distancia del centro a los vértices y a los puntos medios de los lados
+        radio = max(
+            haversine_m(latitud, longitud, lat, lon) for lat in (sur, latitud, norte) for lon in (oeste, longitud, este)
+        )
+        posiciones, _ = self.cercanas(latitud, longitud, radio=float(radio) * (1 + 1e-9))
+        dentro = (
+            (self.latitud[posiciones] >= sur) & (self.latitud[posiciones] <= norte)
+            & (self.longitud[posiciones] >= oeste) & (self.longitud[posiciones] <= este)
+        )
+        return posiciones[dentro]
+
+    def registros(self, posiciones, distancias=None, columnas=None):
+        """Viviendas de `posiciones` como diccionarios, con `distance_m` si se pasan distancias."""
+        columnas = [columna for columna in (columnas or self.columnas) if columna in self.columnas]
+        valores = [(columna, self.columnas[columna][posiciones].tolist()) for columna in columnas]
+        filas = [{columna: lista[i] for columna, lista in valores} for i in range(len(posiciones))]
+        if distancias is not None:
+            for fila, distancia in zip(filas, distancias.tolist()):
+                fila['distance_m'] = round(distancia, 1)
+        return filas
+
+
+def rectangulo_valido(oeste, sur, este, norte):
+    return (
+        all(math.isfinite(v) for v in (oeste, sur, este, norte))
+        and -180 <= oeste < este <= 180 and -90 <= sur < norte <= 90
+    )
@@ -0,0 +1,178 @@
+"""
+Teselas de mapa (esquema z/x/y de OpenStreetMap) sobre las viviendas.
+Las viviendas se ordenan una vez por su código Morton (x e y intercalados) en la tesela
+de ZOOM_MAXIMO. En ese orden cada tesela de cualquier zoom es un rango contiguo, así
+que encontrarla son dos búsquedas binarias y agregarla en subceldas es un desplazamiento
+de bits más un bincount: la pirámide de todos los zooms sale de una sola ordenación.
+No depende de Django.
+"""
+import math
+
+import numpy as np
+
+ZOOM_MAXIMO = 20
+# Desde este zoom se devuelven viviendas sueltas; por debajo, puntos agregados
+ZOOM_DETALLE = 15
+# Subceldas de agregación por lado de tesela: 2 ** 6 = 64 (unos 4 px en una tesela de 256)
+BITS_AGREGACION = 6
+LATITUD_MAXIMA = 85.05112878  # límite de la proyección web mercator
+
+
+def teselas(latitud, longitud, zoom):
+    """(x, y) de la tesela que contiene cada punto (arrays int64)."""
+    latitud = np.radians(np.clip(np.asarray(latitud, dtype='float64'), -LATITUD_MAXIMA, LATITUD_MAXIMA))
+    longitud = np.asarray(longitud, dtype='float64')
+    n = 1 << zoom
+    x = np.floor((longitud + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.log(np.tan(latitud) + 1.0 / np.cos(latitud)) / math.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype('int64'), np.clip(y, 0, n - 1).astype('int64')
+
+
+def limites_tesela(zoom, x, y):
+    """(oeste, sur, este, norte) en grados."""
+    n = 1 << zoom
+
+    def latitud(fila):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * fila / n))))
+
+    return x / n * 360.0 - 180.0, latitud(y + 1), (x + 1) / n * 360.0 - 180.0, latitud(y)
+
+
+def _intercalar(valores):
+    """Separa los bits de cada valor (< 2**32) con ceros: b2 b1 b0 -> b2 0 b1 0 b0."""
+    v = np.asarray(valores, dtype='uint64') & np.uint64(0xFFFFFFFF)
+    for desplazamiento, mascara in (
+        (16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+        (2, 0x3333333333333333), (1, 0x5555555555555555),
+    ):
+        v = (v | (v << np.uint64(desplazamiento))) & np.uint64(mascara)
+    return v
+
+
+def morton(x, y):
+    """Código Morton de las teselas (x, y): las de una tesela padre quedan contiguas."""
+    return _intercalar(x) | (_intercalar(y) << np.uint64(1))
+
+
+def _compactar(codigos):
+    """Inversa de _intercalar: se queda con los bits pares."""
+    v = np.asarray(codigos, dtype='uint64') & np.uint64(0x5555555555555555)
+    for desplazamiento, mascara in (
+        (1, 0x3333333333333333), (2, 0x0F0F0F0F0F0F0F0F), (4, 0x00FF00FF00FF00FF),
+        (8, 0x0000FFFF0000FFFF), (16, 0x00000000FFFFFFFF),
+    ):
+        v = (v | (v >> np.uint64(desplazamiento))) & np.uint64(mascara)
+    return v.astype('int64')
+
+
+def separar_morton(codigos):
+    """(x, y) de cada código Morton."""
+    codigos = np.asarray(codigos, dtype='uint64')
+    return _compactar(codigos), _compactar(codigos >> np.uint64(1))
+
+
+def tesela_valida(zoom, x, y):
+    return 0 <= zoom <= ZOOM_MAXIMO and 0 <= x < (1 << zoom) and 0 <= y < (1 << zoom)
+
+
+class IndiceTeselas:
+    """
+    `puntos` es un DataFrame con latitude, longitude y las columnas que se quieran servir
+    o filtrar (buy_price, district, cluster...). Las filas sin coordenadas se descartan.
+    """
+
+    def __init__(self, puntos):
+        puntos = puntos.dropna(subset=['latitude', 'longitude'])
+        x, y = teselas(puntos['latitude'], puntos['longitude'], ZOOM_MAXIMO)
+        codigos = morton(x, y)
+        orden = np.argsort(codigos, kind='stable')
+        self.codigos = codigos[orden]
+        self.columnas = {columna: puntos[columna].to_numpy()[orden] for columna in puntos.columns}
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def rango(self, zoom, x, y):
+        """Posiciones [inicio, fin) de las viviendas de la tesela."""
+        desplazamiento = np.uint64(2 * (ZOOM_MAXIMO - zoom))
+        base = morton(x, y) << desplazamiento
+        inicio, fin = np.searchsorted(self.codigos, [base, base + (np.uint64(1) << desplazamiento)])
+        return int(inicio), int(fin)
+
+    def seleccionar(self, zoom, x, y, filtros=None):
+        """Posiciones de las viviendas de la tesela que cumplen los filtros {columna: valores o (mín, máx)}."""
+        inicio, fin = self.rango(zoom, x, y)
+        mascara = np.ones(fin - inicio, dtype=bool)
+        for columna, condicion in (filtros or {}).items():
+            valores = self.columnas[columna][inicio:fin]
+            if isinstance(condicion, tuple):
+                minimo, maximo = condicion
+                if minimo is not None:
+                    mascara &= valores >= minimo
+                if maximo is not None:
+                    mascara &= valores <= maximo
+            else:
+                mascara &= np.isin(valores, list(condicion))
+        return inicio + np.flatnonzero(mascara)
+
+    def agregar(self, zoom, posiciones):
+        """
+        Puntos agregados en subceldas de la tesela: recuento, centroide y precio medio.
+        Devuelve un dict de arrays paralelos.
+        """
+        bits = min(BITS_AGREGACION, ZOOM_MAXIMO - zoom)
+        subcelda = self.codigos[posiciones] >> np.uint64(2 * (ZOOM_MAXIMO - zoom - bits))
+        celdas, inversa = np.unique(subcelda, return_inverse=True)
+        recuento = np.bincount(inversa, minlength=len(celdas))
+        agregado = {'count': recuento}
+        for columna in ('latitude', 'longitude'):
+            agregado[columna] = np.bincount(inversa, self.columnas[columna][posiciones].astype('float64'), len(celdas)) / recuento
+        if 'buy_price' in self.columnas:
+            precios = self.columnas['buy_price'][posiciones].astype('float64')
+            conocidos = ~np.isnan(precios)
+            suma = np.bincount(inversa, np.where(conocidos, precios, 0.0), len(celdas))
+            con_precio = np.bincount(inversa, conocidos, len(celdas))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                agregado['buy_price'] = suma / con_precio
+        return agregado
+
+    def geojson(self, zoom, x, y, filtros=None, propiedades=()):
+        """FeatureCollection de la tesela: viviendas sueltas desde ZOOM_DETALLE y agregados por debajo."""
+        posiciones = self.seleccionar(zoom, x, y, filtros)
+        agregada = zoom < ZOOM_DETALLE
+        if agregada:
+            datos = self.agregar(zoom, posiciones)
+            propiedades = [columna for columna in ('count', 'buy_price') if columna in datos]
+        else:
+            datos = {columna: self.columnas[columna][posiciones] for columna in ('latitude', 'longitude', *propiedades)}
+        return {
+            'type': 'FeatureCollection',
+            'tile': {'z': zoom, 'x': x, 'y': y, 'bbox': [round(v, 6) for v in limites_tesela(zoom, x, y)]},
+            'aggregated': agregada,
+            'count': len(posiciones),
+            'features': _features(datos, propiedades),
+        }
+
+
+def _valor_json(valor):
+    if isinstance(valor, (float, np.floating)):
+        return None if math.isnan(valor) else round(float(valor), 2)
+    if isinstance(valor, np.integer):
+        return int(valor)
+    if isinstance(valor, np.bool_):
+        return bool(valor)
+    return valor
+
+
+def _features(datos, propiedades):
+    longitudes = np.round(datos['longitude'].astype('float64'), 6).tolist()
+    latitudes = np.round(datos['latitude'].astype('float64'), 6).tolist()
+    columnas = [(nombre, datos[nombre].tolist()) for nombre in propiedades]
+    return [
+        {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [longitud, latitud]},
+            'properties': {nombre: _valor_json(valores[k]) for nombre, valores in columnas},
+        }
+        for k, (longitud, latitud) in enumerate(zip(longitudes, latitudes))
+    ]
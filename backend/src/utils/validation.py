@@ -0,0 +1,121 @@
+"""
+Reglas de calidad de los anuncios, evaluadas de forma vectorizada sobre DataFrames.
+Las usan el pipeline de data_processing y el importador: las filas que incumplen alguna
+regla van a cuarentena con los códigos de motivo, en vez de perderse en un dropna().
+No depende de Django (se ejecuta en los workers del pipeline).
+"""
+import datetime
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Límites de Madrid ciudad: los mismos que validar_coordenadas del frontend y los notebooks
+LIMITES_MADRID = {'lat_min': 40.3, 'lat_max': 40.6, 'lon_min': -3.9, 'lon_max': -3.5}
+
+# Rango plausible de €/m² en venta (en el dataset: 447 - 13.478 €/m²)
+PRECIO_M2_MIN = 300
+PRECIO_M2_MAX = 20000
+# Menos de 8 m² construidos por habitación no es una vivienda real
+M2_MIN_POR_HABITACION = 8
+ANIO_MIN = 1500
+
+
+def numerico(df, columna):
+    """Columna como array float64 (NaN si falta o no es numérica); NaN si no existe."""
+    if columna not in df:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[columna], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _coordenadas_nulas(df):
+    return np.isnan(numerico(df, 'latitude')) | np.isnan(numerico(df, 'longitude'))
+
+
+def _fuera_de_madrid(df):
+    lat, lon = numerico(df, 'latitude'), numerico(df, 'longitude')
+    # Con NaN las comparaciones dan False: las nulas las marca la regla anterior
+    return (
+        (lat < LIMITES_MADRID['lat_min']) | (lat > LIMITES_MADRID['lat_max'])
+        | (lon < LIMITES_MADRID['lon_min']) | (lon > LIMITES_MADRID['lon_max'])
+    )
+
+
+def _superficie_negativa(df):
+    falla = numerico(df, 'sq_mt_built') <= 0
+    for columna in ('sq_mt_useful', 'sq_mt_allotment'):
+        falla |= numerico(df, columna) < 0
+    return falla
+
+
+def _precio_m2_implausible(df):
+    superficie = numerico(df, 'sq_mt_built')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precio_m2 = numerico(df, 'buy_price') / np.where(superficie > 0, superficie, np.nan)
+    return (precio_m2 < PRECIO_M2_MIN) | (precio_m2 > PRECIO_M2_MAX)
+
+
+def _habitaciones_superficie(df):
+    habitaciones = numerico(df, 'n_rooms')
+    return (habitaciones > 0) & (numerico(df, 'sq_mt_built') < habitaciones * M2_MIN_POR_HABITACION)
+
+
+def _anio_construccion(df):
+    anio = numerico(df, 'built_year')
+    return (anio < ANIO_MIN) | (anio > datetime.date.today().year + 5)
+
+
+@dataclass(frozen=True)
+class Regla:
+    codigo: str
+    descripcion: str
+    falla: object  # DataFrame -> array de bool, True si la fila incumple la regla
+
+
+REGLAS = (
+    Regla('coordenadas_nulas', 'Sin latitud o longitud', _coordenadas_nulas),
+    Regla('fuera_de_madrid', 'Coordenadas fuera de Madrid', _fuera_de_madrid),
+    Regla('superficie_negativa', 'Superficie construida <= 0 o útil / parcela negativa', _superficie_negativa),
+    Regla('precio_m2_implausible', f'Precio fuera de {PRECIO_M2_MIN}-{PRECIO_M2_MAX} €/m²', _precio_m2_implausible),
+    Regla('habitaciones_superficie', f'Menos de {M2_MIN_POR_HABITACION} m² por habitación', _habitaciones_superficie),
+    Regla('anio_construccion', f'Año de construcción fuera de {ANIO_MIN}-hoy', _anio_construccion),
+)
+
+
+def regla_obligatorias(columnas):
+    """Regla extra para exigir que ciertas columnas no sean nulas."""
+    def falla(df):
+        return df[list(columnas)].isna().any(axis=1).to_numpy()
+    return Regla('campos_obligatorios', f'Falta {", ".join(columnas)}', falla)
+
+
+def evaluar(df, reglas=REGLAS):
+    """Máscara de bits por fila: el bit i está activo si la fila incumple reglas[i]."""
+    bits = np.zeros(len(df), dtype=np.uint32)
+    for posicion, regla in enumerate(reglas):
+        bits |= np.asarray(regla.falla(df), dtype=bool).astype(np.uint32) << posicion
+    return bits
+
+
+def motivos(bits, reglas=REGLAS):
+    """Códigos de motivo separados por comas para cada máscara de bits."""
+    textos = np.full(len(bits), '', dtype=object)
+    for posicion, regla in enumerate(reglas):
+        falla = (bits >> posicion) & 1 == 1
+        textos[falla] = textos[falla] + ',' + regla.codigo
+    return np.array([texto[1:] for texto in textos], dtype=object)
+
+
+def separar(df, reglas=REGLAS):
+    """Devuelve (válidas, cuarentena); la cuarentena lleva la columna `motivos`."""
+    bits = evaluar(df, reglas)
+    rechazadas = bits != 0
+    cuarentena = df[rechazadas].assign(motivos=motivos(bits[rechazadas], reglas))
+    return df[~rechazadas], cuarentena
+
+
+def contar_motivos(cuarentena):
+    """{código: filas} de una cuarentena (una fila puede sumar a varios códigos)."""
+    if cuarentena.empty:
+        return {}
+    return cuarentena['motivos'].str.split(',').explode().value_counts().to_dict()
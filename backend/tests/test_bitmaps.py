@@ -0,0 +1,135 @@
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from src.models.houses import House
+from src.utils.addresses import clave_direccion
+from src.utils.bitmaps import IndiceBitmap, contar
+from tests.utils import viviendas
+
+
+class IndiceBitmapTests(SimpleTestCase):
+    """Filtros del índice de bitmaps frente a máscaras de pandas"""
+
+    def setUp(self):
+        # 1003 viviendas con los ids desordenados
+        self.viviendas = viviendas(
+            1003, 'buy_price', semilla=3,
+            id=lambda rng, n: rng.permutation(n) + 1,
+            has_lift=lambda rng, n: rng.random(n) < 0.6,
+            has_pool=lambda rng, n: np.where(rng.random(n) < 0.2, True, None),
+            has_garden=lambda rng, n: rng.random(n) < 0.1,
+            n_rooms=lambda rng, n: rng.integers(1, 6, n).astype(float),
+            energy_certificate=lambda rng, n: rng.choice(['A', 'B', 'E', None], n),
+        )
+        self.viviendas.loc[0, 'n_rooms'] = np.nan
+        self.indice = IndiceBitmap(self.viviendas)
+
+    def ids(self, mascara):
+        return sorted(self.viviendas.loc[mascara, 'id'], reverse=True)
+
+    def test_combinacion_de_filtros(self):
+        bitmap = self.indice.filtrar(
+            equipamiento={'has_lift': True, 'has_pool': False},
+            categorias={'n_rooms': [3, '4'], 'energy_certificate': ['A', 'B']},
+            min_price=300000,
+        )
+        df = self.viviendas
+        mascara = (
+            df['has_lift'] & df['has_pool'].isna() & df['n_rooms'].isin([3, 4])
+            & df['energy_certificate'].isin(['A', 'B']) & (df['buy_price'] >= 300000)
+        )
+        self.assertEqual(list(self.indice.ids_de(bitmap)), self.ids(mascara))
+        self.assertEqual(contar(bitmap), int(mascara.sum()))
+
+    def test_alguno(self):
+        bitmap = self.indice.filtrar(alguno=['has_pool', 'has_garden'])
+        mascara = self.viviendas['has_pool'].notna() | self.viviendas['has_garden']
+        self.assertEqual(list(self.indice.ids_de(bitmap)), self.ids(mascara))
+
+    def test_negacion_no_cuenta_el_relleno(self):
+        # 1003 viviendas: el último byte tiene 5 bits de relleno
+        bitmap = self.indice.filtrar(equipamiento={'has_garden': False})
+        self.assertEqual(contar(bitmap), int((~self.viviendas['has_garden']).sum()))
+
+    def test_limite_y_orden(self):
+        self.assertEqual(list(self.indice.ids_de(self.indice.filtrar(), limite=3)), [1003, 1002, 1001])
+
+    def test_facetas_igual_a_groupby(self):
+        filtros = {'equipamiento': {'has_lift': True}, 'categorias': {'n_rooms': [2, 3]}}
+        facetas = self.indice.facetas(**filtros)
+        df = self.viviendas[self.viviendas['has_lift']]
+        self.assertEqual(facetas['total'], int(df['n_rooms'].isin([2, 3]).sum()))
+        # Cada faceta se cuenta sin su propio filtro
+        esperadas = df['n_rooms'].value_counts()
+        self.assertEqual(
+            {faceta['value']: faceta['count'] for faceta in facetas['categorias']['n_rooms']},
+            {str(int(valor)): cuenta for valor, cuenta in esperadas.items()},
+        )
+        filtradas = df[df['n_rooms'].isin([2, 3])]
+        self.assertEqual(
+            {faceta['value']: faceta['count'] for faceta in facetas['categorias']['energy_certificate']},
+            filtradas['energy_certificate'].value_counts().to_dict(),
+        )
+        en_habitaciones = self.viviendas[self.viviendas['n_rooms'].isin([2, 3])]
+        self.assertEqual(facetas['equipamiento']['has_lift'], int(en_habitaciones['has_lift'].sum()))
+        self.assertEqual(facetas['equipamiento']['has_garden'], int(filtradas['has_garden'].sum()))
+
+    def test_facetas_en_cache_por_filtro_normalizado(self):
+        primera = self.indice.facetas(categorias={'n_rooms': [3, 2]}, alguno=['has_pool', 'has_garden'])
+        segunda = self.indice.facetas(categorias={'n_rooms': ['2', 3.0]}, alguno=['has_garden', 'has_pool'])
+        self.assertIs(primera, segunda)
+
+    def test_columna_desconocida(self):
+        with self.assertRaises(ValueError):
+            self.indice.filtrar(equipamiento={'has_sauna': True})
+        with self.assertRaises(ValueError):
+            self.indice.filtrar(categorias={'orientation': ['N']})
+
+
+class FiltrosEquipamientoAPITests(TestCase):
+    """Filtros de equipamiento de /api/properties/ y facetas de /api/properties/facets/ sobre la tabla House"""
+
+    @classmethod
+    def setUpTestData(cls):
+        House.objects.bulk_create([
+            House(
+                latitude=40.42, longitude=-3.70, buy_price=200000 + 10000 * i, district='1', n_rooms=1 + i % 3,
+                has_lift=i % 2 == 0, has_pool=i % 3 == 0, has_terrace=i == 5, energy_certificate='A' if i < 4 else 'E',
+                street_name=f'Calle {i}', address_key=clave_direccion(f'Calle {i}', None, None),
+            )
+            for i in range(10)
+        ])
+
+    def test_filtros(self):
+        respuesta = self.client.get('/api/properties/', {'has_lift': '1', 'has_pool': 'true', 'limit': 1})
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        # i = 0 y 6
+        self.assertEqual((datos['total'], datos['count']), (2, 1))
+        self.assertEqual(datos['properties'][0]['buy_price'], 260000)
+
+    def test_categorias_alguno_y_precio(self):
+        datos = self.client.get('/api/properties/', {
+            'energy_certificate': 'A', 'any': 'has_pool,has_terrace', 'n_rooms': '1,2', 'max_price': 250000,
+        }).json()
+        # i = 0 (pool, 1 hab.) y 3 (pool, 1 hab.)
+        self.assertEqual(sorted(p['buy_price'] for p in datos['properties']), [200000, 230000])
+
+    def test_facetas(self):
+        respuesta = self.client.get('/api/properties/facets/', {'has_lift': '1', 'n_rooms': '1'})
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        # Ascensor: i = 0, 2, 4, 6, 8 (1, 3, 2, 1 y 3 habitaciones)
+        self.assertEqual(datos['total'], 2)
+        self.assertEqual([(f['value'], f['count']) for f in datos['facets']['n_rooms']], [('1', 2), ('3', 2), ('2', 1)])
+        self.assertEqual(datos['facets']['district'], [{'value': '1', 'label': None, 'count': 2}])
+        # 1 habitación: i = 0, 3, 6, 9
+        self.assertEqual(datos['facets']['amenities']['has_lift'], 2)
+        self.assertEqual(datos['facets']['amenities']['has_pool'], 2)
+        self.assertEqual(datos['facets']['amenities']['has_terrace'], 0)
+
+    def test_valores_no_validos(self):
+        for parametros in ({'has_lift': 'quizá'}, {'any': 'has_sauna'}):
+            self.assertEqual(self.client.get('/api/properties/', parametros).status_code, 400, parametros)
+            self.assertEqual(self.client.get('/api/properties/facets/', parametros).status_code, 400, parametros)
+        self.assertEqual(self.client.get('/api/properties/facets/', {'min_price': 'x'}).status_code, 400)
@@ -0,0 +1,74 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from src.services.causal import GrafoCausal, grafo_causal
+
+
+def resultados_sinteticos():
+    graph = np.full((3, 3, 2), '', dtype='<U3')
+    val = np.zeros((3, 3, 2))
+    # Contemporáneo no orientado: aparece en (0, 1) y (1, 0)
+    graph[0, 1, 0] = graph[1, 0, 0] = 'o-o'
+    val[0, 1, 0] = val[1, 0, 0] = 0.6
+    # Contemporáneo orientado: '-->' en (2, 1) y '<--' en (1, 2)
+    graph[2, 1, 0], graph[1, 2, 0] = '-->', '<--'
+    val[2, 1, 0] = val[1, 2, 0] = -0.3
+    # Retardado
+    graph[2, 0, 1] = '-->'
+    val[2, 0, 1] = 0.9
+    return {'graph': graph, 'val_matrix': val, 'p_matrix': np.full((3, 3, 2), 0.01), 'var_names': ['a', 'b', 'c']}
+
+
+class GrafoCausalTests(SimpleTestCase):
+    """Extracción vectorizada de enlaces PCMCI"""
+
+    def setUp(self):
+        self.grafo = GrafoCausal.desde_resultados(resultados_sinteticos())
+
+    def test_enlaces_sin_duplicar_los_contemporaneos(self):
+        self.assertEqual(
+            [(e['source'], e['link'], e['target'], e['lag']) for e in self.grafo.enlaces()],
+            [('c', '-->', 'a', 1), ('a', 'o-o', 'b', 0), ('c', '-->', 'b', 0)],
+        )
+
+    def test_filtros(self):
+        self.assertEqual(len(self.grafo.enlaces(variable='b')), 2)
+        self.assertEqual([e['lag'] for e in self.grafo.enlaces(lag=0)], [0, 0])
+        self.assertEqual([e['strength'] for e in self.grafo.enlaces(fuerza_min=0.5)], [0.9, 0.6])
+        self.assertEqual(len(self.grafo.enlaces(tipo='o-o')), 1)
+        with self.assertRaises(ValueError):
+            self.grafo.enlaces(variable='z')
+
+    def test_nombres_de_variables(self):
+        resultados = resultados_sinteticos()
+        resultados['var_names'] = np.array(['a', 'b', 'c'])
+        self.assertEqual(GrafoCausal.desde_resultados(resultados).enlaces()[0]['source'], 'c')
+        del resultados['var_names']
+        self.assertEqual(GrafoCausal.desde_resultados(resultados).enlaces()[0]['source'], 2)
+
+    def test_sin_p_matrix(self):
+        resultados = resultados_sinteticos()
+        resultados['p_matrix'] = None
+        self.assertIsNone(GrafoCausal.desde_resultados(resultados).enlaces()[0]['p_value'])
+
+
+class CausalAPITests(SimpleTestCase):
+    """Endpoint /api/causal/ con los resultados PCMCI del repositorio"""
+
+    def test_filtra_por_variable(self):
+        respuesta = self.client.get('/api/causal/', {'variable': 'buy_price', 'min_strength': 0.5})
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos['count'], len(datos['edges']))
+        self.assertTrue(datos['edges'])
+        for enlace in datos['edges']:
+            self.assertIn('buy_price', (enlace['source'], enlace['target']))
+            self.assertGreaterEqual(abs(enlace['strength']), 0.5)
+        self.assertTrue(respuesta.has_header('ETag'))
+
+    def test_parametros_no_validos(self):
+        self.assertEqual(self.client.get('/api/causal/', {'variable': 'no_existe'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/causal/', {'lag': 'uno'}).status_code, 400)
+
+    def test_se_carga_una_vez(self):
+        self.assertIs(grafo_causal(), grafo_causal())
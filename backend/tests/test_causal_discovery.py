@@ -0,0 +1,78 @@
+import shutil
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+from tigramite import data_processing as pp
+from tigramite.independence_tests.parcorr import ParCorr
+from tigramite.pcmci import PCMCI
+
+from src.causal_discovery import ConfiguracionPCMCI, ejecutar_pcmci, guardar_resultados, preparar_datos
+from src.services.causal import GrafoCausal
+
+
+def serie_sintetica(filas=400, semilla=0):
+    """x causa y con un retardo y z es ruido."""
+    rng = np.random.default_rng(semilla)
+    x = rng.normal(size=filas)
+    y = 0.8 * np.roll(x, 1) + 0.3 * rng.normal(size=filas)
+    return pd.DataFrame({'x': x, 'y': y, 'z': rng.normal(size=filas)})
+
+
+class PCMCIParaleloTests(SimpleTestCase):
+    """PCMCI repartido por variable, con caché de tareas"""
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        self.datos = serie_sintetica()
+        self.config = ConfiguracionPCMCI(tau_max=2, pc_alpha=0.1)
+
+    def test_igual_que_run_pcmci_en_serie(self):
+        pcmci = PCMCI(dataframe=pp.DataFrame(self.datos.to_numpy(), var_names=list(self.datos)), cond_ind_test=ParCorr())
+        esperado = pcmci.run_pcmci(tau_max=2, pc_alpha=0.1)
+        resultados = ejecutar_pcmci(self.datos, self.config, workers=1).resultados
+        np.testing.assert_array_equal(resultados['graph'], esperado['graph'])
+        np.testing.assert_allclose(resultados['val_matrix'], esperado['val_matrix'])
+        np.testing.assert_allclose(resultados['p_matrix'], esperado['p_matrix'])
+        self.assertEqual(resultados['graph'][0, 1, 1], '-->')
+
+    def test_en_paralelo_da_lo_mismo(self):
+        serie = ejecutar_pcmci(self.datos, self.config, workers=1)
+        paralelo = ejecutar_pcmci(self.datos, self.config, workers=2)
+        self.assertEqual(paralelo.workers, 2)
+        np.testing.assert_array_equal(paralelo.resultados['graph'], serie.resultados['graph'])
+        # En otro proceso BLAS puede redondear distinto en el último bit
+        np.testing.assert_allclose(paralelo.resultados['val_matrix'], serie.resultados['val_matrix'])
+        np.testing.assert_allclose(paralelo.resultados['p_matrix'], serie.resultados['p_matrix'])
+
+    def test_la_cache_evita_recalcular(self):
+        primero = ejecutar_pcmci(self.datos, self.config, workers=1, cache=self.directorio)
+        segundo = ejecutar_pcmci(self.datos, self.config, workers=1, cache=self.directorio)
+        self.assertEqual((primero.en_cache, segundo.en_cache), (0, segundo.tareas))
+        np.testing.assert_array_equal(primero.resultados['p_matrix'], segundo.resultados['p_matrix'])
+        # alpha_level solo umbraliza: los tests se reaprovechan
+        self.config.alpha_level = 0.01
+        tercero = ejecutar_pcmci(self.datos, self.config, workers=1, cache=self.directorio)
+        self.assertEqual(tercero.en_cache, tercero.tareas)
+        self.assertNotEqual(tercero.huella, primero.huella)
+
+    def test_artefacto_versionado(self):
+        resultados = ejecutar_pcmci(self.datos, self.config, workers=1).resultados
+        versionado = guardar_resultados(resultados, self.directorio)
+        self.assertTrue(versionado.exists())
+        self.assertIn(resultados['version']['huella'][:12], versionado.name)
+        grafo = GrafoCausal.desde_resultados(joblib.load(versionado))
+        self.assertEqual(grafo.enlaces(variable='y', lag=1)[0]['source'], 'x')
+
+    def test_preparar_datos(self):
+        df = pd.DataFrame({'a': [1.0, None, 3.0], 'b': [True, False, True], 'c': ['z', None, 'a']})
+        datos = preparar_datos(df, ['a', 'b', 'c'])
+        self.assertEqual(datos['a'].tolist(), [1.0, 2.0, 3.0])
+        self.assertEqual(datos['b'].tolist(), [1.0, 0.0, 1.0])
+        # Orden alfabético, como LabelEncoder: Unknown, a, z
+        self.assertEqual(datos['c'].tolist(), [2.0, 0.0, 1.0])
+        with self.assertRaises(ValueError):
+            preparar_datos(df, ['a', 'falta'])
@@ -0,0 +1,60 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from src.models.houses import House
+from src.utils.addresses import clave_direccion
+from src.utils.cluster_map import filas_marcadores, mapa_clusters
+from tests.utils import viviendas
+
+COLUMNAS_MARCADOR = ('latitude', 'longitude', 'buy_price', 'sq_mt_built', 'n_rooms', 'n_bathrooms')
+
+
+class MapaClustersTests(SimpleTestCase):
+    """Mapa de clusters con marcadores creados en el navegador"""
+
+    def test_filas_compactas(self):
+        df = pd.DataFrame({
+            'latitude': [40.4168123], 'longitude': [-3.7038456], 'buy_price': [250000.4],
+            'sq_mt_built': [np.nan], 'n_rooms': [3.0], 'n_bathrooms': [1.0],
+        })
+        self.assertEqual(filas_marcadores(df), [[40.41681, -3.70385, 250000, None, 3, 1]])
+
+    def test_una_capa_por_cluster(self):
+        df = viviendas(300, *COLUMNAS_MARCADOR, semilla=3, cluster=lambda rng, n: rng.integers(0, 3, n))
+        html = mapa_clusters(df).get_root().render()
+        for cluster, n in df['cluster'].value_counts().items():
+            self.assertIn(f'Cluster {cluster} ({n} viviendas)', html)
+        self.assertEqual(html.count('L.markerClusterGroup('), df['cluster'].nunique())
+        self.assertNotIn('circle_marker_', html)
+
+
+class GenerarMapaClustersTests(TestCase):
+    """Comando generar_mapa_clusters sobre la tabla House"""
+
+    @classmethod
+    def setUpTestData(cls):
+        House.objects.bulk_create([
+            House(
+                latitude=fila.latitude, longitude=fila.longitude, buy_price=fila.buy_price,
+                sq_mt_built=fila.sq_mt_built, n_rooms=fila.n_rooms, n_bathrooms=fila.n_bathrooms, rent_price=1200,
+                street_name=f'Calle {i}', address_key=clave_direccion(f'Calle {i}', None, None),
+            )
+            for i, fila in enumerate(viviendas(100, *COLUMNAS_MARCADOR).itertuples())
+        ])
+
+    def test_genera_el_mapa_y_compara(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            salida = Path(directorio) / 'mapa.html'
+            out = StringIO()
+            call_command('generar_mapa_clusters', salida=str(salida), comparar=True, stdout=out)
+            html = salida.read_text(encoding='utf-8')
+            self.assertIn('L.markerClusterGroup(', html)
+            self.assertEqual(sorted(p.name for p in Path(directorio).iterdir()), ['mapa.html'])
+        self.assertIn('100 viviendas', out.getvalue())
+        self.assertIn('CircleMarker por fila', out.getvalue())
@@ -0,0 +1,66 @@
+import gzip
+import json
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from src.models.houses import HouseQuerySet
+from src.services.compression import brotli, negociar_codificacion
+
+
+class NegociacionTests(SimpleTestCase):
+    """Negociación de Accept-Encoding"""
+
+    def negociar(self, accept_encoding):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return negociar_codificacion(request)
+
+    def test_prefiere_brotli_si_esta_disponible(self):
+        esperado = 'br' if brotli is not None else 'gzip'
+        self.assertEqual(self.negociar('gzip, deflate, br'), esperado)
+
+    def test_respeta_los_valores_q(self):
+        self.assertEqual(self.negociar('br;q=0.1, gzip;q=0.9'), 'gzip')
+        self.assertEqual(self.negociar('gzip;q=0, br;q=0'), 'identity')
+
+    def test_sin_cabecera_no_comprime(self):
+        self.assertEqual(self.negociar(''), 'identity')
+
+
+class CacheComprimidaTests(TestCase):
+    """Caché de bytes comprimidos en los endpoints calientes"""
+
+    def setUp(self):
+        caches['respuestas'].clear()
+
+    def test_gzip_devuelve_el_mismo_json(self):
+        plano = self.client.get('/api/properties/', {'limit': 20})
+        comprimido = self.client.get('/api/properties/', {'limit': 20}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(comprimido['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', comprimido['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(comprimido.content)), json.loads(plano.content))
+        self.assertNotEqual(plano['ETag'], comprimido['ETag'])
+
+    def test_brotli(self):
+        if brotli is None:
+            self.skipTest('brotli no instalado')
+        response = self.client.get('/api/clustering/', {'limit': 20}, HTTP_ACCEPT_ENCODING='br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(len(json.loads(brotli.decompress(response.content))['properties']), 20)
+
+    def test_respuesta_caliente_no_recomputa(self):
+        self.client.get('/clustering/', {'cluster': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        with mock.patch('src.services.views.pd.read_csv', side_effect=AssertionError('no debe leer el CSV')):
+            response = self.client.get('/clustering/', {'cluster': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(json.loads(gzip.decompress(response.content)))
+
+    def test_calcula_el_etag_una_vez_por_peticion(self):
+        # condicional y la caché piden el mismo ETag, y los índices del proceso la misma firma:
+        # la firma de House se consulta una sola vez
+        parametros = {'limit': 5, 'has_lift': 'true'}
+        with mock.patch.object(HouseQuerySet, 'firma', autospec=True, side_effect=HouseQuerySet.firma) as firma:
+            response = self.client.get('/api/properties/', parametros, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(firma.call_count, 1)
@@ -0,0 +1,123 @@
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from src.models.houses import House
+from src.utils.addresses import clave_direccion
+from src.utils.comps import (
+    EQUIPAMIENTO, NUMERICAS_COMPS, MotorComparables, matriz_caracteristicas, pesos_completos,
+    vector_caracteristicas, vector_pesos,
+)
+from tests.utils import viviendas
+
+ESCALADOR = {
+    'mean': {'latitude': 40.42, 'longitude': -3.69, 'sq_mt_built': 116.0, 'n_rooms': 2.75,
+             'n_bathrooms': 1.73, 'built_year': 1969.0, 'floor': 2.05},
+    'scale': {'latitude': 0.072, 'longitude': 0.05, 'sq_mt_built': 95.7, 'n_rooms': 1.36,
+              'n_bathrooms': 1.05, 'built_year': 21.9, 'floor': 2.66},
+}
+
+
+def viviendas_comps(n=500):
+    df = viviendas(
+        n, 'id', *NUMERICAS_COMPS, semilla=7,
+        address=[f'Calle {i}' for i in range(n)],
+        precio_m2=lambda rng, n: rng.uniform(2000, 6000, n),
+        **{columna: (lambda rng, n: rng.random(n) < 0.4) for columna in EQUIPAMIENTO},
+    )
+    df['buy_price'] = df['sq_mt_built'] * df.pop('precio_m2')
+    df.loc[0, 'built_year'] = np.nan
+    df.loc[1, 'floor'] = 'bajo'
+    return df
+
+
+class MotorComparablesTests(SimpleTestCase):
+    """Comparables en el espacio tipificado y ponderado"""
+
+    def setUp(self):
+        self.viviendas = viviendas_comps()
+        self.motor = MotorComparables(self.viviendas, ESCALADOR)
+        self.matriz = matriz_caracteristicas(self.viviendas, ESCALADOR)
+
+    def fuerza_bruta(self, fila, pesos):
+        diferencias = (self.matriz - self.matriz[fila]) * vector_pesos(pesos_completos(pesos))
+        return np.sqrt((diferencias ** 2).sum(axis=1))
+
+    def test_vector_igual_a_fila_de_la_matriz(self):
+        for fila in range(20):
+            sujeto = self.viviendas.iloc[fila].to_dict()
+            np.testing.assert_allclose(vector_caracteristicas(sujeto, ESCALADOR), self.matriz[fila])
+        # Faltantes y plantas no numéricas quedan en la media
+        self.assertEqual(self.matriz[0, NUMERICAS_COMPS.index('built_year')], 0)
+        self.assertEqual(self.matriz[1, NUMERICAS_COMPS.index('floor')], 0)
+
+    def test_igual_a_fuerza_bruta_con_pesos(self):
+        for pesos in ({}, {'location': 10, 'amenities': 0}, {'sq_mt_built': 5}):
+            sujeto = self.motor.sujeto(11)
+            posiciones, distancias = self.motor.buscar(sujeto, k=8, pesos=pesos, excluir_id=11)
+            esperadas = self.fuerza_bruta(10, pesos)
+            orden = [p for p in np.argsort(esperadas, kind='stable') if p != 10][:8]
+            np.testing.assert_allclose(distancias, esperadas[orden])
+            self.assertNotIn(10, posiciones)
+
+    def test_estimacion_ponderada(self):
+        posiciones, distancias = np.array([0, 1]), np.array([0.0, 1.0])
+        estimacion, similitud = self.motor.estimar(posiciones, distancias, superficie=100)
+        np.testing.assert_allclose(similitud, [1.0, 0.5])
+        precios = self.viviendas['buy_price'].to_numpy()[:2]
+        self.assertAlmostEqual(estimacion['buy_price'], (precios[0] + 0.5 * precios[1]) / 1.5)
+        self.assertAlmostEqual(estimacion['buy_price_by_area'], estimacion['price_m2'] * 100)
+
+    def test_pesos_no_validos(self):
+        with self.assertRaises(ValueError):
+            pesos_completos({'garaje': 1})
+        with self.assertRaises(ValueError):
+            pesos_completos({'location': -1})
+
+
+class CompsAPITests(TestCase):
+    """Endpoint /api/comps/ sobre la tabla House"""
+
+    @classmethod
+    def setUpTestData(cls):
+        House.objects.bulk_create([
+            House(
+                latitude=40.4168 + 0.002 * (i % 5), longitude=-3.7038, sq_mt_built=60 + 10 * i, n_rooms=2 + i % 3,
+                n_bathrooms=1, buy_price=200000 + 20000 * i, has_lift=i % 2 == 0,
+                street_name=f'Calle {i}', address_key=clave_direccion(f'Calle {i}', None, None),
+            )
+            for i in range(12)
+        ])
+
+    def test_comparables_de_una_vivienda_del_dataset(self):
+        sujeto = House.objects.get(street_name='Calle 5')
+        respuesta = self.client.get('/api/comps/', {'id': sujeto.id, 'k': 3})
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos['count'], 3)
+        self.assertNotIn(sujeto.id, [comp['id'] for comp in datos['comps']])
+        distancias = [comp['distance'] for comp in datos['comps']]
+        self.assertEqual(distancias, sorted(distancias))
+        precios = [comp['buy_price'] for comp in datos['comps']]
+        self.assertTrue(min(precios) <= datos['estimate']['buy_price'] <= max(precios))
+
+    def test_sujeto_descrito_y_pesos(self):
+        respuesta = self.client.get('/api/comps/', {
+            'latitude': 40.4168, 'longitude': -3.7038, 'sq_mt_built': 100, 'has_lift': 'true',
+            'weights': 'sq_mt_built:10', 'k': 1,
+        })
+        datos = respuesta.json()
+        self.assertEqual(datos['comps'][0]['sq_mt_built'], 100)
+        self.assertEqual(datos['weights']['sq_mt_built'], 10)
+
+    def test_errores(self):
+        self.assertEqual(self.client.get('/api/comps/', {'id': 999999}).status_code, 404)
+        vivienda_id = House.objects.first().id
+        for parametros in (
+            {'latitude': 40.4},
+            {'id': vivienda_id, 'k': 0},
+            {'id': vivienda_id, 'weights': 'parking:2'},
+            {'id': vivienda_id, 'weights': 'location'},
+            # Los parámetros se validan antes de buscar la vivienda
+            {'id': 999999, 'weights': 'sq_mt_built:-1'},
+        ):
+            self.assertEqual(self.client.get('/api/comps/', parametros).status_code, 400, parametros)
@@ -0,0 +1,54 @@
+from unittest import mock
+
+from django.test import TestCase
+
+
+class ConditionalGetTests(TestCase):
+    """ETags y respuestas 304 en los endpoints de lectura"""
+
+    def test_properties_devuelve_etag_fuerte(self):
+        response = self.client.get('/api/properties/', {'limit': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertFalse(response['ETag'].startswith('W/'))
+        # Depende de House: sin Last-Modified, que saldría de las fechas de los ficheros
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_if_none_match_devuelve_304_sin_recomputar(self):
+        etag = self.client.get('/api/properties/', {'limit': 5})['ETag']
+        with mock.patch('src.services.api_views.pd.read_csv', side_effect=AssertionError('no debe leer el CSV')):
+            response = self.client.get('/api/properties/', {'limit': 5}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_if_modified_since_devuelve_304(self):
+        last_modified = self.client.get('/clustering/', {'cluster': 1})['Last-Modified']
+        response = self.client.get('/clustering/', {'cluster': 1}, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since_no_vale_si_depende_de_house(self):
+        # Tras una importación los ficheros no cambian: solo el ETag detecta los datos nuevos
+        response = self.client.get(
+            '/api/properties/', {'limit': 5}, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT',
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depende_de_los_parametros_normalizados(self):
+        etag_a = self.client.get('/api/properties/?limit=5&min_price=100000')['ETag']
+        etag_b = self.client.get('/api/properties/?min_price=100000&limit=5')['ETag']
+        etag_c = self.client.get('/api/properties/?limit=6&min_price=100000')['ETag']
+        self.assertEqual(etag_a, etag_b)
+        self.assertNotEqual(etag_a, etag_c)
+
+    def test_etag_cambia_con_la_version_del_dataset(self):
+        etag = self.client.get('/api/properties/', {'limit': 5})['ETag']
+        with mock.patch('src.services.versioning.dataset_version', return_value='otra-version'):
+            response = self.client.get('/api/properties/', {'limit': 5}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_clustering_table_responde_304(self):
+        etag = self.client.get('/clustering/', {'cluster': 1})['ETag']
+        with mock.patch('src.services.views.joblib.load', side_effect=AssertionError('no debe cargar modelos')):
+            response = self.client.get('/clustering/', {'cluster': 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,118 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+import pandas as pd
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from src.data_processing import ConfiguracionPipeline, ejecutar_pipeline
+
+LIMPIO = """,id,sq_mt_built,n_rooms,floor,buy_price,has_lift,district
+0,1,64.0,2,3,85000,False,21
+1,2,70.0,3,4,129900,True,21
+2,3,94.0,2,1,144247,False,5
+3,4,80.0,2,1,,True,5
+4,2,70.0,3,4,129900,True,21
+5,5,50.0,1,2,99000,False,5
+"""
+
+COORDENADAS = """id,latitude,longitude,address
+1,40.34,-3.68,"Calle de Godella, 64, Madrid"
+2,40.35,-3.69,"Calle de la Del Manojo de Rosas, 4, Madrid"
+3,40.36,-3.70,"Calle del Talco, 68, Madrid"
+4,40.37,-3.71,"Calle Pedro Jiménez, Madrid"
+"""
+
+CRUDO = """,id,latitude,longitude,floor,title,street_name,built_year,is_new_development
+0,1,0.0,0.0,bajo, Piso en venta ,Calle de Godella ,1960.0,False
+1,2,0.0,0.0,4,Piso en venta,,,True
+2,3,0.0,0.0,1,Casa en venta,Calle del Talco,2005.0,
+"""
+
+
+class PipelineTests(SimpleTestCase):
+    """Pipeline por bloques de data_processing"""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.dir = Path(directorio.name)
+        for nombre, contenido in (('limpio.csv', LIMPIO), ('coordenadas.csv', COORDENADAS), ('crudo.csv', CRUDO)):
+            (self.dir / nombre).write_text(contenido, encoding='utf-8')
+
+    def config(self, **opciones):
+        opciones = {'chunksize': 2, 'workers': 1, **opciones}
+        return ConfiguracionPipeline(
+            entrada=self.dir / 'limpio.csv',
+            coordenadas=self.dir / 'coordenadas.csv',
+            salida=self.dir / 'parquet',
+            crudo=self.dir / 'crudo.csv',
+            csv_salida=self.dir / 'unificado.csv',
+            **opciones,
+        )
+
+    def test_unifica_limpia_y_valida_por_bloques(self):
+        resultado = ejecutar_pipeline(self.config())
+        self.assertEqual((resultado.leidas, resultado.bloques), (6, 3))
+        self.assertEqual(resultado.duplicadas, 1)  # id 2 repetido en otro bloque
+        self.assertEqual(resultado.sin_coordenadas, 1)  # id 5
+        self.assertEqual(resultado.cuarentena, 1)  # id 4 sin precio
+        self.assertEqual(resultado.motivos, {'campos_obligatorios': 1})
+        self.assertEqual(resultado.escritas, 3)
+
+        unificado = pd.read_csv(self.dir / 'unificado.csv')
+        # Mismo orden de columnas que unified_houses_madrid.csv y las coordenadas del fichero de coordenadas
+        self.assertEqual(
+            list(unificado.columns),
+            ['id', 'latitude', 'longitude', 'address', 'sq_mt_built', 'n_rooms', 'floor', 'buy_price',
+             'has_lift', 'district', 'title', 'street_name', 'built_year', 'is_new_development'],
+        )
+        self.assertEqual(unificado['id'].tolist(), [1, 2, 3])
+        self.assertEqual(unificado['latitude'].tolist(), [40.34, 40.35, 40.36])
+        self.assertEqual(unificado['floor'].tolist(), [3, 4, 1])
+        self.assertEqual(unificado['title'].tolist(), ['Piso en venta', 'Piso en venta', 'Casa en venta'])
+        self.assertEqual(unificado['street_name'].iloc[0], 'Calle de Godella')
+
+    def test_parquet_particionado_por_distrito(self):
+        ejecutar_pipeline(self.config())
+        particiones = sorted(p.name for p in (self.dir / 'parquet').iterdir())
+        self.assertEqual(particiones, ['district=21', 'district=5'])
+        datos = pd.read_parquet(self.dir / 'parquet').sort_values('id')
+        self.assertEqual(datos['id'].tolist(), [1, 2, 3])
+        self.assertEqual(str(datos['n_rooms'].dtype), 'Int64')
+        self.assertEqual(str(datos['has_lift'].dtype), 'boolean')
+
+    def test_cuarentena_en_parquet_con_motivos(self):
+        limpio = LIMPIO.replace('5,50.0,1,2,99000', '5,50.0,1,2,9900')
+        (self.dir / 'limpio.csv').write_text(limpio, encoding='utf-8')
+        (self.dir / 'coordenadas.csv').write_text(COORDENADAS + '5,41.90,-3.70,"Fuera de Madrid"\n', encoding='utf-8')
+        resultado = ejecutar_pipeline(self.config())
+
+        self.assertEqual(resultado.motivos, {'campos_obligatorios': 1, 'fuera_de_madrid': 1, 'precio_m2_implausible': 1})
+        cuarentena = pd.read_parquet(self.dir / 'cuarentena').sort_values('id')
+        self.assertEqual(cuarentena['id'].tolist(), [4, 5])
+        self.assertEqual(cuarentena['motivos'].tolist(), ['campos_obligatorios', 'fuera_de_madrid,precio_m2_implausible'])
+
+    def test_pool_de_procesos_da_el_mismo_resultado(self):
+        ejecutar_pipeline(self.config())
+        secuencial = pd.read_csv(self.dir / 'unificado.csv')
+        ejecutar_pipeline(self.config(workers=2, sobrescribir=True))
+        pd.testing.assert_frame_equal(pd.read_csv(self.dir / 'unificado.csv'), secuencial)
+
+    def test_no_sobrescribe_sin_permiso(self):
+        ejecutar_pipeline(self.config())
+        with self.assertRaises(FileExistsError):
+            ejecutar_pipeline(self.config())
+
+    def test_comando_informa_de_tiempos_por_etapa(self):
+        salida = StringIO()
+        call_command(
+            'procesar_datos', entrada=str(self.dir / 'limpio.csv'), coordenadas=str(self.dir / 'coordenadas.csv'),
+            salida=str(self.dir / 'parquet'), workers=1, stdout=salida,
+        )
+        for etapa in ('lectura', 'unificar', 'limpiar', 'validar', 'escribir'):
+            self.assertIn(etapa, salida.getvalue())
+        self.assertIn('✅ 3 viviendas', salida.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('procesar_datos', entrada=str(self.dir / 'no_existe.csv'), stdout=StringIO())
@@ -0,0 +1,157 @@
+import json
+import tempfile
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from src.utils.addresses import agrupar_edificios
+from src.utils.geocoding import CacheGeocodificacion, clave_geocodificacion
+
+CSV = """id,latitude,longitude,address
+1,,,"Calle del Talco, 68, San Andrés, Madrid"
+2,,,"calle del talco ,68,  San Andres, Madrid"
+3,,,"Calle Desconocida, San Andrés, Madrid"
+4,,,"Calle Saturada, 1, Madrid"
+5,,,
+"""
+
+
+
+class EdificiosTests(SimpleTestCase):
+    """Claves canónicas de edificio para geocodificar cada uno una sola vez"""
+
+    def test_agrupa_variantes_de_la_misma_direccion(self):
+        df = pd.DataFrame({
+            'raw_address': [
+                'C/ Alcalá, 160, 3ºB', 'Calle de Alcala, 160', 'ALCALA, 160', 'Avda. de América, 2',
+                'Avenida America, 2, 1ºA', 'Calle del Talco', 'Calle Talco', 'Calle Talco', None,
+            ],
+            'street_number': [None, None, None, None, None, None, None, None, None],
+            'subtitle': [
+                'Goya, Madrid', 'Goya, Madrid', 'Goya, Madrid', 'Prosperidad, Madrid', 'Prosperidad, Madrid',
+                'San Andrés, Madrid', 'San Andrés, Madrid', 'Hortaleza, Madrid', 'Goya, Madrid',
+            ],
+        })
+        codigos, unicos = agrupar_edificios(df)
+        self.assertEqual(codigos.tolist(), [0, 0, 0, 1, 1, 2, 2, 3, -1])
+        # Sin número, la misma calle en otro barrio es otro edificio
+        self.assertEqual(unicos['clave'].tolist(), [
+            'calle alcala|160|', 'avenida america|2|', 'calle talco||san andres', 'calle talco||hortaleza',
+        ])
+        self.assertEqual(unicos['filas'].tolist(), [3, 2, 2, 1])
+        self.assertEqual(unicos['consulta'].iloc[1], 'avenida de america, 2, prosperidad, madrid')
+
+    def test_street_name_y_street_number_tienen_prioridad(self):
+        df = pd.DataFrame({
+            'raw_address': ['Calle Peña de la Miel, Madrid'],
+            'street_name': ['Calle Peña de la Miel, Madrid'],
+            'street_number': ['7'],
+        })
+        _, unicos = agrupar_edificios(df)
+        self.assertEqual(unicos['clave'].tolist(), ['calle pena miel|7|'])
+
+
+class NominatimFalso(BaseHTTPRequestHandler):
+    """
+    Stub de /search: 'desconocida' no tiene resultado y 'saturada' responde 503 la primera vez.
+    /caido responde siempre 503. /malformado responde 200 con un cuerpo que no es JSON ('talco')
+    o sin lat/lon ('saturada').
+    """
+
+    peticiones = Counter()
+
+    def do_GET(self):
+        consulta = parse_qs(urlparse(self.path).query)['q'][0]
+        self.peticiones[consulta] += 1
+        if self.path.startswith('/caido') or ('saturada' in consulta and self.peticiones[consulta] == 1):
+            self.send_response(503)
+            self.end_headers()
+            return
+        datos = [] if 'desconocida' in consulta else [{'lat': '40.3456', 'lon': '-3.7012'}]
+        cuerpo = json.dumps(datos).encode()
+        if self.path.startswith('/malformado'):
+            if 'talco' in consulta:
+                cuerpo = b'<html>Service Unavailable</html>'
+            elif 'saturada' in consulta:
+                cuerpo = json.dumps([{'display_name': 'Calle Saturada'}]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class GeocodificarDireccionesTests(SimpleTestCase):
+    """Comando geocodificar_direcciones contra un Nominatim falso"""
+
+    def setUp(self):
+        NominatimFalso.peticiones.clear()
+        servidor = ThreadingHTTPServer(('127.0.0.1', 0), NominatimFalso)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        self.addCleanup(servidor.server_close)
+        self.addCleanup(servidor.shutdown)
+        self.url = f'http://127.0.0.1:{servidor.server_address[1]}/search'
+
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.dir = Path(directorio.name)
+        (self.dir / 'direcciones.csv').write_text(CSV, encoding='utf-8')
+
+    def geocodificar(self, **opciones):
+        salida = StringIO()
+        opciones = {'url': self.url, 'lote': 2, **opciones}
+        call_command(
+            'geocodificar_direcciones', entrada=str(self.dir / 'direcciones.csv'),
+            salida=str(self.dir / 'geocodificadas.csv'), cache=str(self.dir / 'cache.sqlite3'),
+            stdout=salida, **opciones,
+        )
+        return salida.getvalue()
+
+    def test_geocodifica_con_reintentos_y_cache(self):
+        salida = self.geocodificar()
+        self.assertIn('4 direcciones en 3 edificios: 1 consultas ahorradas', salida)
+        self.assertIn('3 edificios: 0 en caché, 2 encontradas, 1 sin resultado, 0 con error', salida)
+        # Las dos variantes de Calle del Talco 68 se consultan una sola vez
+        self.assertEqual(sum(NominatimFalso.peticiones.values()), 4)
+
+        df = pd.read_csv(self.dir / 'geocodificadas.csv')
+        self.assertEqual(df['latitude'].notna().tolist(), [True, True, False, True, False])
+        self.assertEqual(df['longitude'].iloc[0], -3.7012)
+
+        # Segunda ejecución: todo sale de la caché
+        NominatimFalso.peticiones.clear()
+        self.assertIn('3 en caché', self.geocodificar())
+        self.assertEqual(sum(NominatimFalso.peticiones.values()), 0)
+
+    def test_reintentar_sin_resultado(self):
+        self.geocodificar()
+        NominatimFalso.peticiones.clear()
+        self.geocodificar(reintentar_sin_resultado=True)
+        self.assertEqual(list(NominatimFalso.peticiones), ['calle desconocida, san andres, madrid'])
+
+    def test_errores_no_se_guardan_en_cache(self):
+        salida = self.geocodificar(url=self.url.replace('/search', '/caido'), reintentos=1)
+        self.assertIn('3 con error', salida)
+        cache = CacheGeocodificacion(self.dir / 'cache.sqlite3')
+        self.addCleanup(cache.cerrar)
+        self.assertEqual(cache.obtener([clave_geocodificacion('calle del talco, 68, san andres, madrid')]), {})
+
+    def test_respuestas_mal_formadas_cuentan_como_error(self):
+        # Un 200 sin JSON o sin coordenadas no aborta el lote: el resto se guarda en la caché
+        salida = self.geocodificar(url=self.url.replace('/search', '/malformado'))
+        self.assertIn('0 encontradas, 1 sin resultado, 2 con error', salida)
+        cache = CacheGeocodificacion(self.dir / 'cache.sqlite3')
+        self.addCleanup(cache.cerrar)
+        talco = clave_geocodificacion('calle del talco, 68, san andres, madrid')
+        desconocida = clave_geocodificacion('calle desconocida, san andres, madrid')
+        self.assertEqual(cache.obtener([talco, desconocida]), {desconocida: (None, None)})
@@ -0,0 +1,135 @@
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from src.models.datasets import DatasetVersion
+from src.models.houses import House
+from src.services.heatmap import piramide
+from src.utils.addresses import clave_direccion
+from src.utils.heatmap import PiramideRejilla, colorear, filas_rejilla, png
+from src.utils.importer import importar_viviendas
+from src.utils.tiles import teselas
+from tests.utils import viviendas
+
+
+def viviendas_rejilla(n=3000):
+    # Al sur de 40,44: la vivienda nueva de las pruebas de actualización cae en celdas vacías
+    df = viviendas(
+        n, 'id', 'buy_price', 'sq_mt_built', 'rent_price', semilla=2,
+        latitude=lambda rng, n: rng.uniform(40.30, 40.44, n), longitude=lambda rng, n: rng.uniform(-3.80, -3.60, n),
+    )
+    df.loc[::7, 'rent_price'] = np.nan
+    return df
+
+
+class PiramideRejillaTests(SimpleTestCase):
+    """Pirámide de rejillas: estadísticas por celda, actualización incremental y raster"""
+
+    def setUp(self):
+        self.df = viviendas_rejilla()
+        self.piramide = PiramideRejilla(filas_rejilla(self.df))
+
+    def test_igual_que_groupby(self):
+        filas = filas_rejilla(self.df)
+        celdas = filas['codigo'].to_numpy() >> np.uint64(2 * (20 - 14))
+        esperado = filas.groupby(celdas)[['buy_price', 'price_m2', 'rent_price']].agg(['mean', 'median'])
+        tabla = self.piramide.niveles[14]
+        np.testing.assert_array_equal(tabla.index.to_numpy(), esperado.index.to_numpy())
+        np.testing.assert_allclose(tabla['rent_price_median'], esperado[('rent_price', 'median')])
+        np.testing.assert_allclose(tabla['price_m2_mean'], esperado[('price_m2', 'mean')])
+        self.assertEqual(tabla['count'].sum(), len(self.df))
+
+    def test_actualizacion_incremental_igual_que_reconstruir(self):
+        modificadas = self.df.iloc[:-50].sample(100, random_state=0).assign(buy_price=lambda d: d['buy_price'] * 2)
+        nueva = self.df.iloc[:1].assign(id=99999, latitude=40.47, longitude=-3.61)
+        eliminadas = self.df['id'].iloc[-50:].tolist()
+        self.piramide.actualizar(eliminadas, filas_rejilla(pd.concat([modificadas, nueva])))
+
+        final = self.df.set_index('id').drop(eliminadas)
+        final.loc[modificadas['id'], 'buy_price'] = modificadas.set_index('id')['buy_price']
+        final = pd.concat([final.reset_index(), nueva])
+        reconstruida = PiramideRejilla(filas_rejilla(final))
+        for nivel, tabla in reconstruida.niveles.items():
+            pd.testing.assert_frame_equal(self.piramide.niveles[nivel], tabla, check_dtype=False)
+
+    def test_rejilla_de_una_tesela(self):
+        fila = self.df.iloc[0]
+        x, y = teselas([fila['latitude']], [fila['longitude']], 10)
+        valores = self.piramide.rejilla(10, int(x[0]), int(y[0]), 'count', detalle=4)
+        self.assertEqual(valores.shape, (16, 16))
+        cx, cy = teselas([fila['latitude']], [fila['longitude']], 14)
+        self.assertGreaterEqual(valores[cy[0] - y[0] * 16, cx[0] - x[0] * 16], 1)
+        self.assertEqual(np.nansum(valores), len(self.df))
+
+    def test_png(self):
+        valores = np.array([[1.0, np.nan], [2.0, 3.0]])
+        imagen = png(colorear(valores, 1, 3), escala=2)
+        self.assertTrue(imagen.startswith(b'\x89PNG\r\n\x1a\n'))
+        self.assertEqual(struct.unpack('>II', imagen[16:24]), (4, 4))
+        longitud = struct.unpack('>I', imagen[33:37])[0]
+        pixeles = zlib.decompress(imagen[41:41 + longitud])
+        self.assertEqual(len(pixeles), 4 * (1 + 4 * 4))
+        # La celda sin datos es transparente
+        self.assertEqual(pixeles[1 + 2 * 4 + 3], 0)
+
+
+class HeatmapAPITests(TestCase):
+    """Endpoint /api/heatmap/ y actualización tras una importación"""
+
+    @classmethod
+    def setUpTestData(cls):
+        House.objects.bulk_create([
+            House(
+                latitude=fila.latitude, longitude=fila.longitude, buy_price=fila.buy_price,
+                sq_mt_built=fila.sq_mt_built, rent_price=None if np.isnan(fila.rent_price) else fila.rent_price,
+                street_name=f'Calle {i}', address_key=clave_direccion(f'Calle {i}', None, None),
+            )
+            for i, fila in enumerate(viviendas_rejilla(300).itertuples())
+        ])
+
+    def test_png_y_json(self):
+        respuesta = self.client.get('/api/heatmap/9/250/193.png')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'image/png')
+        datos = self.client.get('/api/heatmap/9/250/193/', {'metric': 'count', 'detail': 2}).json()
+        self.assertEqual((datos['level'], datos['size']), (11, 4))
+        self.assertEqual(sum(v or 0 for fila in datos['values'] for v in fila), 300)
+
+    def test_parametros_no_validos(self):
+        self.assertEqual(self.client.get('/api/heatmap/9/250/193/', {'metric': 'otra'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/heatmap/9/250/193/', {'detail': 9}).status_code, 400)
+        self.assertEqual(self.client.get('/api/heatmap/2/9/9/').status_code, 400)
+        # Por debajo del nivel más grueso no se devuelve una rejilla mayor que la pedida
+        self.assertEqual(self.client.get('/api/heatmap/0/0/0/', {'detail': 2}).status_code, 400)
+        datos = self.client.get('/api/heatmap/3/3/3/', {'metric': 'count', 'detail': 7}).json()
+        self.assertEqual((datos['level'], datos['size']), (10, 128))
+
+    def test_se_actualiza_con_la_version_del_dataset(self):
+        antes = piramide().niveles[10]['count'].sum()
+        casa = House.objects.first()
+        House.objects.filter(id=casa.id).delete()
+        DatasetVersion.objects.create(
+            numero=DatasetVersion.actual() + 1, fichero='test.csv', huella='x',
+            cambios={'nuevas': [], 'modificadas': [], 'eliminadas': [casa.id]},
+        )
+        self.assertEqual(piramide().niveles[10]['count'].sum(), antes - 1)
+
+    def test_del_csv_a_house_se_reconstruye(self):
+        # Las filas del CSV tienen sus propios ids: no se pueden actualizar con los de House
+        House.objects.all().delete()
+        lineas = (Path(settings.DATA_PATH) / 'unified_houses_madrid.csv').read_text(encoding='utf-8').splitlines()
+        with tempfile.TemporaryDirectory() as directorio, override_settings(DATA_PATH=directorio):
+            ruta = Path(directorio) / 'unified_houses_madrid.csv'
+            ruta.write_text('\n'.join(lineas[:201]) + '\n', encoding='utf-8')
+            self.assertEqual(piramide().metadatos['origen'], 'csv')
+            importar_viviendas(ruta)
+            rejillas = piramide()
+        self.assertEqual(rejillas.metadatos['origen'], 'house')
+        self.assertEqual(len(rejillas.filas), House.objects.count())
+        self.assertEqual(rejillas.niveles[10]['count'].sum(), House.objects.count())
@@ -0,0 +1,96 @@
+from django.db import connection
+from django.test import TestCase
+
+from src.models.houses import CAMPOS_LISTADO, House
+from src.utils.addresses import clave_direccion
+
+
+class HouseQueryTests(TestCase):
+    """Listado de propiedades servido desde la tabla House"""
+
+    @classmethod
+    def setUpTestData(cls):
+        House.objects.bulk_create([
+            House(
+                latitude=40.40 + i / 1000,
+                longitude=-3.70 - i / 1000,
+                district=['Centro', 'Retiro', 'Salamanca'][i % 3],
+                neighborhood=f'Barrio {i % 7}',
+                buy_price=100000 + i * 10000,
+                rent_price=800 + i * 10,
+                sq_mt_built=60 + i,
+                street_name=f'Calle {i}',
+                address_key=clave_direccion(f'Calle {i}', None, None),
+            )
+            for i in range(60)
+        ])
+
+    def plan(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Con tan pocas filas Postgres prefiere un seq scan; se desactiva para ver el índice elegido
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+        return queryset.explain()
+
+    def test_filtro_por_precio_usa_indice(self):
+        plan = self.plan(House.objects.filtrar_listado(min_price=300000, max_price=500000).values('id'))
+        self.assertIn('house_buy_price_idx', plan)
+
+    def test_filtro_por_distrito_y_precio_usa_indice_compuesto(self):
+        plan = self.plan(House.objects.filtrar_listado(min_price=200000, district='Retiro').values('id'))
+        self.assertIn('house_district_price_idx', plan)
+
+    def test_filtro_por_barrio_usa_indice(self):
+        plan = self.plan(House.objects.filter(neighborhood='Barrio 3').values('id'))
+        self.assertIn('house_neigh_price_idx', plan)
+
+    def test_filtro_por_alquiler_usa_indice(self):
+        plan = self.plan(House.objects.filter(rent_price__lte=1000).values('id'))
+        self.assertIn('house_rent_price_idx', plan)
+
+    def test_filtro_por_coordenadas_usa_indice(self):
+        plan = self.plan(House.objects.filter(latitude__range=(40.41, 40.42), longitude__lte=-3.70).values('id'))
+        self.assertIn('house_lat_lon_idx', plan)
+
+    def test_api_lee_de_la_base_de_datos(self):
+        response = self.client.get('/api/properties/', {'district': 'Retiro', 'min_price': 300000, 'limit': 5})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 5)
+        for propiedad in data['properties']:
+            self.assertEqual(propiedad['district'], 'Retiro')
+            self.assertGreaterEqual(propiedad['buy_price'], 300000)
+
+    def test_listado_es_una_sola_consulta(self):
+        with self.assertNumQueries(1):
+            House.objects.filtrar_listado(district='Centro').listado(10)
+
+    def test_etag_cambia_al_modificar_la_tabla(self):
+        etag = self.client.get('/api/properties/', {'limit': 5})['ETag']
+        House.objects.create(latitude=40.5, longitude=-3.6, district='Centro', buy_price=999999)
+        response = self.client.get('/api/properties/', {'limit': 5}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ListadoDesdeCSVTests(TestCase):
+    """Con la tabla House vacía el listado sale del CSV con los mismos campos y orden"""
+
+    def listado(self, **parametros):
+        response = self.client.get('/api/properties/', {'limit': 20, **parametros})
+        self.assertEqual(response.status_code, 200)
+        properties = response.json()['properties']
+        self.assertEqual(len(properties), 20)
+        for propiedad in properties:
+            self.assertEqual(list(propiedad), list(CAMPOS_LISTADO))
+        ids = [propiedad['id'] for propiedad in properties]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        return properties
+
+    def test_mismos_campos_que_house(self):
+        self.listado()
+        self.listado(has_lift='1')
+
+    def test_filtro_por_distrito(self):
+        # district es texto, como en House
+        self.assertEqual({propiedad['district'] for propiedad in self.listado(district='4')}, {'4'})
@@ -0,0 +1,287 @@
+import tempfile
+from importlib import import_module
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+
+from src.models import DatasetVersion, House, QuarantinedHouse
+from src.signals import dataset_actualizado
+from src.utils.addresses import clave_direccion
+
+CSV = """id,latitude,longitude,address,street_name,street_number,portal,buy_price,n_rooms,built_year,has_lift,is_exterior,parking_price,floor
+1,40.41,-3.70,"Calle A, 1",Calle A,1,,250000,3,1990.0,True,False,15000.5,2
+2,40.42,-3.71,"Calle B, 2",Calle B,2,,300000,2,,False,True,,bajo
+3,40.41,-3.70,"Calle A, 1",Calle A,1,,260000,3,1990.0,True,False,,2
+4,,,"Sin coordenadas",Calle C,3,,100000,1,,False,False,,1
+5,40.43,-3.72,"Calle D",Calle D,,,410000,4.0,2005.0,true,1,,3
+"""
+
+
+class ImportarViviendasTests(TestCase):
+    """Comando importar_viviendas"""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = Path(directorio.name) / 'viviendas.csv'
+        self.ruta.write_text(CSV, encoding='utf-8')
+
+    def importar(self, **opciones):
+        salida = StringIO()
+        call_command('importar_viviendas', csv=str(self.ruta), stdout=salida, **opciones)
+        return salida.getvalue()
+
+    def test_convierte_tipos_y_deduplica(self):
+        salida = self.importar(chunk_size=2)
+        self.assertEqual(House.objects.count(), 3)
+        self.assertIn('filas/s', salida)
+
+        casa = House.objects.get(street_name='Calle A')
+        self.assertEqual(casa.buy_price, 250000)
+        self.assertEqual(casa.n_rooms, 3)
+        self.assertEqual(casa.built_year, 1990)
+        self.assertTrue(casa.has_lift)
+        self.assertFalse(casa.is_exterior)
+        self.assertEqual(float(casa.parking_price), 15000.5)
+
+        casa = House.objects.get(street_name='Calle D')
+        self.assertEqual(casa.n_rooms, 4)
+        self.assertTrue(casa.has_lift)
+        self.assertTrue(casa.is_exterior)
+        self.assertIsNone(casa.street_number)
+        self.assertIsNone(House.objects.get(street_name='Calle B').built_year)
+
+    def test_es_idempotente(self):
+        self.importar()
+        modificada = House.objects.get(street_name='Calle A').updated_at
+        salida = self.importar()
+        self.assertEqual(House.objects.count(), 3)
+        self.assertIn('✅ 0 viviendas nuevas o actualizadas', salida)
+        self.assertEqual(House.objects.get(street_name='Calle A').updated_at, modificada)
+
+    def test_escribe_una_sentencia_por_lote(self):
+        # SQLite: un executemany por lote (+ SAVEPOINT / RELEASE)
+        # PostgreSQL: CREATE TEMP TABLE, COPY (no pasa por el cursor de Django), merge y DROP
+        # Más la lectura de las claves existentes, la cuarentena y el registro de la versión (4 consultas),
+        # todo dentro de una transacción (SAVEPOINT / RELEASE dentro del TestCase)
+        esperadas = 5 + 7 if connection.vendor == 'postgresql' else 3 + 7
+        with self.assertNumQueries(esperadas):
+            self.importar(batch_size=1000)
+
+    def test_informa_del_metodo_de_escritura(self):
+        metodo = 'copy' if connection.vendor == 'postgresql' else 'executemany'
+        self.assertIn(f'vía {metodo}', self.importar())
+
+    def test_separa_los_campos_empaquetados(self):
+        lineas = CSV.splitlines()
+        barrio = '"Neighborhood 135: San Cristóbal (1308.89 €/m2) - District 21: Villaverde"'
+        csv = [lineas[0] + ',neighborhood_id,house_type_id']
+        csv += [linea + f',{barrio},HouseType 1: Pisos' for linea in lineas[1:]]
+        self.ruta.write_text('\n'.join(csv) + '\n', encoding='utf-8')
+        self.importar()
+
+        casa = House.objects.get(street_name='Calle A')
+        self.assertEqual((casa.neighborhood, casa.neighborhood_name), ('135', 'San Cristóbal'))
+        self.assertEqual((casa.district, casa.district_name), ('21', 'Villaverde'))
+        self.assertEqual((casa.house_type, casa.house_type_name), ('1', 'Pisos'))
+        self.assertEqual(casa.neighborhood_price_m2, 1308.89)
+
+    def test_viviendas_sin_calle_no_se_funden(self):
+        lineas = CSV.splitlines()
+        csv = [*lineas, '6,40.44,-3.73,"Barrio X, Madrid",,,,200000,2,,False,False,,1',
+               '7,40.45,-3.74,"Barrio Y, Madrid",,,,210000,3,,False,False,,2']
+        self.ruta.write_text('\n'.join(csv) + '\n', encoding='utf-8')
+        self.importar()
+        sin_calle = House.objects.filter(street_name__isnull=True)
+        self.assertEqual(sorted(sin_calle.values_list('address_key', flat=True)), ['sin-calle#6', 'sin-calle#7'])
+        self.assertIn('✅ 0 viviendas nuevas o actualizadas', self.importar())
+        self.assertEqual(House.objects.count(), 5)
+
+    def test_medir_escritura_no_guarda_nada(self):
+        self.importar()
+        salida = StringIO()
+        call_command('medir_escritura', csv=str(self.ruta), repeticiones=2, stdout=salida)
+        # 3 filas válidas por copia, cada copia con sus propias direcciones
+        self.assertIn('Escritura de 6 filas', salida.getvalue())
+        self.assertIn('executemany: 6 filas', salida.getvalue())
+        self.assertEqual(House.objects.count(), 3)
+        self.assertEqual(QuarantinedHouse.objects.count(), 1)
+
+    def test_upsert_actualiza_precios_y_caracteristicas(self):
+        self.importar()
+        self.ruta.write_text(
+            CSV.replace('"Calle A, 1",Calle A,1,,250000,3,1990.0,True', '"Calle A, 1",Calle A,1,,240000,3,1990.0,False'),
+            encoding='utf-8',
+        )
+        salida = self.importar()
+        self.assertIn('✅ 1 viviendas nuevas o actualizadas', salida)
+        casa = House.objects.get(street_name='Calle A')
+        self.assertEqual(casa.buy_price, 240000)
+        self.assertFalse(casa.has_lift)
+        self.assertEqual(House.objects.count(), 3)
+
+
+class ImportacionIncrementalTests(TestCase):
+    """Clasificación por hash de contenido, versiones del dataset y conjunto de cambios"""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = Path(directorio.name) / 'viviendas.csv'
+        self.ruta.write_text(CSV, encoding='utf-8')
+        self.recibidos = []
+        receptor = lambda sender, version, cambios, **kwargs: self.recibidos.append(cambios)
+        dataset_actualizado.connect(receptor, weak=False, dispatch_uid='test_importer')
+        self.addCleanup(dataset_actualizado.disconnect, dispatch_uid='test_importer')
+
+    def importar(self, csv=None, **opciones):
+        if csv is not None:
+            self.ruta.write_text(csv, encoding='utf-8')
+        call_command('importar_viviendas', csv=str(self.ruta), stdout=StringIO(), **opciones)
+
+    def test_primera_carga_crea_version_con_las_altas(self):
+        self.importar()
+        version = DatasetVersion.objects.get()
+        self.assertEqual(version.numero, 1)
+        self.assertEqual(version.nuevas, 3)
+        self.assertEqual(sorted(version.cambios['nuevas']), sorted(House.objects.values_list('id', flat=True)))
+        self.assertEqual(self.recibidos, [version.cambios])
+
+    def test_reimportar_sin_cambios_solo_lee(self):
+        self.importar()
+        # Lectura de claves y hashes, cuarentena (ya estaba: se ignora) y número de versión vigente,
+        # más el SAVEPOINT / RELEASE de la transacción
+        with self.assertNumQueries(5):
+            self.importar()
+        self.assertEqual(DatasetVersion.actual(), 1)
+        self.assertEqual(len(self.recibidos), 1)
+        self.assertEqual(QuarantinedHouse.objects.count(), 1)
+
+    def test_clasifica_modificadas_y_eliminadas(self):
+        self.importar()
+        ids = dict(House.objects.values_list('street_name', 'id'))
+        csv = CSV.replace('Calle B,2,,300000', 'Calle B,2,,310000')
+        csv = '\n'.join(linea for linea in csv.splitlines() if 'Calle D' not in linea) + '\n'
+        self.importar(csv)
+
+        version = DatasetVersion.objects.get(numero=2)
+        self.assertEqual((version.nuevas, version.modificadas, version.sin_cambios, version.eliminadas), (0, 1, 1, 1))
+        self.assertEqual(version.cambios, {'nuevas': [], 'modificadas': [ids['Calle B']], 'eliminadas': [ids['Calle D']]})
+        self.assertEqual(House.objects.get(id=ids['Calle B']).buy_price, 310000)
+        self.assertFalse(House.objects.filter(id=ids['Calle D']).exists())
+
+    def test_conservar_ausentes(self):
+        self.importar()
+        self.importar(CSV.splitlines()[0] + '\n' + CSV.splitlines()[1] + '\n', conservar_ausentes=True)
+        self.assertEqual(House.objects.count(), 3)
+        self.assertEqual(DatasetVersion.actual(), 1)
+
+    def test_un_fallo_deshace_toda_la_importacion(self):
+        self.importar()
+        ids = dict(House.objects.values_list('street_name', 'id'))
+        csv = CSV.replace('Calle B,2,,300000', 'Calle B,2,,310000')
+        csv = '\n'.join(linea for linea in csv.splitlines() if 'Calle D' not in linea) + '\n'
+        with mock.patch('src.utils.importer.registrar_version', side_effect=IntegrityError), \
+                self.assertRaises(IntegrityError):
+            self.importar(csv)
+        # Ni la modificación ni la baja quedan escritas sin su versión, y no se avisa a nadie
+        self.assertEqual(House.objects.get(id=ids['Calle B']).buy_price, 300000)
+        self.assertTrue(House.objects.filter(id=ids['Calle D']).exists())
+        self.assertEqual(DatasetVersion.actual(), 1)
+        self.assertEqual(len(self.recibidos), 1)
+
+    def test_un_receptor_que_falla_no_detiene_a_los_demas(self):
+        def falla(sender, **kwargs):
+            raise RuntimeError('precálculo roto')
+        # El que falla va antes que el receptor del test, que debe ejecutarse igualmente
+        dataset_actualizado.disconnect(dispatch_uid='test_importer')
+        dataset_actualizado.connect(falla, weak=False, dispatch_uid='test_importer_falla')
+        self.addCleanup(dataset_actualizado.disconnect, dispatch_uid='test_importer_falla')
+        receptor = lambda sender, version, cambios, **kwargs: self.recibidos.append(cambios)
+        dataset_actualizado.connect(receptor, weak=False, dispatch_uid='test_importer')
+        with self.assertLogs('django.dispatch', level='ERROR') as log:
+            salida = StringIO()
+            call_command('importar_viviendas', csv=str(self.ruta), stdout=salida)
+        self.assertEqual(len(self.recibidos), 1)
+        self.assertEqual(DatasetVersion.actual(), 1)
+        self.assertIn('precálculo roto', log.output[0])
+        self.assertIn('falla', salida.getvalue())
+
+    def test_cambios_desde_acumula_versiones(self):
+        self.importar()
+        ids = dict(House.objects.values_list('street_name', 'id'))
+        self.importar(CSV.replace('Calle B,2,,300000', 'Calle B,2,,310000'))
+        self.importar(CSV.replace('Calle B,2,,300000', 'Calle B,2,,320000').replace('Calle A,1,,250000', 'Calle A,1,,1'))
+        self.assertEqual(
+            DatasetVersion.cambios_desde(1),
+            {'nuevas': [], 'modificadas': sorted([ids['Calle A'], ids['Calle B']]), 'eliminadas': []},
+        )
+
+
+class AddressKeyTests(TestCase):
+    """Clave única de dirección"""
+
+    def test_variantes_de_la_misma_direccion_comparten_clave(self):
+        casa = House.objects.create(latitude=40.4, longitude=-3.7, street_name='Calle de Ávila ', street_number='3')
+        self.assertEqual(casa.address_key, 'calle de avila|3|')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            House.objects.create(latitude=40.4, longitude=-3.7, street_name='calle  de AVILA', street_number='3')
+
+    def test_viviendas_sin_calle_tienen_clave_propia(self):
+        primera = House.objects.create(latitude=40.4, longitude=-3.7, street_number='3')
+        segunda = House.objects.create(latitude=40.4, longitude=-3.7, street_number='3')
+        self.assertNotEqual(primera.address_key, segunda.address_key)
+        self.assertTrue(primera.address_key.startswith('sin-calle#'))
+        # Guardarla de nuevo no cambia la clave con la que la encuentra el importador
+        clave = primera.address_key
+        primera.buy_price = 1
+        primera.save()
+        self.assertEqual(House.objects.get(id=primera.id).address_key, clave)
+
+    def test_migracion_no_borra_duplicadas_ni_comparte_clave_sin_calle(self):
+        migracion = import_module('src.migrations.0004_house_address_key')
+        direcciones = [('Calle de Ávila', '3'), ('calle de avila', '3'), (None, '3'), ('', None)]
+        casas = House.objects.bulk_create([
+            House(latitude=40.4, longitude=-3.7, street_name=calle, street_number=numero, address_key=f'tmp {i}')
+            for i, (calle, numero) in enumerate(direcciones)
+        ])
+        with self.assertLogs('src.migrations.0004_house_address_key', level='WARNING') as log:
+            migracion.rellenar_address_key(apps, None)
+        claves = dict(House.objects.values_list('id', 'address_key'))
+        self.assertEqual(len(claves), 4)
+        self.assertEqual(claves[casas[0].id], clave_direccion('Calle de Ávila', '3', None))
+        self.assertEqual(claves[casas[1].id], f'calle de avila|3|#{casas[1].id}')
+        self.assertEqual(claves[casas[2].id], f'sin-calle#{casas[2].id}')
+        self.assertEqual(claves[casas[3].id], f'sin-calle#{casas[3].id}')
+        self.assertIn(str(casas[1].id), log.output[-1])
+
+
+class CuarentenaImportacionTests(TestCase):
+    """Las filas que incumplen las reglas de validación no se pierden"""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = Path(directorio.name) / 'viviendas.csv'
+        self.ruta.write_text(
+            CSV + '6,41.50,-3.70,"Calle E",Calle E,5,,200000,2,,False,False,,1\n',
+            encoding='utf-8',
+        )
+
+    def test_guarda_las_filas_rechazadas_con_sus_motivos(self):
+        salida = StringIO()
+        call_command('importar_viviendas', csv=str(self.ruta), stdout=salida)
+
+        self.assertEqual(House.objects.count(), 3)
+        motivos = dict(QuarantinedHouse.objects.values_list('datos__street_name', 'motivos'))
+        self.assertEqual(motivos, {'Calle C': 'coordenadas_nulas', 'Calle E': 'fuera_de_madrid'})
+        cuarentena = QuarantinedHouse.objects.get(motivos='fuera_de_madrid')
+        self.assertEqual(cuarentena.origen, 'viviendas.csv')
+        self.assertEqual(cuarentena.datos['buy_price'], 200000)
+        self.assertIn('2 en cuarentena', salida.getvalue())
+        self.assertIn('coordenadas_nulas 1, fuera_de_madrid 1', salida.getvalue())
@@ -0,0 +1,116 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from src.models.houses import House
+from src.utils.addresses import clave_direccion
+from src.utils.location_meta import compilar, versionar
+
+
+def viviendas():
+    return pd.DataFrame({
+        'district': [1, 1, 1, '2', None],
+        'district_name': ['Centro', 'Centro', 'Centro', 'Arganzuela', None],
+        'neighborhood': ['11', '11', None, '21', None],
+        'neighborhood_name': ['Sol', 'Sol', None, 'Acacias', None],
+        'neighborhood_price_m2': [5000, 5200, None, 4000, None],
+        'latitude': [40.41, 40.43, 40.42, 40.40, 40.0],
+        'longitude': [-3.70, -3.72, None, -3.70, -3.0],
+    })
+
+
+class CompilarUbicacionesTests(SimpleTestCase):
+    """Metadatos de distritos y barrios desde una sola agrupación"""
+
+    def test_distritos_y_barrios(self):
+        metadatos = compilar(viviendas())
+        self.assertEqual(metadatos['count'], 5)
+        arganzuela, centro = metadatos['districts']
+        self.assertEqual((arganzuela['name'], centro['name']), ('Arganzuela', 'Centro'))
+        # La vivienda sin barrio cuenta en su distrito; la que no tiene distrito, solo en el total
+        self.assertEqual(centro['count'], 3)
+        self.assertEqual([b['code'] for b in centro['neighborhoods']], ['11'])
+        sol = centro['neighborhoods'][0]
+        self.assertEqual((sol['name'], sol['count'], sol['price_m2']), ('Sol', 2, 5100))
+        self.assertEqual(sol['centroid'], [40.42, -3.71])
+        self.assertEqual(sol['bbox'], [-3.72, 40.41, -3.70, 40.43])
+        # El distrito sale de sus barrios: la vivienda sin longitud no entra en sus coordenadas
+        self.assertEqual(centro['bbox'], [-3.72, 40.41, -3.70, 40.43])
+        self.assertEqual(arganzuela['neighborhoods'][0]['centroid'], [40.40, -3.70])
+
+    def test_coordenadas_robustas(self):
+        # 200 viviendas juntas, una mal geolocalizada dentro de Madrid y otra en Sevilla
+        rng = np.random.default_rng(1)
+        df = pd.DataFrame({
+            'district': '4', 'district_name': 'Salamanca', 'neighborhood': '99', 'neighborhood_name': 'Goya',
+            'neighborhood_price_m2': 5900,
+            'latitude': [*rng.uniform(40.422, 40.428, 200), 40.50, 37.39],
+            'longitude': [*rng.uniform(-3.680, -3.670, 200), -3.89, -6.10],
+        })
+        goya = compilar(df)['districts'][0]['neighborhoods'][0]
+        self.assertEqual(goya['count'], 202)
+        oeste, sur, este, norte = goya['bbox']
+        self.assertTrue(-3.680 <= oeste < este <= -3.670 and 40.422 <= sur < norte <= 40.428, goya['bbox'])
+        self.assertAlmostEqual(goya['centroid'][0], 40.425, delta=0.001)
+        self.assertAlmostEqual(goya['centroid'][1], -3.675, delta=0.001)
+
+    def test_version_estable(self):
+        primera = versionar(compilar(viviendas()))
+        self.assertEqual(primera['version'], versionar(compilar(viviendas().sample(frac=1, random_state=3)))['version'])
+        cambiadas = viviendas().assign(neighborhood_price_m2=[5000, 5400, None, 4000, None])
+        self.assertNotEqual(primera['version'], versionar(compilar(cambiadas))['version'])
+
+
+class UbicacionesAPITests(TestCase):
+    """Endpoint /api/meta/locations/ y comando compilar_ubicaciones"""
+
+    @classmethod
+    def setUpTestData(cls):
+        House.objects.bulk_create([
+            House(
+                latitude=40.41 + i / 100, longitude=-3.70, buy_price=300000, sq_mt_built=60,
+                district='1', district_name='Centro', neighborhood='11', neighborhood_name='Sol',
+                neighborhood_price_m2=5000, street_name=f'Calle {i}',
+                address_key=clave_direccion(f'Calle {i}', None, None),
+            )
+            for i in range(3)
+        ])
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = Path(directorio.name)
+        ajustes = override_settings(DATA_PATH=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        # calcular_etag incluye la versión del CSV
+        (self.directorio / 'unified_houses_madrid.csv').write_text('id\n1\n')
+
+    def test_etag_y_cache_control(self):
+        respuesta = self.client.get('/api/meta/locations/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('max-age=86400', respuesta['Cache-Control'])
+        datos = json.loads(respuesta.content)
+        self.assertEqual(datos['districts'][0]['neighborhoods'][0]['count'], 3)
+        repetida = self.client.get('/api/meta/locations/', HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+
+    def test_comando_y_fichero_compilado(self):
+        salida = StringIO()
+        call_command('compilar_ubicaciones', stdout=salida)
+        ruta = self.directorio / 'meta' / 'locations.json'
+        compilado = json.loads(ruta.read_bytes())
+        self.assertIn(compilado['version'], salida.getvalue())
+        call_command('compilar_ubicaciones', stdout=salida)
+        self.assertIn('sin cambios', salida.getvalue())
+
+        # La API sirve el fichero compilado tal cual
+        ruta.write_text(json.dumps({**compilado, 'version': 'compilado'}))
+        respuesta = self.client.get('/api/meta/locations/')
+        self.assertEqual(json.loads(respuesta.content)['version'], 'compilado')
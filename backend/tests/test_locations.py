@@ -0,0 +1,92 @@
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
+
+from src.models.houses import House
+from src.utils.importer import importar_viviendas
+from src.utils.locations import expandir_campos, leer_viviendas_csv
+
+BARRIO = 'Neighborhood 135: San Cristóbal (1308.89 €/m2) - District 21: Villaverde'
+
+
+class CamposEmpaquetadosTests(SimpleTestCase):
+    """neighborhood_id / house_type_id -> columnas tipadas"""
+
+    def test_separa_codigos_nombres_y_precio(self):
+        df = expandir_campos(pd.DataFrame({
+            'neighborhood_id': [BARRIO, 'Neighborhood 7: Sol (None €/m2) - District 4: Centro', None],
+            'house_type_id': ['HouseType 1: Pisos', ' HouseType 2: Casa o chalet ', None],
+        }))
+        self.assertNotIn('neighborhood_id', df)
+        self.assertNotIn('house_type_id', df)
+        self.assertEqual(df['neighborhood'].tolist()[:2], [135, 7])
+        self.assertEqual(df['neighborhood_name'].tolist()[:2], ['San Cristóbal', 'Sol'])
+        self.assertEqual(df['district'].tolist()[:2], [21, 4])
+        self.assertEqual(df['district_name'].tolist()[:2], ['Villaverde', 'Centro'])
+        self.assertEqual(df['house_type_name'].tolist()[:2], ['Pisos', 'Casa o chalet'])
+        self.assertEqual(df['neighborhood_price_m2'].iloc[0], 1308.89)
+        self.assertTrue(pd.isna(df['neighborhood_price_m2'].iloc[1]))
+        self.assertTrue(df.iloc[2].isna().all())
+        self.assertEqual(str(df['district'].dtype), 'Int64')
+
+    def test_respeta_los_codigos_existentes_y_su_tipo(self):
+        df = expandir_campos(pd.DataFrame({
+            'district': ['21', None], 'neighborhood_id': [BARRIO, BARRIO.replace('District 21', 'District 3')],
+        }))
+        self.assertEqual(df['district'].tolist(), ['21', '3'])
+        self.assertEqual(df['district_name'].tolist(), ['Villaverde', 'Villaverde'])
+
+    def test_columnas_numericas_sin_nulos(self):
+        # read_csv sin dtype lee district como int64; la cadena que no encaja deja un NA
+        df = expandir_campos(pd.DataFrame({
+            'district': [21, 4], 'neighborhood_price_m2': [1300.0, 5000.0], 'neighborhood_id': [BARRIO, 'otra cosa'],
+        }))
+        self.assertEqual(df['district'].tolist(), [21, 4])
+        self.assertEqual(str(df['district'].dtype), 'Int64')
+        self.assertEqual(df['neighborhood_price_m2'].tolist(), [1300.0, 5000.0])
+        self.assertTrue(pd.isna(df['district_name'].iloc[1]))
+
+    def test_sin_columnas_empaquetadas_no_cambia_nada(self):
+        df = pd.DataFrame({'district': [21]})
+        self.assertIs(expandir_campos(df), df)
+
+
+class LecturaCsvTests(TestCase):
+    """leer_viviendas_csv da las mismas columnas y tipos que House"""
+
+    COLUMNAS = [
+        'id', 'latitude', 'buy_price', 'n_rooms', 'has_lift', 'address', 'district', 'district_name',
+        'neighborhood', 'neighborhood_name', 'neighborhood_price_m2', 'house_type', 'house_type_name',
+    ]
+
+    def test_mismos_tipos_que_house(self):
+        lineas = (Path(settings.DATA_PATH) / 'unified_houses_madrid.csv').read_text(encoding='utf-8').splitlines()
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = Path(directorio) / 'unified_houses_madrid.csv'
+            ruta.write_text('\n'.join(lineas[:301]) + '\n', encoding='utf-8')
+            csv = leer_viviendas_csv(ruta, self.COLUMNAS)
+            importar_viviendas(ruta)
+        house = pd.DataFrame.from_records(House.objects.values_list(*self.COLUMNAS), columns=self.COLUMNAS)
+
+        self.assertEqual(csv.columns.tolist(), self.COLUMNAS)
+        sin_id = [columna for columna in self.COLUMNAS if columna != 'id']
+        self.assertEqual(csv.dtypes[sin_id].to_dict(), house.dtypes[sin_id].to_dict())
+        self.assertIsInstance(csv['district'].iloc[0], str)
+        # Las mismas viviendas (el importador descarta direcciones repetidas) con los mismos valores
+        claves = ['latitude', 'buy_price', 'address']
+        comunes = house.merge(csv.drop_duplicates(claves, keep=False), on=claves, suffixes=('', '_csv'))
+        self.assertGreater(len(comunes), 250)
+        for columna in ('district', 'neighborhood_name', 'house_type', 'house_type_name'):
+            self.assertEqual(comunes[columna].tolist(), comunes[f'{columna}_csv'].tolist(), columna)
+
+    def test_columnas_ausentes_salen_vacias(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = Path(directorio) / 'viviendas.csv'
+            ruta.write_text(f'id,district,neighborhood_id\n1,,"{BARRIO}"\n', encoding='utf-8')
+            df = leer_viviendas_csv(ruta, ['id', 'district', 'district_name', 'rent_price'])
+        self.assertEqual(df.to_dict('records')[0]['district'], '21')
+        self.assertEqual(df['district_name'].tolist(), ['Villaverde'])
+        self.assertTrue(df['rent_price'].isna().all())
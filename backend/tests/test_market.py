@@ -0,0 +1,144 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from src.models.datasets import DatasetVersion
+from src.models.houses import House
+from src.services.market import generar_estadisticas
+from src.signals import dataset_actualizado
+from src.utils.addresses import clave_direccion
+from src.utils.market import CuboMercado, filas_mercado, nivel_de, registros
+from tests.utils import viviendas
+
+
+def viviendas_mercado(n=2000):
+    # Tres distritos de tres barrios cada uno
+    df = viviendas(
+        n, 'id', 'buy_price', 'sq_mt_built', 'rent_price', semilla=4,
+        district=lambda rng, n: rng.integers(1, 4, n), barrio=lambda rng, n: rng.integers(0, 3, n),
+        n_rooms=lambda rng, n: rng.integers(1, 5, n).astype(float),
+        house_type=lambda rng, n: rng.choice([1, 2, None], n), house_type_name=None,
+    )
+    df['neighborhood'] = (df['district'] * 10 + df.pop('barrio')).astype(str)
+    df['district'] = df['district'].astype(str)
+    df['district_name'] = 'Distrito ' + df['district']
+    df['neighborhood_name'] = 'Barrio ' + df['neighborhood']
+    df.loc[::7, 'rent_price'] = np.nan
+    df.loc[::11, 'n_rooms'] = np.nan
+    return df
+
+
+class CuboMercadoTests(SimpleTestCase):
+    """Cubo de estadísticas: percentiles por nivel, actualización incremental y consulta"""
+
+    def setUp(self):
+        self.df = viviendas_mercado()
+        self.cubo = CuboMercado(filas_mercado(self.df))
+
+    def test_igual_que_groupby(self):
+        df = self.df.assign(price_m2=self.df['buy_price'] / self.df['sq_mt_built'])
+        esperado = df.groupby(['district', 'n_rooms'])['price_m2'].median()
+        tabla = self.cubo.niveles[('district', 'n_rooms')]
+        self.assertEqual(len(tabla), len(esperado))
+        self.assertAlmostEqual(tabla.loc[('2', '3'), 'price_m2_median'], esperado[('2', 3.0)], delta=0.01)
+        # Las viviendas sin habitaciones cuentan en el total pero no en los niveles por habitaciones
+        self.assertEqual(self.cubo.niveles[()]['count'].iloc[0], len(df))
+        self.assertEqual(tabla['count'].sum(), df['n_rooms'].notna().sum())
+        self.assertEqual(tabla['rent_price_count'].sum(), (df['n_rooms'].notna() & df['rent_price'].notna()).sum())
+
+    def test_actualizacion_incremental_igual_que_reconstruir(self):
+        modificadas = self.df.iloc[:-30].sample(80, random_state=1).assign(buy_price=lambda d: d['buy_price'] * 2)
+        # Una vivienda que cambia de barrio y otra en un barrio nuevo
+        modificadas.iloc[0, modificadas.columns.get_loc('neighborhood')] = '12'
+        nueva = self.df.iloc[:1].assign(id=99999, district='9', neighborhood='91', neighborhood_name='Barrio 91')
+        eliminadas = self.df['id'].iloc[-30:].tolist()
+        self.cubo.actualizar(eliminadas, filas_mercado(pd.concat([modificadas, nueva])))
+
+        final = self.df.set_index('id').drop(eliminadas)
+        final.loc[modificadas['id']] = modificadas.set_index('id')
+        reconstruido = CuboMercado(filas_mercado(pd.concat([final.reset_index(), nueva])))
+        for nivel, tabla in reconstruido.niveles.items():
+            pd.testing.assert_frame_equal(self.cubo.niveles[nivel], tabla, check_dtype=False, check_names=False)
+        self.assertEqual(self.cubo.nombres['neighborhood']['91'], 'Barrio 91')
+
+    def test_consulta_con_filtros_y_nombres(self):
+        tabla = self.cubo.consultar(['neighborhood'], {'district': [2], 'n_rooms': ['2', 3.0]})
+        self.assertEqual(
+            list(tabla.columns[:5]), ['district', 'district_name', 'neighborhood', 'neighborhood_name', 'n_rooms'],
+        )
+        self.assertEqual(set(tabla['district']), {'2'})
+        self.assertEqual(set(tabla['n_rooms']), {'2', '3'})
+        fila = registros(tabla)[0]
+        self.assertEqual(fila['district_name'], 'Distrito 2')
+        self.assertEqual(set(fila['gross_yield']), {'count', 'p25', 'median', 'p75'})
+
+    def test_nivel_de(self):
+        self.assertEqual(nivel_de(['neighborhood', 'n_rooms']), ('district', 'neighborhood', 'n_rooms'))
+        with self.assertRaises(ValueError):
+            nivel_de(['orientation'])
+
+    def test_guardar_y_cargar(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = Path(directorio) / 'market_stats.joblib'
+            self.cubo.metadatos['version'] = 3
+            self.cubo.guardar(ruta)
+            cargado = CuboMercado.cargar(ruta)
+        self.assertEqual(cargado.metadatos, {'version': 3})
+        pd.testing.assert_frame_equal(cargado.consultar(['district']), self.cubo.consultar(['district']))
+
+
+class EstadisticasMercadoAPITests(TestCase):
+    """Endpoint /api/market/stats/ y actualización del cubo guardado tras una importación"""
+
+    @classmethod
+    def setUpTestData(cls):
+        House.objects.bulk_create([
+            House(
+                latitude=40.42, longitude=-3.70, buy_price=100000 * (i + 1), sq_mt_built=50, rent_price=1000,
+                district='1' if i < 4 else '2', district_name='Centro' if i < 4 else 'Arganzuela',
+                neighborhood='11', n_rooms=1 + i % 2, street_name=f'Calle {i}',
+                address_key=clave_direccion(f'Calle {i}', None, None),
+            )
+            for i in range(6)
+        ])
+
+    def test_por_distrito(self):
+        respuesta = self.client.get('/api/market/stats/', {'group_by': 'district'})
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos['count'], 2)
+        centro = datos['stats'][0]
+        self.assertEqual((centro['district'], centro['district_name'], centro['count']), ('1', 'Centro', 4))
+        # 100.000 a 400.000 €: mediana 250.000 y 5.000 €/m²
+        self.assertEqual(centro['buy_price']['median'], 250000)
+        self.assertEqual(centro['price_m2']['median'], 5000)
+        # Rentabilidades 12, 6, 4 y 3 %
+        self.assertEqual(centro['gross_yield']['p75'], 7.5)
+
+    def test_total_y_filtros(self):
+        total = self.client.get('/api/market/stats/').json()
+        self.assertEqual(total['stats'][0]['count'], 6)
+        datos = self.client.get('/api/market/stats/', {'district': '2', 'n_rooms': '2'}).json()
+        self.assertEqual([(f['district'], f['n_rooms'], f['count']) for f in datos['stats']], [('2', '2', 1)])
+
+    def test_dimension_desconocida(self):
+        self.assertEqual(self.client.get('/api/market/stats/', {'group_by': 'orientation'}).status_code, 400)
+
+    def test_cubo_guardado_se_actualiza_tras_importar(self):
+        with tempfile.TemporaryDirectory() as directorio, override_settings(ML_MODELS_PATH=directorio):
+            DatasetVersion.objects.create(numero=1, fichero='test.csv', huella='x', cambios={})
+            _, modo = generar_estadisticas()
+            self.assertEqual(modo, 'completo')
+            casa = House.objects.get(buy_price=100000)
+            House.objects.filter(id=casa.id).update(district='2', district_name='Arganzuela')
+            cambios = {'nuevas': [], 'modificadas': [casa.id], 'eliminadas': []}
+            version = DatasetVersion.objects.create(numero=2, fichero='test.csv', huella='y', cambios=cambios)
+            dataset_actualizado.send(sender=DatasetVersion, version=version, cambios=cambios)
+
+            cubo = CuboMercado.cargar(Path(directorio) / 'market_stats.joblib')
+            self.assertEqual(cubo.metadatos['version'], 2)
+            self.assertEqual(list(cubo.consultar(['district'])['count']), [3, 3])
+            self.assertEqual(generar_estadisticas()[1], 'al día')
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, TestCase
+
+from src.models.houses import House
+from src.utils.addresses import clave_direccion
+from src.utils.reverse_geocoding import GeocodificadorInverso
+
+PUNTOS = pd.DataFrame({
+    'latitude': [40.4170, 40.4175, 40.3445, 40.4300],
+    'longitude': [-3.7040, -3.7030, -3.6894, -3.6800],
+    'district': [4, 4, 21, 15],
+    'district_name': ['Centro', 'Centro', 'Villaverde', 'Salamanca'],
+    'neighborhood': [25, 25, 135, None],
+    'neighborhood_name': ['Sol', 'Sol', 'San Cristóbal', None],
+})
+
+
+class GeocodificadorInversoTests(SimpleTestCase):
+    """Vecino etiquetado más cercano con KD-tree"""
+
+    def setUp(self):
+        self.geocodificador = GeocodificadorInverso(PUNTOS)
+
+    def test_ubica_en_el_vecino_mas_cercano(self):
+        ubicacion = self.geocodificador.ubicar(40.3450, -3.6900)
+        self.assertEqual(
+            {clave: ubicacion[clave] for clave in ('district', 'district_name', 'neighborhood', 'neighborhood_name')},
+            {'district': '21', 'district_name': 'Villaverde', 'neighborhood': '135', 'neighborhood_name': 'San Cristóbal'},
+        )
+        # ~55 m en latitud y ~51 m en longitud
+        self.assertAlmostEqual(ubicacion['distancia_m'], 75, delta=2)
+
+    def test_fuera_de_cobertura(self):
+        self.assertIsNone(self.geocodificador.ubicar(40.90, -3.70))
+
+    def test_por_lotes(self):
+        resultado = self.geocodificador.consultar(
+            np.array([40.4171, 40.4301, 40.90, np.nan]), np.array([-3.7041, -3.6801, -3.70, -3.70]),
+        )
+        self.assertEqual(resultado['district_name'].tolist(), ['Centro', 'Salamanca', None, None])
+        self.assertEqual(resultado['neighborhood'].tolist(), ['25', None, None, None])
+        self.assertTrue(np.isnan(resultado['distancia_m'].iloc[2]))
+
+
+class ReverseGeocodingAPITests(TestCase):
+    """Endpoint /api/geo/reverse/ construido con la tabla House"""
+
+    @classmethod
+    def setUpTestData(cls):
+        House.objects.bulk_create([
+            House(
+                latitude=fila.latitude, longitude=fila.longitude, district=str(fila.district),
+                district_name=fila.district_name, neighborhood_name=fila.neighborhood_name,
+                neighborhood=None if pd.isna(fila.neighborhood) else str(int(fila.neighborhood)),
+                street_name=f'Calle {i}', address_key=clave_direccion(f'Calle {i}', None, None),
+            )
+            for i, fila in enumerate(PUNTOS.itertuples())
+        ])
+
+    def test_get(self):
+        respuesta = self.client.get('/api/geo/reverse/', {'lat': 40.4172, 'lon': -3.7036})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['neighborhood_name'], 'Sol')
+        self.assertEqual(self.client.get('/api/geo/reverse/', {'lat': 41.5, 'lon': -3.7}).status_code, 404)
+        self.assertEqual(self.client.get('/api/geo/reverse/', {'lat': 'x'}).status_code, 400)
+
+    def test_post_por_lotes(self):
+        respuesta = self.client.post(
+            '/api/geo/reverse/', {'puntos': [[40.3446, -3.6895], [41.5, -3.7]]}, content_type='application/json',
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        resultados = respuesta.json()['resultados']
+        self.assertEqual(resultados[0]['district'], '21')
+        self.assertIsNone(resultados[1])
+
+    def test_se_reconstruye_cuando_cambia_house(self):
+        self.assertEqual(self.client.get('/api/geo/reverse/', {'lat': 40.60, 'lon': -3.70}).status_code, 404)
+        House.objects.create(
+            latitude=40.60, longitude=-3.70, district='8', district_name='Fuencarral',
+            street_name='Calle Nueva', address_key=clave_direccion('Calle Nueva', None, None),
+        )
+        respuesta = self.client.get('/api/geo/reverse/', {'lat': 40.60, 'lon': -3.70})
+        self.assertEqual(respuesta.json()['district_name'], 'Fuencarral')
@@ -0,0 +1,120 @@
+import pandas as pd
+from django.test import SimpleTestCase, TestCase
+
+from src.models.houses import House
+from src.utils.addresses import clave_direccion
+from src.utils.search import IndiceTexto, tokenizar
+
+
+def documentos():
+    return pd.DataFrame({
+        'id': [1, 2, 3, 4, 5],
+        'street_name': ['Calle de Serrano', 'Calle Serradilla', 'Avenida de América', 'Calle de Alcalá', None],
+        'address': [
+            'Calle de Serrano, 10, Salamanca', 'Calle Serradilla, 1, Águilas', 'Avda. de América, 25, Prosperidad',
+            'C/ Alcalá, 200, Ventas', 'Piso en Chamberí',
+        ],
+        'title': [
+            'Piso en venta en Serrano', 'Chalet en Serradilla', 'Piso en Avenida de América',
+            'Ático en Alcalá', 'Piso luminoso con terraza en Chamberí',
+        ],
+    })
+
+
+class TokenizarTests(SimpleTestCase):
+    """Normalización de la consulta y de los documentos"""
+
+    def test_minusculas_acentos_y_articulos(self):
+        self.assertEqual(tokenizar('Ático en la Calle de ALCALÁ'), ['atico', 'calle', 'alcala'])
+
+    def test_abreviaturas_de_via(self):
+        self.assertEqual(tokenizar('C/ Alcalá'), ['calle', 'alcala'])
+        self.assertEqual(tokenizar('Avda. América'), ['avenida', 'america'])
+        self.assertEqual(tokenizar('Avda. América', expandir=False), ['avda', 'america'])
+
+
+class IndiceTextoTests(SimpleTestCase):
+    """BM25 y autocompletado sobre un índice pequeño"""
+
+    def setUp(self):
+        self.indice = IndiceTexto(documentos())
+
+    def ids(self, posiciones):
+        return [self.indice.columnas['id'][posicion] for posicion in posiciones]
+
+    def test_mejor_el_que_tiene_el_termino_en_mas_campos(self):
+        posiciones, puntuaciones, total = self.indice.buscar('piso chamberi')
+        self.assertEqual(self.ids(posiciones)[0], 5)
+        self.assertEqual(total, 3)
+        self.assertTrue(all(puntuaciones[:-1] >= puntuaciones[1:]))
+
+    def test_abreviatura_en_la_consulta(self):
+        posiciones, _, _ = self.indice.buscar('avda america')
+        self.assertEqual(self.ids(posiciones)[0], 3)
+
+    def test_paginacion(self):
+        todas, _, total = self.indice.buscar('piso')
+        segunda, _, _ = self.indice.buscar('piso', limite=1, desplazamiento=1)
+        self.assertEqual(total, 3)
+        self.assertEqual(list(segunda), [todas[1]])
+
+    def test_autocompletado_por_prefijo(self):
+        posiciones, _, total = self.indice.autocompletar('calle serr')
+        self.assertEqual(sorted(self.ids(posiciones)), [1, 2])
+        self.assertEqual(total, 2)
+        posiciones, _, _ = self.indice.autocompletar('calle serrad')
+        self.assertEqual(self.ids(posiciones), [2])
+
+    def test_autocompletado_exige_todos_los_tokens(self):
+        posiciones, _, _ = self.indice.autocompletar('atico alc')
+        self.assertEqual(self.ids(posiciones), [4])
+        self.assertEqual(len(self.indice.autocompletar('atico serr')[0]), 0)
+        self.assertEqual(len(self.indice.autocompletar('zzz')[0]), 0)
+
+    def test_prefijo_de_una_letra_no_se_expande(self):
+        # "c" es lo que se lleva escrito de "chalet"/"chamberi", no la abreviatura de calle
+        posiciones, _, _ = self.indice.autocompletar('piso c')
+        self.assertIn(5, self.ids(posiciones))
+
+
+class BusquedaAPITests(TestCase):
+    """Endpoints /api/search/ y /api/search/autocomplete/ sobre la tabla House"""
+
+    @classmethod
+    def setUpTestData(cls):
+        House.objects.bulk_create([
+            House(
+                latitude=40.42, longitude=-3.70, buy_price=300000 + i, street_name=calle, title=titulo,
+                address=f'{calle}, {i}', address_key=clave_direccion(calle, str(i), None),
+            )
+            for i, (calle, titulo) in enumerate((
+                ('Calle de Serrano', 'Piso en venta en Serrano'),
+                ('Calle Serradilla', 'Chalet en Serradilla'),
+                ('Calle de Alcalá', 'Ático con terraza'),
+            ))
+        ])
+
+    def test_busqueda(self):
+        respuesta = self.client.get('/api/search/', {'q': 'atico terraza'})
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos['count'], 1)
+        self.assertEqual(datos['results'][0]['title'], 'Ático con terraza')
+        self.assertGreater(datos['results'][0]['score'], 0)
+
+    def test_autocompletado(self):
+        datos = self.client.get('/api/search/autocomplete/', {'q': 'calle ser', 'limit': 5}).json()
+        self.assertEqual(
+            sorted(sugerencia['address'] for sugerencia in datos['suggestions']),
+            ['Calle Serradilla, 1', 'Calle de Serrano, 0'],
+        )
+
+    def test_parametros_no_validos(self):
+        for ruta, parametros in (
+            ('search/', {}),
+            ('search/', {'q': '  '}),
+            ('search/', {'q': 'piso', 'limit': 'x'}),
+            ('search/', {'q': 'piso', 'offset': -1}),
+            ('search/autocomplete/', {'q': 'piso', 'limit': 500}),
+        ):
+            self.assertEqual(self.client.get(f'/api/{ruta}', parametros).status_code, 400, parametros)
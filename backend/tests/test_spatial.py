@@ -0,0 +1,126 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from src.models.houses import House
+from src.utils.addresses import clave_direccion
+from src.utils.spatial import IndiceEspacial, haversine_m
+
+
+def puntos_aleatorios(n=3000, semilla=5):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        'id': np.arange(n),
+        'latitude': rng.uniform(40.30, 40.55, n),
+        'longitude': rng.uniform(-3.85, -3.55, n),
+    })
+
+
+class IndiceEspacialTests(SimpleTestCase):
+    """Búsquedas del BallTree frente a calcular todas las distancias"""
+
+    def setUp(self):
+        self.puntos = puntos_aleatorios()
+        self.indice = IndiceEspacial(self.puntos)
+        self.distancias = haversine_m(40.42, -3.70, self.puntos['latitude'], self.puntos['longitude'])
+
+    def test_radio(self):
+        posiciones, distancias = self.indice.cercanas(40.42, -3.70, radio=800)
+        self.assertEqual(set(posiciones), set(np.flatnonzero(self.distancias <= 800)))
+        self.assertTrue(np.all(np.diff(distancias) >= 0))
+        np.testing.assert_allclose(distancias, self.distancias[posiciones], rtol=1e-9)
+
+    def test_k_mas_cercanas(self):
+        posiciones, _ = self.indice.cercanas(40.42, -3.70, k=10)
+        self.assertEqual(list(posiciones), list(np.argsort(self.distancias)[:10]))
+
+    def test_k_dentro_del_radio(self):
+        dentro = int((self.distancias <= 800).sum())
+        posiciones, _ = self.indice.cercanas(40.42, -3.70, radio=800, k=dentro + 5)
+        self.assertEqual(len(posiciones), dentro)
+        posiciones, _ = self.indice.cercanas(40.42, -3.70, radio=800, k=3)
+        self.assertEqual(list(posiciones), list(np.argsort(self.distancias)[:3]))
+
+    def test_rectangulo(self):
+        posiciones = self.indice.en_rectangulo(-3.75, 40.40, -3.68, 40.45)
+        lat, lon = self.puntos['latitude'], self.puntos['longitude']
+        esperadas = np.flatnonzero((lat >= 40.40) & (lat <= 40.45) & (lon >= -3.75) & (lon <= -3.68))
+        self.assertEqual(sorted(posiciones), list(esperadas))
+
+    def test_sin_viviendas(self):
+        indice = IndiceEspacial(puntos_aleatorios(0))
+        self.assertEqual(len(indice.cercanas(40.42, -3.70, radio=500)[0]), 0)
+        self.assertEqual(len(indice.en_rectangulo(-3.75, 40.40, -3.68, 40.45)), 0)
+
+
+class PropiedadesCercanasAPITests(TestCase):
+    """Endpoints /api/properties/nearby/ y /api/properties/bbox/ sobre la tabla House"""
+
+    @classmethod
+    def setUpTestData(cls):
+        House.objects.bulk_create([
+            House(
+                latitude=40.4168 + 0.001 * i, longitude=-3.7038, buy_price=200000 + i, district='1',
+                street_name=f'Calle {i}', address_key=clave_direccion(f'Calle {i}', None, None),
+            )
+            for i in range(10)
+        ])
+
+    def test_cercanas_por_radio(self):
+        # Cada vivienda está ~111 m al norte de la anterior
+        respuesta = self.client.get('/api/properties/nearby/', {'lat': 40.4168, 'lon': -3.7038, 'radius': 350})
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos['count'], 4)
+        self.assertEqual([p['buy_price'] for p in datos['properties']], [200000, 200001, 200002, 200003])
+        self.assertAlmostEqual(datos['properties'][1]['distance_m'], 111.2, delta=0.5)
+
+    def test_k_mas_cercanas(self):
+        respuesta = self.client.get('/api/properties/nearby/', {'lat': 40.4268, 'lon': -3.7038, 'k': 2})
+        self.assertEqual([p['buy_price'] for p in respuesta.json()['properties']], [200009, 200008])
+
+    def test_rectangulo(self):
+        respuesta = self.client.get('/api/properties/bbox/', {'bbox': '-3.71,40.4165,-3.70,40.4190', 'limit': 2})
+        datos = respuesta.json()
+        self.assertEqual((datos['count'], datos['returned']), (3, 2))
+        self.assertEqual(len(datos['properties']), 2)
+
+    def test_se_reconstruye_al_cambiar_house(self):
+        parametros = {'lat': 40.4168, 'lon': -3.7038, 'radius': 50}
+        self.assertEqual(self.client.get('/api/properties/nearby/', parametros).json()['count'], 1)
+        House.objects.create(
+            latitude=40.4169, longitude=-3.7038, street_name='Calle nueva',
+            address_key=clave_direccion('Calle nueva', None, None),
+        )
+        self.assertEqual(self.client.get('/api/properties/nearby/', parametros).json()['count'], 2)
+
+    def test_parametros_no_validos(self):
+        for ruta, parametros in (
+            ('nearby', {'lat': 40.4}),
+            ('nearby', {'lat': 40.4, 'lon': -3.7, 'radius': 50000}),
+            ('nearby', {'lat': 40.4, 'lon': -3.7, 'k': 0}),
+            ('nearby', {'lat': 'nan', 'lon': -3.7}),
+            ('bbox', {'bbox': '-3.7,40.4,-3.8,40.5'}),
+            ('bbox', {'bbox': '-3.7,40.4'}),
+        ):
+            self.assertEqual(self.client.get(f'/api/properties/{ruta}/', parametros).status_code, 400, parametros)
+
+
+class IndiceDesdeCSVTests(TestCase):
+    """Con la tabla House vacía el índice sale del CSV y se reconstruye cuando este cambia"""
+
+    def test_se_reconstruye_al_cambiar_el_csv(self):
+        lineas = (Path(settings.DATA_PATH) / 'unified_houses_madrid.csv').read_text(encoding='utf-8').splitlines()
+        with tempfile.TemporaryDirectory() as directorio, override_settings(DATA_PATH=directorio):
+            ruta = Path(directorio) / 'unified_houses_madrid.csv'
+            parametros = {'bbox': '-4.0,40.0,-3.4,40.7', 'limit': 1}
+            ruta.write_text('\n'.join(lineas[:51]) + '\n', encoding='utf-8')
+            antes = self.client.get('/api/properties/bbox/', parametros)
+            ruta.write_text('\n'.join(lineas[:11]) + '\n', encoding='utf-8')
+            despues = self.client.get('/api/properties/bbox/', parametros)
+        self.assertNotEqual(antes['ETag'], despues['ETag'])
+        self.assertEqual((antes.json()['count'], despues.json()['count']), (50, 10))
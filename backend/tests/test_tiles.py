@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, TestCase
+
+from src.models.houses import House
+from src.utils.addresses import clave_direccion
+from src.utils.tiles import ZOOM_DETALLE, IndiceTeselas, limites_tesela, teselas
+
+
+def puntos_aleatorios(n=2000, semilla=1):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        'latitude': rng.uniform(40.30, 40.55, n),
+        'longitude': rng.uniform(-3.85, -3.55, n),
+        'buy_price': rng.uniform(1e5, 1e6, n),
+        'district': rng.choice(['1', '4', '21'], n).astype(object),
+        'cluster': rng.integers(0, 2, n),
+    })
+
+
+class IndiceTeselasTests(SimpleTestCase):
+    """Teselas z/x/y como rangos del orden Morton"""
+
+    def setUp(self):
+        self.puntos = puntos_aleatorios()
+        self.indice = IndiceTeselas(self.puntos)
+
+    def test_limites_contienen_el_punto(self):
+        x, y = teselas([40.4168], [-3.7038], 15)
+        oeste, sur, este, norte = limites_tesela(15, int(x[0]), int(y[0]))
+        self.assertTrue(oeste <= -3.7038 < este and sur <= 40.4168 < norte)
+
+    def test_rangos_iguales_a_calcular_la_tesela_de_cada_punto(self):
+        for zoom in (9, 12, 16):
+            x, y = teselas(self.puntos['latitude'], self.puntos['longitude'], zoom)
+            for tx, ty in set(zip(x.tolist(), y.tolist())):
+                inicio, fin = self.indice.rango(zoom, tx, ty)
+                self.assertEqual(fin - inicio, int(((x == tx) & (y == ty)).sum()))
+
+    def test_filtros(self):
+        x, y = teselas([40.42], [-3.70], 8)
+        posiciones = self.indice.seleccionar(8, int(x[0]), int(y[0]), {'cluster': [1], 'buy_price': (5e5, None)})
+        esperado = ((self.puntos['cluster'] == 1) & (self.puntos['buy_price'] >= 5e5)).sum()
+        self.assertEqual(len(posiciones), esperado)
+
+    def test_agregados_por_debajo_del_zoom_de_detalle(self):
+        x, y = teselas([40.42], [-3.70], 11)
+        tesela = self.indice.geojson(11, int(x[0]), int(y[0]))
+        self.assertTrue(tesela['aggregated'])
+        self.assertEqual(sum(f['properties']['count'] for f in tesela['features']), tesela['count'])
+        self.assertLess(len(tesela['features']), tesela['count'])
+
+    def test_viviendas_sueltas_en_zoom_de_detalle(self):
+        fila = self.puntos.iloc[0]
+        x, y = teselas([fila['latitude']], [fila['longitude']], ZOOM_DETALLE)
+        tesela = self.indice.geojson(ZOOM_DETALLE, int(x[0]), int(y[0]), propiedades=('district', 'cluster'))
+        self.assertFalse(tesela['aggregated'])
+        self.assertIn(
+            [round(fila['longitude'], 6), round(fila['latitude'], 6)],
+            [f['geometry']['coordinates'] for f in tesela['features']],
+        )
+
+
+class TileAPITests(TestCase):
+    """Endpoint /api/tiles/z/x/y/ sobre la tabla House"""
+
+    @classmethod
+    def setUpTestData(cls):
+        puntos = puntos_aleatorios(200)
+        House.objects.bulk_create([
+            House(
+                latitude=fila.latitude, longitude=fila.longitude, buy_price=fila.buy_price, district=fila.district,
+                sq_mt_built=90, n_rooms=3, n_bathrooms=2, rent_price=1200,
+                street_name=f'Calle {i}', address_key=clave_direccion(f'Calle {i}', None, None),
+            )
+            for i, fila in enumerate(puntos.itertuples())
+        ])
+
+    def test_tesela_filtrada(self):
+        respuesta = self.client.get('/api/tiles/8/125/96/', {'district': '4', 'max_price': 5e5})
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(
+            datos['count'], House.objects.filter(district='4', buy_price__lte=5e5).count(),
+        )
+        self.assertTrue(respuesta.has_header('ETag'))
+
+    def test_detalle_con_cluster(self):
+        casa = House.objects.first()
+        x, y = teselas([casa.latitude], [casa.longitude], 17)
+        datos = self.client.get(f'/api/tiles/17/{x[0]}/{y[0]}/').json()
+        self.assertIn(casa.id, [f['properties']['id'] for f in datos['features']])
+        self.assertIn(datos['features'][0]['properties']['cluster'], (0, 1))
+
+    def test_parametros_no_validos(self):
+        self.assertEqual(self.client.get('/api/tiles/3/8/0/').status_code, 400)
+        self.assertEqual(self.client.get('/api/tiles/8/125/96/', {'cluster': 'a'}).status_code, 400)
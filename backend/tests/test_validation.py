@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from src.utils.validation import REGLAS, contar_motivos, evaluar, motivos, regla_obligatorias, separar
+from tests.utils import viviendas
+
+VALIDA = {
+    'latitude': 40.42, 'longitude': -3.70, 'sq_mt_built': 80.0, 'sq_mt_useful': 70.0,
+    'sq_mt_allotment': None, 'buy_price': 300000, 'n_rooms': 3, 'built_year': 1990,
+}
+
+
+def vivienda(**cambios):
+    """Una vivienda válida salvo por `cambios`."""
+    return viviendas(1, **{**VALIDA, **cambios})
+
+
+class ReglasValidacionTests(SimpleTestCase):
+    """Reglas vectorizadas de src.utils.validation"""
+
+    def codigos(self, **cambios):
+        return motivos(evaluar(vivienda(**cambios)))[0]
+
+    def test_fila_valida_no_tiene_motivos(self):
+        self.assertEqual(self.codigos(), '')
+
+    def test_cada_regla_tiene_su_codigo(self):
+        casos = {
+            'coordenadas_nulas': {'latitude': None},
+            'fuera_de_madrid': {'longitude': -4.5},
+            'superficie_negativa': {'sq_mt_useful': -10},
+            'precio_m2_implausible': {'buy_price': 5000},
+            'habitaciones_superficie': {'n_rooms': 12},
+            'anio_construccion': {'built_year': 1200},
+        }
+        for codigo, cambios in casos.items():
+            with self.subTest(codigo=codigo):
+                self.assertEqual(self.codigos(**cambios), codigo)
+
+    def test_acumula_varios_motivos_en_orden(self):
+        self.assertEqual(
+            self.codigos(latitude=39.0, built_year=3000),
+            'fuera_de_madrid,anio_construccion',
+        )
+
+    def test_separar_y_contar(self):
+        df = pd.concat(
+            [vivienda(), vivienda(latitude=np.nan), vivienda(latitude=np.nan, buy_price=1)],
+            ignore_index=True,
+        )
+        validas, cuarentena = separar(df)
+        self.assertEqual(len(validas), 1)
+        self.assertNotIn('motivos', validas)
+        self.assertEqual(contar_motivos(cuarentena), {'coordenadas_nulas': 2, 'precio_m2_implausible': 1})
+
+    def test_regla_obligatorias(self):
+        reglas = REGLAS + (regla_obligatorias(('buy_price',)),)
+        _, cuarentena = separar(vivienda(buy_price=None), reglas)
+        self.assertEqual(cuarentena['motivos'].tolist(), ['campos_obligatorios'])
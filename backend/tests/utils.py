@@ -0,0 +1,30 @@
+"""Viviendas sintéticas para los tests."""
+import numpy as np
+import pandas as pd
+
+# Valores aleatorios de cada columna en rangos plausibles para Madrid: (rng, n) -> array
+GENERADORES = {
+    'id': lambda rng, n: np.arange(1, n + 1),
+    'latitude': lambda rng, n: rng.uniform(40.30, 40.55, n),
+    'longitude': lambda rng, n: rng.uniform(-3.85, -3.55, n),
+    'buy_price': lambda rng, n: rng.uniform(1e5, 1e6, n).round(),
+    'sq_mt_built': lambda rng, n: rng.uniform(40, 200, n).round(),
+    'rent_price': lambda rng, n: rng.uniform(500, 3000, n).round(),
+    'n_rooms': lambda rng, n: rng.integers(1, 6, n),
+    'n_bathrooms': lambda rng, n: rng.integers(1, 4, n),
+    'built_year': lambda rng, n: rng.integers(1900, 2020, n).astype(float),
+    'floor': lambda rng, n: rng.integers(-1, 10, n).astype(str).astype(object),
+}
+
+
+def viviendas(n, *columnas, semilla=0, **valores):
+    """
+    DataFrame de `n` viviendas con las `columnas` de GENERADORES y las de `valores` (un valor
+    o array, o una función (rng, n) como las de GENERADORES), en ese orden. Con la misma
+    `semilla` se obtienen siempre las mismas.
+    """
+    rng = np.random.default_rng(semilla)
+    datos = {columna: GENERADORES[columna](rng, n) for columna in columnas}
+    for columna, valor in valores.items():
+        datos[columna] = valor(rng, n) if callable(valor) else valor
+    return pd.DataFrame(datos, index=range(n))
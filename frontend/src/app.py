@@ -35,77 +35,92 @@ with st.sidebar:
     - +6,000 propiedades analizadas
     """)
 
-# Función para cargar datos de distritos y barrios
-@st.cache_data
-def cargar_distritos_barrios():
+# Copia de /api/meta/locations/ incluida con el frontend (comando compilar_ubicaciones --frontend)
+UBICACIONES_LOCAL = Path(__file__).parent / "locations.json"
+
+# Distritos y barrios con su centroide y €/m² (metadatos compilados en el backend)
+@st.cache_data(ttl=3600)
+def cargar_ubicaciones():
+    url = f"{API_BASE_URL}/api/meta/locations/"
+    cache = respuestas_etag()
+    headers = {"If-None-Match": cache[url][0]} if url in cache else {}
     try:
-        # Intentar cargar desde el archivo JSON
-        json_path = Path("districts_data.json")
-        if json_path.exists():
-            with open(json_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except:
-        pass
-    
-    # Datos por defecto si no existe el archivo
+        response = requests.get(url, headers=headers, timeout=10)
+        if response.status_code == 304:
+            return cache[url][1]
+        response.raise_for_status()
+        datos = response.json()
+        if response.headers.get("ETag"):
+            cache[url] = (response.headers["ETag"], datos)
+        return datos
+    except (requests.exceptions.RequestException, ValueError):
+        # Sin backend, la copia local
+        with open(UBICACIONES_LOCAL, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+# Listas para los selectores, coordenadas de cada barrio y €/m² de cada distrito
+def cargar_distritos_barrios():
+    distritos = [d for d in cargar_ubicaciones()["districts"] if d["name"]]
+    barrios = {d["name"]: [b for b in d["neighborhoods"] if b["name"]] for d in distritos}
     return {
-        "districts": [
-            "Arganzuela", "Barajas", "Carabanchel", "Centro", "Chamartín", 
-            "Chamberí", "Ciudad Lineal", "Fuencarral-El Pardo", "Hortaleza",
-            "Latina", "Moncloa-Aravaca", "Moratalaz", "Puente de Vallecas",
-            "Retiro", "Salamanca", "San Blas-Canillejas", "Tetuán",
-            "Usera", "Vicálvaro", "Villa de Vallecas", "Villaverde"
-        ],
-        "neighborhoods_by_district": {
-            "Centro": ["Sol", "Malasaña", "Chueca", "La Latina", "Lavapiés"],
-            "Salamanca": ["Recoletos", "Goya", "Lista", "Castellana"],
-            "Chamberí": ["Arapiles", "Trafalgar", "Almagro", "Vallehermoso"],
-            "Retiro": ["Pacífico", "Adelfas", "Estrella", "Ibiza"],
-            "Chamartín": ["El Viso", "Prosperidad", "Ciudad Jardín", "Hispanoamérica"]
-        }
+        "districts": [d["name"] for d in distritos],
+        "neighborhoods_by_district": {nombre: [b["name"] for b in lista] for nombre, lista in barrios.items()},
+        # Mediana de las coordenadas del barrio o, si no tiene viviendas en Madrid, la del distrito
+        "coordenadas_barrios": {
+            d["name"]: {b["name"]: b["centroid"] or d["centroid"] for b in barrios[d["name"]]}
+            for d in distritos if d["centroid"]
+        },
+        "precios_m2_por_distrito": {d["name"]: d["price_m2"] for d in distritos if d["price_m2"] is not None},
     }
 
-# Función para validar coordenadas de Madrid
-def validar_coordenadas(lat, lon):
-    return (40.3 <= lat <= 40.6) and (-3.9 <= lon <= -3.5)
+# Distrito y barrio de unas coordenadas según el backend (None si no corresponden a Madrid)
+def ubicar_coordenadas(lat, lon):
+    response = requests.get(f"{API_BASE_URL}/api/geo/reverse/", params={"lat": lat, "lon": lon}, timeout=10)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+# Mediana del €/m² por distrito (nombre) según las estadísticas precalculadas del backend
+@st.cache_data(ttl=3600)
+def cargar_precios_m2_por_distrito():
+    try:
+        response = requests.get(f"{API_BASE_URL}/api/market/stats/", params={"group_by": "district"}, timeout=10)
+        response.raise_for_status()
+        return {
+            fila["district_name"]: fila["price_m2"]["median"]
+            for fila in response.json()["stats"]
+            if fila.get("district_name") and fila["price_m2"]["median"] is not None
+        }
+    except (requests.exceptions.RequestException, ValueError, KeyError):
+        return {}
+
+# Última respuesta de cada endpoint con su ETag, para revalidar con GET condicional
+@st.cache_resource
+def respuestas_etag():
+    return {}
 
 # Función para cargar datos de clustering
 @st.cache_data(ttl=300)
 def cargar_clustering():
+    url = f"{API_BASE_URL}/clustering/"
+    cache = respuestas_etag()
+    headers = {"If-None-Match": cache[url][0]} if url in cache else {}
     try:
-        response = requests.get(f"{API_BASE_URL}/clustering/", timeout=30)
+        response = requests.get(url, headers=headers, timeout=30)
+        if response.status_code == 304:
+            # El backend confirma que los datos no han cambiado: reutilizar el cuerpo anterior
+            return pd.DataFrame(cache[url][1]), None
         if response.status_code == 200:
-            return pd.DataFrame(response.json()), None
+            datos = response.json()
+            if response.headers.get("ETag"):
+                cache[url] = (response.headers["ETag"], datos)
+            return pd.DataFrame(datos), None
         else:
             return None, f"Error {response.status_code}: {response.text}"
     except requests.exceptions.RequestException as e:
         return None, f"Error de conexión: {str(e)}"
 
-# Coordenadas aproximadas por distrito (centro del distrito)
-COORDENADAS_DISTRITOS = {
-    "Centro": (40.4165, -3.7026),
-    "Salamanca": (40.4309, -3.6763),
-    "Chamberí": (40.4378, -3.7044),
-    "Retiro": (40.4153, -3.6838),
-    "Chamartín": (40.4607, -3.6774),
-    "Moncloa-Aravaca": (40.4364, -3.7411),
-    "Tetuán": (40.4659, -3.6993),
-    "Arganzuela": (40.3973, -3.6993),
-    "Carabanchel": (40.3815, -3.7363),
-    "Latina": (40.3963, -3.7617),
-    "Fuencarral-El Pardo": (40.5123, -3.7174),
-    "Hortaleza": (40.4751, -3.6543),
-    "Ciudad Lineal": (40.4567, -3.6234),
-    "Usera": (40.3856, -3.6987),
-    "Puente de Vallecas": (40.3912, -3.6543),
-    "Moratalaz": (40.4078, -3.6421),
-    "Villaverde": (40.3456, -3.7123),
-    "Villa de Vallecas": (40.3723, -3.6234),
-    "Vicálvaro": (40.3987, -3.6012),
-    "San Blas-Canillejas": (40.4387, -3.6012),
-    "Barajas": (40.4723, -3.5789)
-}
-
 # Mostrar tabla dinámica de clustering
 st.header("📊 Análisis de Propiedades por Clusters")
 df_clusters, error = cargar_clustering()
@@ -137,7 +152,11 @@ else:
 st.header("💰 Predictor de Precio de Vivienda")
 
 # Cargar datos de distritos y barrios
-distritos_data = cargar_distritos_barrios()
+try:
+    distritos_data = cargar_distritos_barrios()
+except (OSError, ValueError, KeyError) as e:
+    st.error(f"❌ No se pudieron cargar los distritos y barrios: {e}")
+    st.stop()
 
 # **SELECTORES DINÁMICOS FUERA DEL FORMULARIO**
 st.subheader("📍 Selecciona la ubicación")
@@ -163,8 +182,10 @@ with col_barr:
         key="neighborhood_dynamic"
     )
 
-# Coordenadas automáticas basadas en el distrito
-coords_distrito = COORDENADAS_DISTRITOS.get(district, (40.4168, -3.7038))
+# Coordenadas automáticas: mediana de las viviendas del barrio elegido
+coords_distrito = tuple(
+    distritos_data.get("coordenadas_barrios", {}).get(district, {}).get(neighborhood, (40.4168, -3.7038))
+)
 
 # **FORMULARIO CON EL RESTO DE CAMPOS**
 with st.form("prediccion_form"):
@@ -252,8 +273,14 @@ with st.form("prediccion_form"):
         errores = []
         if sq_mt_built < 20:
             errores.append("La vivienda debe tener al menos 20 metros cuadrados")
-        if not validar_coordenadas(latitude, longitude):
-            errores.append("Las coordenadas no corresponden a Madrid")
+        try:
+            ubicacion = ubicar_coordenadas(latitude, longitude)
+            if ubicacion is None:
+                errores.append("Las coordenadas no corresponden a Madrid")
+            elif ubicacion.get("district_name") and ubicacion["district_name"] != district:
+                st.info(f"📍 Las coordenadas están en {ubicacion['district_name']} - {ubicacion.get('neighborhood_name')}")
+        except requests.exceptions.RequestException as e:
+            errores.append(f"No se pudo comprobar la ubicación: {e}")
         
         if errores:
             for error in errores:
@@ -262,15 +289,10 @@ with st.form("prediccion_form"):
             # Calcular automáticamente metros útiles (aprox. 85% de los construidos)
             sq_mt_useful = round(sq_mt_built * 0.85, 1)
             
-            # Calcular precio por m² estimado basado en el distrito
+            # Mediana del precio por m² del distrito con los datos actuales del backend;
+            # si no responde, el €/m² medio de los metadatos de ubicación
             precios_por_distrito = {
-                "Centro": 4500, "Salamanca": 5000, "Chamberí": 4200, 
-                "Retiro": 4800, "Chamartín": 4600, "Moncloa-Aravaca": 4000,
-                "Tetuán": 3500, "Arganzuela": 3800, "Carabanchel": 2800,
-                "Latina": 3200, "Fuencarral-El Pardo": 3600, "Hortaleza": 3400,
-                "Ciudad Lineal": 3300, "Usera": 2600, "Puente de Vallecas": 2700,
-                "Moratalaz": 3100, "Villaverde": 2500, "Villa de Vallecas": 2600,
-                "Vicálvaro": 2800, "San Blas-Canillejas": 3000, "Barajas": 3400
+                **distritos_data.get("precios_m2_por_distrito", {}), **cargar_precios_m2_por_distrito(),
             }
             buy_price_by_area = precios_por_distrito.get(district, 3500)
             
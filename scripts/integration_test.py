@@ -88,7 +88,7 @@ def test_existing_scripts():
     print("\n📁 Testing existing scripts...")
     
     scripts_to_check = [
-        "scripts/get_districts_neighborhoods.py"
+        "backend/src/management/commands/compilar_ubicaciones.py"
     ]
     
     for script_path in scripts_to_check:
@@ -132,7 +132,7 @@ def check_script_files():
     expected_scripts = {
         'scripts/validate_models.py': 'Model validation script',
         'scripts/integration_test.py': 'Integration test script',
-        'scripts/get_districts_neighborhoods.py': 'Districts/neighborhoods script'
+        'backend/src/management/commands/compilar_ubicaciones.py': 'Location metadata compiler'
     }
     
     missing_scripts = []